@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+生成大规模的合成题库，记录合并流程各阶段的耗时和峰值内存（RSS），结果输出为JSON。
+--heap-profile 额外运行一轮不计时的 tracemalloc 统计，记录各阶段Python堆内存峰值
+--startup 只测量命令行的启动时间（python -X importtime），超过目标时返回非零退出码
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from merger import QuestionBankMerger
+from metrics import MetricsRecorder, peak_rss_bytes
+from schema import concat_frames
+
+QUESTION_TYPES = ["单选题", "多选题", "判断题"]
+
+# 测量启动时间的命令（相对于仓库根目录）
+STARTUP_COMMANDS = {
+    "merger --help": ["src/merger.py", "--help"],
+    "merger --check-config": ["src/merger.py", "--check-config"],
+}
+
+# 启动时不应导入的模块
+HEAVY_MODULES = {"pandas", "numpy", "openpyxl", "docx", "pyarrow"}
+
+LAYOUTS = {
+    # 中文题库格式：第一行说明文字，第二行表头
+    "chinese": {
+        "description": "为保证导出格式正确，请勿修改表头",
+        "header_row_index": 1,
+        "columns": {
+            "question_type": "题型",
+            "question_text": "题干",
+            "correct_answer": "正确答案",
+            "analysis": "解析",
+            "score": "分值",
+            "difficulty": "难度系数",
+        },
+        "option_name": "选项{}",
+    },
+    # 标准格式：第一行就是表头
+    "standard": {
+        "description": None,
+        "header_row_index": 0,
+        "columns": {
+            "question_type": "Question Type",
+            "question_text": "Question",
+            "correct_answer": "Answer",
+            "analysis": "Analysis",
+            "score": "Score",
+            "difficulty": "Difficulty",
+        },
+        "option_name": "Option {}",
+    },
+}
+
+
+def layout_config(layout: str, options: int) -> Dict:
+    """生成与合成题库对应的合并配置"""
+    spec = LAYOUTS[layout]
+    config = QuestionBankMerger(config={}).get_default_config()
+    header_row = spec["header_row_index"]
+    config["excel_settings"].update({
+        "header_row_index": header_row,
+        "data_start_row": header_row + 1,
+        "skip_description_row": header_row > 0,
+    })
+    config["column_mapping"] = dict(spec["columns"])
+    config["column_mapping"]["options"] = [spec["option_name"].format(chr(65 + i))
+                                           for i in range(options)]
+    config["file_patterns"] = ["*.xlsx"]
+    return config
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    """随机中文文本"""
+    return ''.join(chr(0x4e00 + rng.randrange(3000)) for _ in range(length))
+
+
+def generate_bank(path: str, layout: str, rows: int, options: int, text_length: int,
+                  rng: random.Random):
+    """生成一个合成题库文件"""
+    spec = LAYOUTS[layout]
+    config = layout_config(layout, options)
+    column_map = config["column_mapping"]
+    header = [column_map[key] for key in spec["columns"]] + column_map["options"]
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    if spec["description"]:
+        worksheet.append([spec["description"]])
+    worksheet.append(header)
+
+    for _ in range(rows):
+        question_type = rng.choice(QUESTION_TYPES)
+        if question_type == "判断题":
+            answer = rng.choice(["对", "错"])
+            option_values = [None] * options
+        else:
+            count = 1 if question_type == "单选题" else rng.randint(2, options)
+            answer = ''.join(sorted(rng.sample([chr(65 + i) for i in range(options)], count)))
+            option_values = [random_text(rng, max(2, text_length // 4)) for _ in range(options)]
+        worksheet.append([
+            question_type,
+            random_text(rng, text_length),
+            answer,
+            random_text(rng, text_length // 2),
+            "1.0" if question_type != "多选题" else "2.0",
+            str(rng.randint(1, 5)),
+        ] + option_values)
+
+    workbook.save(path)
+
+
+def generate_banks(directory: str, layout: str, files: int, rows: int, options: int,
+                   text_length: int, seed: int) -> List[str]:
+    """生成多个合成题库文件"""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"第{i + 1}章_习题导出.xlsx")
+        generate_bank(path, layout, rows, options, text_length, rng)
+        paths.append(path)
+    return paths
+
+
+class StageTimer:
+    """记录各阶段的耗时、CPU时间和峰值内存
+
+    计时和内存统计使用 metrics.MetricsRecorder：峰值内存为进程常驻内存（RSS），
+    由操作系统统计，不会拖慢被计时的代码
+    """
+
+    def __init__(self):
+        self.recorder = MetricsRecorder(enabled=True)
+
+    def measure(self, name: str, func, *args, rows: int = None, **kwargs):
+        with self.recorder.stage(name, rows) as stage:
+            result = func(*args, **kwargs)
+            if stage.rows is None and hasattr(result, "__len__"):
+                stage.rows = len(result)
+        return result
+
+    def add(self, name: str, seconds: float, cpu_seconds: float, rows: int = None):
+        self.recorder.add(name, seconds, cpu_seconds, peak_rss_bytes(), rows)
+
+    def stages(self) -> Dict[str, Dict]:
+        """按阶段汇总：耗时和行数累加，峰值内存取最大值"""
+        stages: Dict[str, Dict] = {}
+        for record in self.recorder.snapshot():
+            stage = stages.setdefault(record["stage"], {"seconds": 0.0, "cpu_seconds": 0.0,
+                                                        "peak_rss_mb": 0.0})
+            stage["seconds"] += record["wall_seconds"]
+            stage["cpu_seconds"] += record["cpu_seconds"]
+            stage["peak_rss_mb"] = max(stage["peak_rss_mb"], record["peak_bytes"] / 1024 / 1024)
+            if "rows" in record:
+                stage["rows"] = stage.get("rows", 0) + record["rows"]
+        return stages
+
+
+class HeapProfiler:
+    """用 tracemalloc 统计各阶段Python堆内存的峰值
+
+    tracemalloc 追踪每次内存分配，会使被测代码慢数倍，因此只在单独的、不计时的一轮中使用
+    """
+
+    def __init__(self):
+        self.peaks: Dict[str, float] = {}
+
+    def measure(self, name: str, func, *args, rows: int = None, **kwargs):
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        self.add(name, tracemalloc.get_traced_memory()[1] - start_memory)
+        return result
+
+    def add(self, name: str, peak_bytes: int):
+        self.peaks[name] = max(self.peaks.get(name, 0.0), peak_bytes / 1024 / 1024)
+
+
+def run_stages(merger: QuestionBankMerger, files: List[str], output_prefix: str, measure):
+    """依次运行读取、合并、报告和输出各阶段，measure(name, func, *args, rows=...) 负责统计"""
+    frames = [measure("read_excel_file", merger.read_excel_file, file) for file in files]
+    merger.merged_data = measure("concat", concat_frames, frames,
+                                 rows=sum(len(frame) for frame in frames))
+    del frames
+    rows = len(merger.merged_data)
+    measure("generate_report", merger.generate_report, rows=rows)
+    measure("save_excel", merger.save_excel, f"{output_prefix}_merged.xlsx", rows=rows)
+    measure("save_word", merger.save_word, f"{output_prefix}_merged.docx", rows=rows)
+
+
+def profile_heap(config: Dict, files: List[str], output_prefix: str) -> Dict[str, float]:
+    """单独运行一轮（不计时），返回各阶段Python堆内存的峰值（MB）"""
+    merger = QuestionBankMerger(config=config)
+    profiler = HeapProfiler()
+    clean_data = merger.clean_data
+
+    def traced_clean_data(df):
+        # 不重置峰值，以免影响外层 read_excel_file 的统计
+        start_memory = tracemalloc.get_traced_memory()[0]
+        result = clean_data(df)
+        profiler.add("clean_data", tracemalloc.get_traced_memory()[1] - start_memory)
+        return result
+
+    merger.clean_data = traced_clean_data
+    tracemalloc.start()
+    try:
+        run_stages(merger, files, output_prefix, profiler.measure)
+    finally:
+        tracemalloc.stop()
+    return profiler.peaks
+
+
+def run_benchmark(args, layout: str, workdir: str) -> Dict:
+    """对一种格式运行完整的合并流程并记录各阶段指标"""
+    input_dir = os.path.join(workdir, layout)
+    print(f"[{layout}] 生成 {args.files} 个文件，每个 {args.rows} 道题目...")
+    files = generate_banks(input_dir, layout, args.files, args.rows, args.options,
+                           args.text_length, args.seed)
+
+    config = layout_config(layout, args.options)
+    if args.word_engine:
+        config["output_settings"]["word_engine"] = args.word_engine
+    merger = QuestionBankMerger(config=config)
+    timer = StageTimer()
+
+    # clean_data 在 read_excel_file 内部调用，单独累计其耗时
+    clean_data = merger.clean_data
+
+    def timed_clean_data(df):
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        result = clean_data(df)
+        timer.add("clean_data", time.perf_counter() - start,
+                  time.process_time() - start_cpu, len(result))
+        return result
+
+    merger.clean_data = timed_clean_data
+    output_prefix = os.path.join(workdir, layout)
+    run_stages(merger, files, output_prefix, timer.measure)
+    stages = timer.stages()
+
+    if args.heap_profile:
+        print(f"[{layout}] 统计Python堆内存峰值（tracemalloc，不计时）...")
+        for name, peak in profile_heap(config, files, output_prefix).items():
+            stages.setdefault(name, {})["heap_peak_mb"] = round(peak, 2)
+
+    for stage in stages.values():
+        if stage.get("rows") and stage["seconds"] > 0:
+            stage["rows_per_sec"] = round(stage["rows"] / stage["seconds"], 1)
+        stage["seconds"] = round(stage["seconds"], 4)
+        stage["cpu_seconds"] = round(stage["cpu_seconds"], 4)
+        stage["peak_rss_mb"] = round(stage["peak_rss_mb"], 2)
+
+    return {
+        "total_seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+        "stages": stages,
+    }
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[str]]:
+    """解析 -X importtime 的输出，返回导入总耗时（毫秒）和导入的模块名"""
+    total_us = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头行
+        total_us += int(parts[0])
+        modules.append(parts[2].strip())
+    return total_us / 1000, modules
+
+
+def measure_startup(repeat: int) -> Dict:
+    """运行每个启动命令 repeat 次，记录导入耗时和总耗时的中位数（以及最短耗时）
+
+    单次运行容易受到磁盘缓存和其他进程的影响，目标比较使用中位数
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for name, argv in STARTUP_COMMANDS.items():
+        import_ms, wall_ms, modules = [], [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=root,
+                                  capture_output=True, text=True)
+            wall_ms.append((time.perf_counter() - start) * 1000)
+            elapsed, modules = parse_importtime(proc.stderr)
+            import_ms.append(elapsed)
+        results[name] = {
+            "import_ms": round(statistics.median(import_ms), 1),
+            "import_ms_min": round(min(import_ms), 1),
+            "wall_ms": round(statistics.median(wall_ms), 1),
+            "modules": len(modules),
+            "heavy_modules": sorted({module.split(".")[0] for module in modules}
+                                    & HEAVY_MODULES),
+        }
+    return results
+
+
+def check_startup(startup: Dict, target_ms: float) -> List[str]:
+    """超过导入耗时目标或导入了重量级模块的命令"""
+    failures = []
+    for name, result in startup.items():
+        print(f"  {name}: 导入 {result['import_ms']:.1f}ms（中位数，最短 "
+              f"{result['import_ms_min']:.1f}ms）, 总耗时 {result['wall_ms']:.1f}ms, "
+              f"{result['modules']} 个模块")
+        if result["import_ms"] > target_ms:
+            failures.append(f"{name} 导入耗时中位数 {result['import_ms']:.1f}ms 超过 {target_ms:.0f}ms")
+        if result["heavy_modules"]:
+            failures.append(f"{name} 导入了 {', '.join(result['heavy_modules'])}")
+    return failures
+
+
+def compare_results(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """与基线结果比较，返回耗时退化超过阈值的阶段"""
+    regressions = []
+    for layout, result in results["layouts"].items():
+        base_layout = baseline.get("layouts", {}).get(layout)
+        if not base_layout:
+            continue
+        for name, stage in result["stages"].items():
+            base_stage = base_layout["stages"].get(name)
+            if not base_stage or base_stage["seconds"] <= 0:
+                continue
+            ratio = stage["seconds"] / base_stage["seconds"]
+            print(f"  [{layout}] {name}: {base_stage['seconds']:.3f}s -> "
+                  f"{stage['seconds']:.3f}s ({ratio:.2f}x)")
+            if ratio > 1 + max_regression:
+                regressions.append(f"{layout}/{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="题库合并工具性能基准测试")
+    parser.add_argument("--layout", choices=["chinese", "standard", "both"], default="both",
+                        help="合成题库的格式")
+    parser.add_argument("--files", type=int, default=10, help="文件数量")
+    parser.add_argument("--rows", type=int, default=1000, help="每个文件的题目数量")
+    parser.add_argument("--options", type=int, default=4, help="选项数量（最多26个）")
+    parser.add_argument("--text-length", type=int, default=40, help="题干长度（字符数）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--word-engine", choices=["python-docx", "ooxml"], help="Word渲染引擎")
+    parser.add_argument("--workdir", help="生成文件的目录（默认使用临时目录）")
+    parser.add_argument("--output", default="benchmark_results.json", help="结果JSON文件路径")
+    parser.add_argument("--baseline", help="用于比较的基线结果JSON文件")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="允许的最大耗时退化比例（默认0.2，即20%%）")
+    parser.add_argument("--heap-profile", action="store_true",
+                        help="额外运行一轮不计时的 tracemalloc 统计，记录各阶段Python堆内存峰值")
+    parser.add_argument("--startup", action="store_true",
+                        help="只测量命令行启动时间（python -X importtime）")
+    parser.add_argument("--startup-target-ms", type=float, default=250,
+                        help="启动时导入耗时中位数的上限（毫秒，默认250，导入 pandas 通常需要数百毫秒）")
+    parser.add_argument("--startup-repeat", type=int, default=7,
+                        help="每个启动命令运行的次数，取中位数（默认7）")
+
+    args = parser.parse_args()
+
+    if args.startup:
+        startup = measure_startup(max(1, args.startup_repeat))
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"environment": {"python": platform.python_version(),
+                                       "platform": platform.platform()},
+                       "startup": startup}, f, ensure_ascii=False, indent=2)
+        print(f"[SUCCESS] 启动时间测量结果已保存: {args.output}\n")
+        failures = check_startup(startup, args.startup_target_ms)
+        if failures:
+            print("\n[ERROR] " + "\n[ERROR] ".join(failures))
+            sys.exit(1)
+        return
+
+    layouts = ["chinese", "standard"] if args.layout == "both" else [args.layout]
+    results = {
+        "params": {
+            "files": args.files,
+            "rows": args.rows,
+            "options": args.options,
+            "text_length": args.text_length,
+            "seed": args.seed,
+            "word_engine": args.word_engine,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+        },
+        "layouts": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = args.workdir or tmpdir
+        for layout in layouts:
+            results["layouts"][layout] = run_benchmark(args, layout, workdir)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n[SUCCESS] 基准测试结果已保存: {args.output}")
+
+    for layout, result in results["layouts"].items():
+        print(f"\n=== {layout} ===")
+        for name, stage in result["stages"].items():
+            line = f"  {name}: {stage['seconds']:.3f}s, 峰值常驻内存 {stage['peak_rss_mb']:.1f}MB"
+            if "heap_peak_mb" in stage:
+                line += f", Python堆峰值 {stage['heap_peak_mb']:.1f}MB"
+            print(line)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("\n与基线比较:")
+        regressions = compare_results(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\n[ERROR] 以下阶段耗时退化超过 {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
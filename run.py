@@ -4,10 +4,10 @@
 题库合并工具 - 新手友好版
 一键运行，自动检测和合并题库
 """
+import importlib.util
 import os
 import sys
 import glob
-import pandas as pd
 from pathlib import Path
 
 def detect_and_auto_merge():
@@ -102,22 +102,23 @@ def detect_and_auto_merge():
     input("\n按回车键退出...")
 
 def detect_format(filepath):
-    """自动检测文件格式"""
+    """自动检测文件格式（只读取前几行）"""
     try:
-        # 读取前3行来判断格式
-        df = pd.read_excel(filepath, engine='openpyxl', header=None, nrows=3)
-
-        # 检查第一行是否为说明文字
-        first_row = df.iloc[0].astype(str).str.cat()
-        if '为保证导出' in first_row or '格式' in first_row:
-            return "chinese_style"  # 中文题库格式（第一行说明，第二行表头）
-        else:
-            # 检查是否有中文列名
-            second_row = df.iloc[0].astype(str).str.cat()
-            if '题型' in second_row or '题干' in second_row:
-                return "chinese_direct"  # 中文格式（直接是表头）
-            else:
-                return "standard"  # 标准格式
+        sys.path.insert(0, 'src')
+        from reader import detect_header_row, probe_rows
+
+        # 读取前5行，按关键词得分找出表头行
+        rows = probe_rows(filepath, 5)
+        header_row = detect_header_row(rows)
+        if header_row is None:
+            return "standard"  # 标准格式
+
+        header = ''.join(str(cell) for cell in rows[header_row] if cell is not None)
+        if '题型' in header or '题干' in header:
+            if header_row > 0:
+                return "chinese_style"  # 中文题库格式（第一行说明，第二行表头）
+            return "chinese_direct"  # 中文格式（直接是表头）
+        return "standard"  # 标准格式
     except:
         return "unknown"
 
@@ -127,6 +128,7 @@ def merge_with_auto_config(files, format_type):
         # 导入合并器
         sys.path.insert(0, 'src')
         from merger import QuestionBankMerger
+        from schema import concat_frames
 
         # 根据格式选择配置
         if format_type == "chinese_style":
@@ -146,6 +148,8 @@ def merge_with_auto_config(files, format_type):
         merger.config["output_settings"]["excel_filename"] = "output/auto_merged.xlsx"
         merger.config["output_settings"]["word_filename"] = "output/auto_merged.docx"
         merger.config["file_patterns"] = files
+        # 每个文件在读取时探测自己的表头位置
+        merger.config["excel_settings"]["auto_detect_header"] = True
 
         # 合并文件
         all_data = []
@@ -155,7 +159,7 @@ def merge_with_auto_config(files, format_type):
                 all_data.append(data)
 
         if all_data:
-            merged_data = pd.concat(all_data, ignore_index=True)
+            merged_data = concat_frames(all_data)
             merger.merged_data = merged_data
 
             # 保存文件
@@ -225,23 +229,11 @@ def create_default_config(config_file, format_type):
         json.dump(config, f, ensure_ascii=False, indent=2)
 
 def install_dependencies():
-    """检查并安装依赖"""
-    required = ['pandas', 'openpyxl']
-    docx_required = 'python-docx'
-    missing = []
-
-    # 检查必需的依赖
-    for module in required:
-        try:
-            __import__(module)
-        except ImportError:
-            missing.append(module)
-
-    # 检查python-docx（用于生成Word）
-    try:
-        import docx
-    except ImportError:
-        missing.append(docx_required)
+    """检查并安装依赖（只查找模块是否已安装，不导入，启动更快）"""
+    # 模块名: 安装包名；python-docx 用于生成Word
+    required = {'pandas': 'pandas', 'openpyxl': 'openpyxl', 'docx': 'python-docx'}
+    missing = [package for module, package in required.items()
+               if importlib.util.find_spec(module) is None]
 
     if missing:
         print("\n需要安装以下依赖包：")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已解析文件缓存
+按文件指纹（路径、大小、修改时间、内容哈希）缓存每个文件清理后的数据，
+未变化的文件直接从缓存加载，无需重新解析Excel
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+
+def file_digest(filepath: str) -> str:
+    """计算文件内容的SHA1哈希"""
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_fingerprint(config: Dict) -> str:
+    """影响解析结果的配置项指纹，配置变化时缓存自动失效"""
+    section = {
+        "column_mapping": config.get("column_mapping"),
+        "excel_settings": config.get("excel_settings"),
+    }
+    mapping_settings = config.get("mapping_settings", {})
+    if mapping_settings.get("auto", False):
+        # 自动匹配列名时同义词等设置也会影响解析结果
+        section["mapping_settings"] = mapping_settings
+    payload = json.dumps(section, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ParsedFileCache:
+    """磁盘缓存：清单文件记录指纹，数据以pickle文件保存，超出容量时按LRU淘汰"""
+
+    def __init__(self, cache_dir: str, config: Dict, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.config_key = config_fingerprint(config)
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load_manifest()
+
+    def load_manifest(self):
+        """加载缓存清单，清单损坏或版本不符时视为空缓存"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        if manifest.get("version") == MANIFEST_VERSION:
+            self.entries = manifest.get("entries", {})
+
+    def save(self):
+        """写入缓存清单（先写临时文件再替换，避免中断时损坏）"""
+        self.evict()
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def data_path(self, entry: Dict) -> str:
+        return os.path.join(self.cache_dir, entry["data_file"])
+
+    def get(self, filepath: str) -> Optional[pd.DataFrame]:
+        """查找缓存，文件或配置有变化时返回None"""
+        key = os.path.abspath(filepath)
+        entry = self.entries.get(key)
+        if entry is None or entry["config_key"] != self.config_key:
+            self.misses += 1
+            return None
+
+        stat = os.stat(filepath)
+        if stat.st_size != entry["size"]:
+            self.misses += 1
+            return None
+
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            # 修改时间变化但内容可能相同（例如重新复制），比较内容哈希
+            if file_digest(filepath) != entry["sha1"]:
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+
+        try:
+            data = pd.read_pickle(self.data_path(entry))
+        except Exception:
+            self.remove(key)
+            self.misses += 1
+            return None
+
+        entry["last_access"] = time.time()
+        self.hits += 1
+        return data
+
+    def stamp(self, filepath: str) -> Dict:
+        """文件当前的大小、修改时间和内容哈希，必须在解析之前获取（见 put）"""
+        stat = os.stat(filepath)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "sha1": file_digest(filepath)}
+
+    def put(self, filepath: str, data: pd.DataFrame, stamp: Dict) -> bool:
+        """写入缓存并按容量淘汰最久未使用的条目
+
+        stamp 为解析之前通过 stamp() 获取的指纹。解析期间文件被修改时不写入缓存
+        （否则旧内容的解析结果会记在新内容的指纹下），返回是否已写入
+        """
+        key = os.path.abspath(filepath)
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return False
+        if (stat.st_size, stat.st_mtime_ns) != (stamp["size"], stamp["mtime_ns"]):
+            return False
+        entry = {
+            **stamp,
+            "config_key": self.config_key,
+            "data_file": hashlib.sha1(key.encode('utf-8')).hexdigest() + ".pkl",
+            "last_access": time.time(),
+        }
+        data.to_pickle(self.data_path(entry))
+        entry["bytes"] = os.path.getsize(self.data_path(entry))
+        self.entries[key] = entry
+        self.evict()
+        return True
+
+    def remove(self, key: str):
+        """删除一个缓存条目及其数据文件"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            try:
+                os.remove(self.data_path(entry))
+            except FileNotFoundError:
+                pass
+
+    def total_bytes(self) -> int:
+        return sum(entry.get("bytes", 0) for entry in self.entries.values())
+
+    def evict(self):
+        """超出容量上限时按最近访问时间淘汰"""
+        if self.max_bytes is None:
+            return
+
+        total = self.total_bytes()
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.entries[key].get("bytes", 0)
+            self.remove(key)
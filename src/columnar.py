@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式与JSONL格式
+Parquet、Arrow IPC（Feather v2）和 JSON Lines 的读取与写出，
+可以把中间题库保存为列式文件，重新加载时只读取映射的列。
+Parquet/Arrow 需要安装 pyarrow，JSONL 不需要
+"""
+import os
+from typing import Iterable, List, Sequence, Union
+
+import pandas as pd
+
+from schema import STRING_DTYPE, to_string
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+ARROW_SUFFIXES = {".arrow", ".feather", ".ipc"}
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+COLUMNAR_SUFFIXES = PARQUET_SUFFIXES | ARROW_SUFFIXES | JSONL_SUFFIXES
+
+
+def require_pyarrow(fmt: str):
+    if not PYARROW_AVAILABLE:
+        raise ImportError(f"读写 {fmt} 文件需要安装 pyarrow（pip install pyarrow）")
+
+
+def _string_mapper(data_type):
+    """Arrow字符串直接映射为Arrow字符串列，避免转换为Python对象"""
+    if STRING_DTYPE is not None and data_type in (pa.string(), pa.large_string()):
+        return STRING_DTYPE
+    return None
+
+
+def read_columnar(filepath: str, columns: Sequence[str]) -> pd.DataFrame:
+    """读取 Parquet/Arrow/JSONL 文件中指定的列，文件中不存在的列会被忽略"""
+    suffix = os.path.splitext(filepath)[1].lower()
+
+    if suffix in JSONL_SUFFIXES:
+        wanted = list(columns)
+        chunks = []
+        # 分块读取，每块只保留需要的列；不推断类型，与Excel读取一致
+        with pd.read_json(filepath, lines=True, dtype=False, chunksize=100000) as reader:
+            for chunk in reader:
+                chunks.append(chunk[[col for col in wanted if col in chunk.columns]])
+        if not chunks:
+            return pd.DataFrame()
+        df = pd.concat(chunks, ignore_index=True)
+        return df[[col for col in wanted if col in df.columns]]
+
+    if suffix in PARQUET_SUFFIXES:
+        require_pyarrow("Parquet")
+        names = pq.read_schema(filepath).names
+        present = [col for col in dict.fromkeys(columns) if col in names]
+        table = pq.read_table(filepath, columns=present)
+    else:
+        require_pyarrow("Arrow")
+        with pa.memory_map(filepath) as source:
+            names = ipc.open_file(source).schema.names
+        present = [col for col in dict.fromkeys(columns) if col in names]
+        table = feather.read_table(filepath, columns=present, memory_map=True)
+
+    return table.to_pandas(types_mapper=_string_mapper)
+
+
+def arrow_table(df: pd.DataFrame) -> "pa.Table":
+    """DataFrame 转换为Arrow表，混合类型的object列（例如文本和数字混合的分值）转换为字符串"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        converted = df.copy()
+        for col in converted.columns:
+            if converted[col].dtype == object:
+                converted[col] = to_string(converted[col])
+        return pa.Table.from_pandas(converted, preserve_index=False)
+
+
+def as_frames(data: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> Iterable[pd.DataFrame]:
+    """单个DataFrame或按顺序产出的多个数据块"""
+    return [data] if isinstance(data, pd.DataFrame) else data
+
+
+def write_arrow_tables(writer_factory, frames: Iterable[pd.DataFrame]):
+    """逐块写入Arrow表，第一块决定文件的schema，之后的块按该schema转换"""
+    writer = None
+    try:
+        for frame in frames:
+            table = arrow_table(frame)
+            if writer is None:
+                writer = writer_factory(table.schema)
+            elif table.schema != writer.schema:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_parquet(output_path: str, data: Union[pd.DataFrame, Iterable[pd.DataFrame]]):
+    """写出Parquet文件，data 为多个数据块时逐块写入（各块的列和类型需要一致）"""
+    require_pyarrow("Parquet")
+    write_arrow_tables(lambda schema: pq.ParquetWriter(output_path, schema), as_frames(data))
+
+
+def write_arrow(output_path: str, data: Union[pd.DataFrame, Iterable[pd.DataFrame]]):
+    """写出Arrow IPC文件（Feather v2格式），data 为多个数据块时逐块写入"""
+    require_pyarrow("Arrow")
+    # 与 feather.write_feather 相同，默认使用lz4压缩
+    options = ipc.IpcWriteOptions(compression="lz4" if pa.Codec.is_available("lz4") else None)
+    write_arrow_tables(lambda schema: ipc.new_file(output_path, schema, options=options),
+                       as_frames(data))
+
+
+def write_jsonl(output_path: str, data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                chunk_size: int = 50000) -> int:
+    """逐块写出JSON Lines，缺失值写为 null，返回写入的行数"""
+    total = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for frame in as_frames(data):
+            for start in range(0, len(frame), chunk_size):
+                chunk = frame.iloc[start:start + chunk_size]
+                text = chunk.to_json(orient="records", lines=True, force_ascii=False)
+                f.write(text if text.endswith("\n") else text + "\n")
+            total += len(frame)
+    return total
+
+
+def columnar_columns(mapped: List[str], extra: Sequence[str]) -> List[str]:
+    """列式文件中需要读取的列：映射列加上来源等附加列"""
+    return list(dict.fromkeys(list(mapped) + list(extra)))
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+题目去重
+精确重复：对规范化后（全角转半角、忽略大小写和空白）的题型、题干、选项和答案
+计算64位内容哈希，按哈希去重
+近似重复：对规范化后的题干和选项计算字符n-gram的MinHash签名，
+用局部敏感哈希（LSH）分桶寻找候选对，避免两两比较
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 近似重复题组编号列
+CLUSTER_COLUMN = "相似题组"
+# 精确重复标记列
+DUPLICATE_COLUMN = "重复题"
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def as_text(series: pd.Series) -> pd.Series:
+    """任意类型的列转换为字符串，缺失值为空字符串
+
+    结果保持object类型：Arrow字符串列的正则替换使用RE2，\\w 只匹配ASCII，
+    会把中文当作标点删除
+    """
+    return series.astype(object).where(series.notna(), '').astype(str).astype(object)
+
+
+def normalize_text(series: pd.Series) -> pd.Series:
+    """文本规范化：全角转半角（NFKC，全角标点同时转为半角）、小写、去除空白
+
+    标点和符号保留：3+2 与 3-2、x>1 与 x<1 是不同的题目
+    """
+    return (as_text(series)
+            .str.normalize('NFKC')
+            .str.lower()
+            .str.replace(r'\s+', '', regex=True))
+
+
+def question_text(df: pd.DataFrame, column_map: Dict) -> pd.Series:
+    """题干加选项的规范化文本"""
+    text = pd.Series('', index=df.index)
+    for col in [column_map["question_text"]] + list(column_map["options"]):
+        if col in df.columns:
+            text = text + normalize_text(df[col])
+    return text
+
+
+def content_hash(df: pd.DataFrame, column_map: Dict) -> np.ndarray:
+    """题型、题干、选项和答案规范化后的64位内容哈希"""
+    columns = ([column_map["question_type"], column_map["question_text"]] +
+               list(column_map["options"]) + [column_map["correct_answer"]])
+    normalized = pd.DataFrame({col: normalize_text(df[col])
+                               for col in columns if col in df.columns},
+                              index=df.index)
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def find_exact_duplicates(df: pd.DataFrame, column_map: Dict,
+                          mode: str = "flag") -> Tuple[pd.DataFrame, Dict]:
+    """精确重复检测，按来源顺序保留第一次出现的题目
+
+    mode 为 "flag" 时添加重复标记列；为 "drop" 时删除重复的题目
+    返回处理后的数据和统计信息
+    """
+    duplicated = pd.Series(content_hash(df, column_map), index=df.index).duplicated(keep='first')
+
+    by_source = {}
+    if "来源文件" in df.columns:
+        counts = df.loc[duplicated, "来源文件"].astype(object).value_counts()
+        by_source = {source: int(count) for source, count in counts.items()}
+
+    if mode == "drop":
+        result = df[~duplicated].reset_index(drop=True)
+    else:
+        result = df.copy()
+        result[DUPLICATE_COLUMN] = duplicated.to_numpy()
+
+    stats = {
+        "重复数量": int(duplicated.sum()),
+        "处理方式": "删除" if mode == "drop" else "标记",
+        "按来源统计": by_source,
+    }
+    return result, stats
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 混合函数，使相近的输入得到分散的哈希值"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def minhash_signatures(texts: Sequence[str], num_perm: int = 64, ngram: int = 3,
+                       seed: int = 1, batch_rows: int = 20000) -> np.ndarray:
+    """计算每段文本的MinHash签名，返回形状为 (len(texts), num_perm) 的 uint32 数组
+
+    n-gram 的提取和哈希全部在numpy中按批向量化完成。短于 ngram 的文本整体作为一个 n-gram
+    """
+    rng = np.random.default_rng(seed)
+    mult = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    add = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for batch_start in range(0, len(texts), batch_rows):
+        batch = [text.ljust(ngram, '\0') for text in texts[batch_start:batch_start + batch_rows]]
+        lengths = np.fromiter((len(text) for text in batch), dtype=np.int64, count=len(batch))
+        codes = np.frombuffer(''.join(batch).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+        # 每行的 n-gram 起始位置
+        row_starts = np.cumsum(lengths) - lengths
+        gram_counts = lengths - ngram + 1
+        gram_offsets = np.cumsum(gram_counts) - gram_counts
+        row_ids = np.repeat(np.arange(len(batch)), gram_counts)
+        positions = row_starts[row_ids] + (np.arange(gram_counts.sum()) - gram_offsets[row_ids])
+
+        grams = codes[positions]
+        for k in range(1, ngram):
+            grams = (grams * np.uint64(0x100000001B3)) ^ codes[positions + k]
+        grams = _mix64(grams)
+
+        for i in range(num_perm):
+            hashed = ((grams * mult[i] + add[i]) & _MASK64) >> np.uint64(32)
+            signatures[batch_start:batch_start + len(batch), i] = \
+                np.minimum.reduceat(hashed, gram_offsets).astype(np.uint32)
+
+    return signatures
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, bands: int) -> Tuple[np.ndarray, np.ndarray]:
+    """LSH分桶：签名的某个band完全相同的行成为候选对
+
+    每个桶内只与桶中第一行（行号最小）配对，候选对数量与行数成线性关系。
+    bands 必须在 1 到签名长度之间且能整除签名长度，否则抛出 ValueError
+    （band 为0行时所有题目落入同一个桶）
+    """
+    n, num_perm = signatures.shape
+    if not 1 <= bands <= num_perm or num_perm % bands:
+        raise ValueError(f"lsh_bands ({bands}) 应为 1 到 num_perm ({num_perm}) 之间"
+                         f"且能整除 num_perm 的整数")
+    rows_per_band = num_perm // bands
+    lefts: List[np.ndarray] = []
+    rights: List[np.ndarray] = []
+
+    for band in range(bands):
+        block = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        keys = np.zeros(n, dtype=np.uint64)
+        for col in range(block.shape[1]):
+            keys = _mix64(keys ^ block[:, col])
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        group_start = np.ones(n, dtype=bool)
+        group_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+
+        # 每个位置所在桶的第一行
+        leader_index = np.maximum.accumulate(np.where(group_start, np.arange(n), 0))
+        leaders = order[leader_index]
+        members = ~group_start
+        lefts.append(leaders[members])
+        rights.append(order[members])
+
+    if not lefts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+def connected_labels(n: int, lefts: np.ndarray, rights: np.ndarray) -> np.ndarray:
+    """连通分量标记：每行的标签为所在分量中最小的行号"""
+    labels = np.arange(n)
+    if len(lefts) == 0:
+        return labels
+
+    while True:
+        lu, lv = labels[lefts], labels[rights]
+        if (lu == lv).all():
+            return labels
+        smaller = np.minimum(lu, lv)
+        np.minimum.at(labels, lefts, smaller)
+        np.minimum.at(labels, rights, smaller)
+        # 指针跳跃，直接指向根
+        while True:
+            jumped = labels[labels]
+            if (jumped == labels).all():
+                break
+            labels = jumped
+
+
+def near_duplicate_labels(texts: Sequence[str], threshold: float = 0.8, num_perm: int = 64,
+                          bands: int = 16, ngram: int = 3) -> np.ndarray:
+    """近似重复分组，返回每行所在组中第一行的行号；空文本不参与分组"""
+    n = len(texts)
+    labels = np.arange(n)
+    valid = np.flatnonzero(np.fromiter((bool(text) for text in texts), dtype=bool, count=n))
+    if len(valid) < 2:
+        return labels
+
+    signatures = minhash_signatures([texts[i] for i in valid], num_perm, ngram)
+    lefts, rights = lsh_candidate_pairs(signatures, bands)
+
+    # 用签名一致的比例估计Jaccard相似度，过滤误报
+    similarity = (signatures[lefts] == signatures[rights]).mean(axis=1)
+    keep = similarity >= threshold
+    sub_labels = connected_labels(len(valid), lefts[keep], rights[keep])
+
+    labels[valid] = valid[sub_labels]
+    return labels
+
+
+def find_near_duplicates(df: pd.DataFrame, column_map: Dict, mode: str = "flag",
+                         threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                         ngram: int = 3) -> Tuple[pd.DataFrame, Dict]:
+    """近似重复检测
+
+    mode 为 "flag" 时添加相似题组编号列；为 "drop" 时每组只保留第一道题（按来源顺序）
+    返回处理后的数据和统计信息
+    """
+    texts = question_text(df, column_map).tolist()
+    labels = near_duplicate_labels(texts, threshold, num_perm, bands, ngram)
+
+    group_sizes = np.bincount(labels, minlength=len(labels))
+    in_cluster = group_sizes[labels] > 1
+    cluster_roots = np.unique(labels[in_cluster])
+
+    cluster_ids = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    cluster_ids[in_cluster] = np.searchsorted(cluster_roots, labels[in_cluster]) + 1
+
+    result = df.copy()
+    result[CLUSTER_COLUMN] = cluster_ids
+
+    dropped = 0
+    if mode == "drop":
+        first = labels == np.arange(len(labels))
+        dropped = int((~first).sum())
+        result = result[first].reset_index(drop=True)
+
+    stats = {
+        "相似题组数": int(len(cluster_roots)),
+        "涉及题目数": int(in_cluster.sum()),
+        "删除题目数": dropped,
+    }
+    return result, stats
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件查找
+基于 os.scandir 一次遍历目录树，所有文件模式合并为一个正则表达式一次匹配，
+支持递归子目录和排除模式，自动跳过 Office 锁文件（~$*.xlsx）和隐藏文件
+"""
+import fnmatch
+import glob
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Office 打开文件时生成的锁文件前缀
+LOCK_FILE_PREFIX = "~$"
+
+
+class PatternSet:
+    """一组文件模式，返回第一个匹配的模式序号（即优先级）
+
+    不含路径分隔符的模式匹配文件名，含路径分隔符的模式匹配相对于输入目录的路径
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        name_parts, path_parts = [], []
+        for index, pattern in enumerate(self.patterns):
+            normalized = pattern.replace(os.sep, "/")
+            part = f"(?P<pattern_{index}>{fnmatch.translate(normalized)})"
+            (path_parts if "/" in normalized else name_parts).append(part)
+        self.group_index = {f"pattern_{index}": index for index in range(len(self.patterns))}
+        self.name_regex = re.compile("|".join(name_parts), flags) if name_parts else None
+        self.path_regex = re.compile("|".join(path_parts), flags) if path_parts else None
+        self.path_depth = max((p.replace(os.sep, "/").count("/") for p in self.patterns
+                               if "/" in p.replace(os.sep, "/")), default=0)
+
+    def match(self, name: str, relpath: str) -> Optional[int]:
+        """匹配的模式中序号最小的一个，不匹配时返回None"""
+        best = None
+        for regex, target in ((self.name_regex, name), (self.path_regex, relpath)):
+            if regex is None:
+                continue
+            found = regex.fullmatch(target)
+            if found is None:
+                continue
+            for group, value in found.groupdict().items():
+                if value is not None and group in self.group_index:
+                    index = self.group_index[group]
+                    best = index if best is None else min(best, index)
+        return best
+
+
+def iter_files(root: str, patterns: Iterable[str], recursive: bool = False,
+               excludes: Iterable[str] = ()) -> Iterator[Tuple[int, str]]:
+    """边遍历边产出 (优先级, 文件路径)
+
+    每个目录内按名称排序，先产出文件再进入子目录；不跟随指向目录的符号链接。
+    排除模式匹配的目录整个跳过。绝对路径形式的模式直接用 glob 查找
+    """
+    patterns = list(patterns)
+    relative = [(index, p) for index, p in enumerate(patterns) if not os.path.isabs(p)]
+    for index, pattern in enumerate(patterns):
+        if os.path.isabs(pattern):
+            for path in sorted(glob.glob(pattern)):
+                yield index, path
+
+    include = PatternSet(p for _, p in relative)
+    exclude = PatternSet(excludes)
+    priorities = [index for index, _ in relative]
+    max_depth = None if recursive else include.path_depth
+
+    # (目录, 相对路径前缀, 深度)
+    stack = [(root, "", 0)]
+    while stack:
+        directory, prefix, depth = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith(".") or name.startswith(LOCK_FILE_PREFIX):
+                continue
+            relpath = prefix + name
+            if exclude.match(name, relpath) is not None:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if max_depth is None or depth < max_depth:
+                        subdirs.append((entry.path, relpath + "/", depth + 1))
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            index = include.match(name, relpath)
+            if index is not None:
+                yield priorities[index], entry.path
+
+        stack.extend(reversed(subdirs))
+
+
+def find_files(root: str, patterns: Iterable[str], recursive: bool = False,
+               excludes: Iterable[str] = ()) -> List[str]:
+    """查找所有匹配的文件：先按匹配的模式顺序，再按路径排序"""
+    priorities = {}
+    for priority, path in iter_files(root, patterns, recursive, excludes):
+        priorities[path] = min(priority, priorities.get(path, priority))
+    return sorted(priorities, key=lambda path: (priorities[path], path))
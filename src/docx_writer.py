@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+直接生成OOXML的Word渲染引擎
+不经过 python-docx 的对象模型，把预先模板化的XML片段直接写入 .docx 压缩包中的
+word/document.xml，版式与 python-docx 引擎一致。
+题目按来源切分后可以在多个进程中并行渲染为正文片段，再按来源顺序拼接（题号连续），
+也可以每个来源单独写成一个文档
+"""
+import os
+import re
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# 与 python-docx 默认模板一致的 Normal / Title / Heading 1 样式
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:styles xmlns:w="{W_NS}">'
+    '<w:docDefaults><w:rPrDefault><w:rPr><w:sz w:val="22"/><w:szCs w:val="22"/>'
+    '<w:lang w:val="en-US" w:eastAsia="zh-CN"/></w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr>'
+    '</w:pPrDefault></w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/>'
+    '<w:qFormat/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/>'
+    '<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:pBdr><w:bottom w:val="single" w:sz="8" w:space="4" w:color="4F81BD"/></w:pBdr>'
+    '<w:spacing w:after="300" w:line="240" w:lineRule="auto"/><w:contextualSpacing/></w:pPr>'
+    '<w:rPr><w:color w:val="17365D"/><w:spacing w:val="5"/><w:kern w:val="28"/>'
+    '<w:sz w:val="52"/><w:szCs w:val="52"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+    '<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:keepNext/><w:keepLines/><w:spacing w:before="480" w:after="0"/>'
+    '<w:outlineLvl w:val="0"/></w:pPr>'
+    '<w:rPr><w:b/><w:bCs/><w:color w:val="365F91"/><w:sz w:val="28"/><w:szCs w:val="28"/></w:rPr>'
+    '</w:style>'
+    '</w:styles>'
+)
+
+DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:document xmlns:w="{W_NS}"><w:body>'
+)
+
+DOCUMENT_END = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" '
+    'w:header="720" w:footer="720" w:gutter="0"/>'
+    '<w:cols w:space="720"/><w:docGrid w:linePitch="360"/></w:sectPr>'
+    '</w:body></w:document>'
+)
+
+# 并行渲染时每个任务至少包含的题目数：较小的来源合并为一个任务，减少进程间通信
+RENDER_BATCH_ROWS = 2000
+
+PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+EMPTY_PARAGRAPH = '<w:p/>'
+
+# XML 1.0 不允许的控制字符
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_BREAK_CHARS = re.compile('(\r\n|\r|\n|\t)')
+
+
+def text_xml(text: str) -> str:
+    """文本转换为 w:t 片段，换行和制表符转换为 w:br / w:tab（与 python-docx 的 run.text 一致）"""
+    text = _ILLEGAL_XML_CHARS.sub('', text)
+    parts = []
+    for piece in _BREAK_CHARS.split(text):
+        if not piece:
+            continue
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\r\n', '\r', '\n'):
+            parts.append('<w:br/>')
+        else:
+            parts.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+    return ''.join(parts)
+
+
+def run_xml(text: str, bold: bool = False) -> str:
+    """一个文本run"""
+    props = '<w:rPr><w:b/></w:rPr>' if bold else ''
+    return f'<w:r>{props}{text_xml(text)}</w:r>'
+
+
+def paragraph_xml(runs: Iterable[Tuple[str, bool]], style: Optional[str] = None,
+                  align: Optional[str] = None) -> str:
+    """一个段落，runs 为 (文本, 是否加粗) 序列"""
+    props = ''
+    if style or align:
+        props = '<w:pPr>'
+        if style:
+            props += f'<w:pStyle w:val="{style}"/>'
+        if align:
+            props += f'<w:jc w:val="{align}"/>'
+        props += '</w:pPr>'
+    body = ''.join(run_xml(text, bold) for text, bold in runs)
+    return f'<w:p>{props}{body}</w:p>'
+
+
+def heading_xml(text: str, level: int) -> str:
+    """标题段落，level 0 为文档标题（居中），其余为对应级别的标题"""
+    if level == 0:
+        return paragraph_xml([(text, False)], style="Title", align="center")
+    return paragraph_xml([(text, False)], style=f"Heading{level}")
+
+
+def document_preamble(total: int, title: str = '题库汇总文档',
+                      summary: Optional[str] = None) -> str:
+    """文档标题和统计信息"""
+    if summary is None:
+        summary = f'总计 {total} 道题目'
+    return heading_xml(title, 0) + paragraph_xml([(f'{summary}\n', False)])
+
+
+class QuestionXmlRenderer:
+    """把题目行渲染为XML片段，版式与 python-docx 引擎的 save_word 一致
+
+    rows 为与 columns 对应的元组，缺失值为 None。group_column 的值变化时插入标题
+    （默认按来源文件），page_breaks 为False时标题前不分页
+    """
+
+    def __init__(self, columns: Sequence[str], column_map: Dict, include_analysis: bool = True,
+                 group_column: Optional[str] = "来源文件", page_breaks: bool = True,
+                 include_answer: bool = True):
+        positions = {col: i for i, col in enumerate(columns)}
+        self.source_pos = positions.get(group_column)
+        self.page_breaks = page_breaks
+        self.type_pos = positions.get(column_map["question_type"])
+        self.text_pos = positions.get(column_map["question_text"])
+        self.answer_pos = positions.get(column_map["correct_answer"]) if include_answer else None
+        self.analysis_pos = positions.get(column_map["analysis"]) if include_analysis else None
+        self.option_pos = [(chr(65 + i), positions[opt])
+                           for i, opt in enumerate(column_map["options"]) if opt in positions]
+
+    @staticmethod
+    def value(row: Sequence, pos: Optional[int]):
+        return None if pos is None else row[pos]
+
+    def source_of(self, row: Sequence):
+        return self.value(row, self.source_pos)
+
+    def source_heading(self, source) -> str:
+        """新来源：分页并添加一级标题"""
+        return (PAGE_BREAK if self.page_breaks else '') + heading_xml(f'{source}', 1)
+
+    def question(self, number: int, row: Sequence) -> str:
+        """单道题目：题干、选项、答案、解析和空行"""
+        stem = self.value(row, self.text_pos)
+        parts = [paragraph_xml([
+            (f'{number}. ', True),
+            (f'[{self.value(row, self.type_pos)}] ', False),
+            ('' if stem is None else str(stem), False),
+        ])]
+
+        for letter, pos in self.option_pos:
+            option = row[pos]
+            if option is not None:
+                parts.append(paragraph_xml([(f'{letter}. ', True), (str(option), False)]))
+
+        answer = self.value(row, self.answer_pos)
+        if answer is not None:
+            parts.append(paragraph_xml([('正确答案：', True), (str(answer), False)]))
+
+        analysis = self.value(row, self.analysis_pos)
+        if analysis is not None:
+            parts.append(paragraph_xml([('解析：', True), (str(analysis), False)]))
+
+        parts.append(EMPTY_PARAGRAPH)
+        return ''.join(parts)
+
+    def render(self, rows: Iterable[Sequence], start_number: int = 1,
+               current_source=None) -> Iterable[str]:
+        """依次渲染题目，来源变化时插入分页和来源标题"""
+        number = start_number - 1
+        for row in rows:
+            number += 1
+            source = self.source_of(row)
+            if source != current_source:
+                current_source = source
+                yield self.source_heading(source)
+            yield self.question(number, row)
+
+
+class DocxPackageWriter:
+    """流式写出 .docx 文件
+
+    正文片段先写入临时文件（小于 spool_size 时留在内存），
+    关闭时再与文档开头的片段一起写入压缩包，因此开头的统计信息可以在最后确定
+    """
+
+    def __init__(self, output_path: str, spool_size: int = 16 * 1024 * 1024):
+        self.output_path = output_path
+        self.body = tempfile.SpooledTemporaryFile(max_size=spool_size)
+
+    def write(self, fragment: str):
+        self.body.write(fragment.encode('utf-8'))
+
+    def write_bytes(self, fragment: bytes):
+        """写入已编码为UTF-8的正文片段（并行渲染的结果）"""
+        self.body.write(fragment)
+
+    def write_all(self, fragments: Iterable[str]):
+        buffer: List[str] = []
+        size = 0
+        for fragment in fragments:
+            buffer.append(fragment)
+            size += len(fragment)
+            if size >= 1 << 16:
+                self.write(''.join(buffer))
+                buffer, size = [], 0
+        if buffer:
+            self.write(''.join(buffer))
+
+    def close(self, preamble: str = ''):
+        """写出 .docx 压缩包"""
+        try:
+            with zipfile.ZipFile(self.output_path, 'w', zipfile.ZIP_DEFLATED) as package:
+                package.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+                package.writestr('_rels/.rels', ROOT_RELS_XML)
+                package.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS_XML)
+                package.writestr('word/styles.xml', STYLES_XML)
+                with package.open('word/document.xml', 'w', force_zip64=True) as document:
+                    document.write((DOCUMENT_START + preamble).encode('utf-8'))
+                    self.body.seek(0)
+                    for block in iter(lambda: self.body.read(1 << 20), b""):
+                        document.write(block)
+                    document.write(DOCUMENT_END.encode('utf-8'))
+        finally:
+            self.body.close()
+
+
+def write_question_docx(output_path: str, columns: Sequence[str], rows: Iterable[Sequence],
+                        column_map: Dict, include_analysis: bool = True,
+                        title: str = '题库汇总文档', summary: Optional[str] = None,
+                        group_column: Optional[str] = "来源文件", page_breaks: bool = True,
+                        include_answer: bool = True) -> int:
+    """把题目行写成Word文档，返回题目数量
+
+    title/summary 为文档标题和标题下的说明（默认为题目总数），其余参数见 QuestionXmlRenderer
+    """
+    renderer = QuestionXmlRenderer(columns, column_map, include_analysis, group_column,
+                                   page_breaks, include_answer)
+    writer = DocxPackageWriter(output_path)
+
+    total = 0
+
+    def counted(rows_iter):
+        nonlocal total
+        for row in rows_iter:
+            total += 1
+            yield row
+
+    writer.write_all(renderer.render(counted(rows)))
+    writer.close(document_preamble(total, title, summary))
+    return total
+
+
+def iter_source_sections(rows: Iterable[Sequence], source_pos: Optional[int]
+                         ) -> Iterator[Tuple[object, List[Sequence]]]:
+    """按来源切分连续的题目行，产出 (来源, 行列表)；同一来源不连续时分多次产出"""
+    key = (lambda row: None) if source_pos is None else (lambda row: row[source_pos])
+    for source, group in groupby(rows, key=key):
+        yield source, list(group)
+
+
+def iter_render_batches(rows: Iterable[Sequence], source_pos: Optional[int],
+                        batch_rows: int = RENDER_BATCH_ROWS
+                        ) -> Iterator[Tuple[int, object, List[Sequence]]]:
+    """把题目行按来源合并为渲染任务，产出 (起始题号, 上一个任务的最后来源, 行列表)
+
+    任务只在来源之间切分；上一个来源用于判断任务开头是否需要插入来源标题，
+    因此拼接后的正文与顺序渲染的结果完全相同
+    """
+    number, previous, batch = 1, None, []
+    batch_previous = None
+    for source, section in iter_source_sections(rows, source_pos):
+        batch.extend(section)
+        previous = source
+        if len(batch) >= batch_rows:
+            yield number, batch_previous, batch
+            number += len(batch)
+            batch_previous, batch = previous, []
+    if batch:
+        yield number, batch_previous, batch
+
+
+# 渲染进程中的渲染器（由 _init_renderer 创建）
+_renderer: Optional[QuestionXmlRenderer] = None
+
+
+def _init_renderer(*args):
+    global _renderer
+    _renderer = QuestionXmlRenderer(*args)
+
+
+def _render_batch_task(start_number: int, previous_source, rows: List[Sequence]) -> bytes:
+    """在渲染进程中把一批题目渲染为UTF-8编码的正文片段"""
+    return ''.join(_renderer.render(rows, start_number, previous_source)).encode('utf-8')
+
+
+def write_question_docx_parallel(output_path: str, columns: Sequence[str],
+                                 rows: Iterable[Sequence], column_map: Dict,
+                                 include_analysis: bool = True, workers: int = 2,
+                                 title: str = '题库汇总文档', summary: Optional[str] = None,
+                                 group_column: Optional[str] = "来源文件",
+                                 page_breaks: bool = True, include_answer: bool = True,
+                                 batch_rows: int = RENDER_BATCH_ROWS) -> int:
+    """在 workers 个进程中按来源并行渲染，再按顺序拼接为一个Word文档，返回题目数量
+
+    输出与 write_question_docx 相同。同时提交的任务数不超过进程数的两倍，
+    已渲染的片段按顺序写入后即释放，内存占用与题库大小无关
+    """
+    renderer_args = (columns, column_map, include_analysis, group_column, page_breaks,
+                     include_answer)
+    source_pos = QuestionXmlRenderer(*renderer_args).source_pos
+    writer = DocxPackageWriter(output_path)
+
+    total = 0
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_renderer,
+                             initargs=renderer_args) as executor:
+        for start, previous, batch in iter_render_batches(rows, source_pos, batch_rows):
+            pending.append(executor.submit(_render_batch_task, start, previous, batch))
+            total += len(batch)
+            if len(pending) >= 2 * workers:
+                writer.write_bytes(pending.popleft().result())
+        while pending:
+            writer.write_bytes(pending.popleft().result())
+
+    writer.close(document_preamble(total, title, summary))
+    return total
+
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def source_filename(source) -> str:
+    """来源名称转换为文件名（去掉路径中不允许的字符）"""
+    name = _UNSAFE_FILENAME_CHARS.sub('_', '' if source is None else str(source)).strip(' .')
+    return name or '未知来源'
+
+
+def _write_source_task(output_path: str, columns: Sequence[str], rows: List[Sequence],
+                       column_map: Dict, include_analysis: bool, include_answer: bool,
+                       title: str) -> int:
+    """单个来源的文档：标题为来源名称，不再插入来源标题"""
+    return write_question_docx(output_path, columns, rows, column_map, include_analysis,
+                               title=title, group_column=None, include_answer=include_answer)
+
+
+def write_source_docx(output_dir: str, columns: Sequence[str], rows: Iterable[Sequence],
+                      column_map: Dict, include_analysis: bool = True, workers: int = 1,
+                      group_column: str = "来源文件",
+                      include_answer: bool = True) -> List[str]:
+    """每个来源写成一个Word文档（题号从1开始），workers 大于1时在多个进程中并行写出
+
+    题目按来源逐段读取，同时提交的任务数不超过进程数的两倍，内存占用只与最大的来源有关。
+    文件名相同的来源（去掉不允许的字符后，或同一来源不连续出现时）依次加上 _2、_3 等后缀。
+    返回按来源顺序排列的文件路径
+    """
+    source_pos = {col: i for i, col in enumerate(columns)}.get(group_column)
+    os.makedirs(output_dir, exist_ok=True)
+    used = set()
+    paths: List[str] = []
+
+    def tasks():
+        for source, section in iter_source_sections(rows, source_pos):
+            name = source_filename(source)
+            candidate, suffix = name, 1
+            while candidate.lower() in used:
+                suffix += 1
+                candidate = f'{name}_{suffix}'
+            used.add(candidate.lower())
+            path = os.path.join(output_dir, f'{candidate}.docx')
+            paths.append(path)
+            yield (path, columns, section, column_map, include_analysis, include_answer,
+                   '未知来源' if source is None else str(source))
+
+    if workers <= 1:
+        for task in tasks():
+            _write_source_task(*task)
+        return paths
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for task in tasks():
+            pending.append(executor.submit(_write_source_task, *task))
+            if len(pending) >= 2 * workers:
+                pending.popleft().result()
+        while pending:
+            pending.popleft().result()
+    return paths
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动匹配列名
+按同义词和模糊匹配把文件表头中的列对应到题型、题干、答案等标准字段
+（题干/问题/Question、选项A/Option A/A 等），不需要为每种导出格式编写配置。
+匹配结果按表头指纹（表头各列名称的哈希）和匹配设置（同义词和模糊匹配阈值的哈希）
+保存在磁盘上的版式登记表中，表头和设置都相同的文件直接使用登记的结果，不再探测表头和匹配列名
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+import tempfile
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+REGISTRY_VERSION = 2
+
+# 版式登记表的默认文件名（相对路径相对于配置文件所在的目录）
+DEFAULT_REGISTRY = ".column_layouts.json"
+
+# 标准字段的同义词（比较前统一规范化：全角转半角、小写、去除空白、标点和括号中的说明）
+FIELD_SYNONYMS: Dict[str, List[str]] = {
+    "question_type": ["题型", "题目类型", "试题类型", "类型", "题类", "question type", "type",
+                      "qtype", "item type"],
+    "question_text": ["题干", "题目", "问题", "试题", "题目内容", "试题内容", "题面", "question",
+                      "question text", "stem", "content", "item"],
+    "correct_answer": ["正确答案", "答案", "参考答案", "标准答案", "answer", "correct answer",
+                       "key", "answer key", "solution"],
+    "analysis": ["解析", "答案解析", "试题解析", "题目解析", "分析", "详解", "explanation",
+                 "analysis", "rationale"],
+    "score": ["分值", "分数", "得分", "题目分值", "score", "points", "marks", "point"],
+    "difficulty": ["难度系数", "难度", "难易程度", "难易度", "difficulty", "difficulty level",
+                   "level"],
+}
+
+# 必须匹配到的字段，否则认为该行不是表头
+REQUIRED_FIELDS = ("question_type", "question_text")
+
+# 包含同义词（例如“题干（必填）”）时的得分
+CONTAINS_SCORE = 0.9
+
+_NOTE = re.compile(r'[(\[{（【].*?[)\]}）】]')
+_PUNCT = re.compile(r'[\W_]+')
+# 选项列：选项A、Option A、A、A选项、选项1
+_OPTION = re.compile(r'^(?:选项|option|opt|choice)?([a-z]|[1-9])(?:选项|项)?$')
+
+
+def normalize_header(name) -> str:
+    """列名规范化：全角转半角、小写，去掉括号中的说明、空白和标点"""
+    text = unicodedata.normalize('NFKC', str(name)).lower()
+    return _PUNCT.sub('', _NOTE.sub('', text))
+
+
+def header_fingerprint(names: Sequence) -> str:
+    """表头指纹：各列名称原文（空单元格为空字符串，忽略末尾的空单元格）的哈希
+
+    登记的匹配结果按原文取列，因此使用原文而不是规范化后的名称
+    """
+    text = '\x1f'.join('' if name is None else str(name) for name in names).rstrip('\x1f')
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def matching_key(synonyms: Optional[Dict[str, List[str]]] = None,
+                 threshold: float = 0.8) -> str:
+    """匹配设置的哈希：内置和配置的同义词、模糊匹配阈值，任一变化时登记的匹配结果不再使用"""
+    settings = {"builtin": FIELD_SYNONYMS, "synonyms": synonyms or {},
+                "threshold": threshold, "contains": CONTAINS_SCORE}
+    text = json.dumps(settings, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def option_index(name: str) -> Optional[int]:
+    """选项列的序号（A为0），不是选项列时返回None"""
+    match = _OPTION.match(name)
+    if match is None:
+        return None
+    letter = match.group(1)
+    return int(letter) - 1 if letter.isdigit() else ord(letter) - ord('a')
+
+
+def match_score(name: str, synonyms: Sequence[str]) -> float:
+    """列名与一组同义词的最高相似度：完全相同为1，包含同义词为 CONTAINS_SCORE，否则为编辑相似度"""
+    best = 0.0
+    for synonym in synonyms:
+        if name == synonym:
+            return 1.0
+        if len(synonym) >= 2 and synonym in name:
+            best = max(best, CONTAINS_SCORE)
+        else:
+            best = max(best, difflib.SequenceMatcher(None, name, synonym).ratio())
+    return best
+
+
+def resolve_columns(names: Sequence, synonyms: Optional[Dict[str, List[str]]] = None,
+                    threshold: float = 0.8) -> Optional[Dict]:
+    """把一行表头匹配到标准字段
+
+    返回 {字段: 列名, "options": [选项A的列名, ...]}（列名为表头中的原始文本），
+    没有匹配到题型和题干时返回None。每列只对应一个字段，得分高的先匹配
+    """
+    extra = synonyms or {}
+    synonyms = {field: [normalize_header(word) for word in words + extra.get(field, [])]
+                for field, words in FIELD_SYNONYMS.items()}
+    columns = [(str(name), normalize_header(name)) for name in names if name is not None]
+    columns = [(raw, norm) for raw, norm in columns if norm]
+
+    # 选项列按模式匹配，同一序号取第一列
+    options: Dict[int, str] = {}
+    used = set()
+    for raw, norm in columns:
+        index = option_index(norm)
+        if index is not None and index not in options:
+            options[index] = raw
+            used.add(raw)
+
+    candidates: List[Tuple[float, int, str, str]] = []
+    for position, (raw, norm) in enumerate(columns):
+        if raw in used:
+            continue
+        for field, words in synonyms.items():
+            score = match_score(norm, words)
+            if score >= threshold:
+                candidates.append((score, -position, field, raw))
+
+    resolved: Dict = {}
+    for score, _, field, raw in sorted(candidates, reverse=True):
+        if field not in resolved and raw not in used:
+            resolved[field] = raw
+            used.add(raw)
+
+    if not all(field in resolved for field in REQUIRED_FIELDS):
+        return None
+    # 选项从A开始连续排列，缺少的选项为None
+    resolved["options"] = [options.get(i) for i in range(max(options) + 1)] if options else []
+    return resolved
+
+
+class LayoutRegistry:
+    """匹配设置哈希:表头指纹 -> 列名匹配结果，保存为JSON文件
+
+    多个进程可以同时使用同一个登记表：保存时先读取文件中已有的记录再合并写入，
+    并发写入时丢失的记录只会在下次遇到该版式时重新匹配
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.layouts: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        """加载登记表，文件损坏或版本不符时视为空"""
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if isinstance(data, dict) and data.get("version") == REGISTRY_VERSION:
+            self.layouts.update(data.get("layouts", {}))
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.layouts.get(key)
+
+    def put(self, key: str, layout: Dict):
+        self.layouts[key] = layout
+        self.save()
+
+    def save(self):
+        """与文件中的记录合并后写入（先写临时文件再替换）"""
+        if not self.path:
+            return
+        current = self.layouts
+        self.layouts = {}
+        self.load()
+        self.layouts.update(current)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".layouts_", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"version": REGISTRY_VERSION, "layouts": self.layouts},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+class LayoutResolver:
+    """在文件的前几行中找出表头并匹配列名，结果转换为配置中的标准列名
+
+    resolve() 的返回值为 (表头行号, {文件中的列名: 配置中的列名})，可直接传给
+    reader.read_mapped_columns 的 resolve_layout 参数
+    """
+
+    def __init__(self, column_map: Dict, registry: LayoutRegistry,
+                 synonyms: Optional[Dict[str, List[str]]] = None, threshold: float = 0.8):
+        self.column_map = column_map
+        self.registry = registry
+        self.synonyms = synonyms or {}
+        self.threshold = threshold
+        self.settings_key = matching_key(self.synonyms, threshold)
+        self.hits = 0
+        self.misses = 0
+
+    def rename_map(self, layout: Dict) -> Dict[str, str]:
+        """匹配结果转换为 {文件中的列名: 配置中的列名}，超出配置数量的选项忽略"""
+        renames = {}
+        for field in FIELD_SYNONYMS:
+            if layout.get(field) is not None:
+                renames[layout[field]] = self.column_map[field]
+        for source, target in zip(layout.get("options", []), self.column_map["options"]):
+            if source is not None:
+                renames[source] = target
+        return renames
+
+    def resolve(self, rows: Sequence[Sequence]) -> Optional[Tuple[int, Dict[str, str]]]:
+        """以相同设置登记过的表头直接使用登记的结果；否则逐行匹配，取匹配字段最多的行（同数取靠前的行）"""
+        keys = [f"{self.settings_key}:{header_fingerprint(row)}" for row in rows]
+        for index, key in enumerate(keys):
+            layout = self.registry.get(key)
+            if layout is not None:
+                self.hits += 1
+                return index, self.rename_map(layout)
+
+        best = None
+        for index, row in enumerate(rows):
+            layout = resolve_columns(row, self.synonyms, self.threshold)
+            if layout is None:
+                continue
+            matched = sum(1 for field in FIELD_SYNONYMS if field in layout) + \
+                sum(1 for option in layout["options"] if option is not None)
+            if best is None or matched > best[0]:
+                best = (matched, index, layout)
+        if best is None:
+            return None
+
+        _, index, layout = best
+        self.misses += 1
+        self.registry.put(keys[index], layout)
+        renames = self.rename_map(layout)
+        changed = [f"{source}→{target}" for source, target in renames.items() if source != target]
+        print("  自动匹配列名（新版式）: " + ("，".join(changed) if changed else "列名与配置一致"))
+        return index, renames
@@ -3,30 +3,72 @@
 """
 题库合并工具
 支持自定义Excel格式，将多个题库文件合并成一个统一的Word或Excel文档
+
+pandas、numpy、openpyxl 和 python-docx 在需要它们的阶段才导入，
+--help 和 --check-config 只需要标准库
 """
-import pandas as pd
+from __future__ import annotations
+
+import importlib.util
 import os
-import glob
 import json
 import argparse
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-
-try:
-    from docx import Document
-    from docx.shared import Pt
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from discovery import find_files
+from metrics import MetricsRecorder
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 只检查是否安装，python-docx 在生成Word文档时才导入
+DOCX_AVAILABLE = importlib.util.find_spec("docx") is not None
+if not DOCX_AVAILABLE:
     print("警告: python-docx 未安装，无法生成Word文档")
 
 
+# 工作表数量达到该值时才并行解析
+MIN_PARALLEL_SHEETS = 4
+
+# 列式输出格式（output_settings 中的 <格式>_filename 和命令行 --output-<格式>）
+COLUMNAR_FORMAT_NAMES = {"parquet": "Parquet", "arrow": "Arrow", "jsonl": "JSONL"}
+
+
 class QuestionBankMerger:
-    def __init__(self, config_path: str = "config/config.json"):
-        """初始化题库合并工具"""
-        self.config = self.load_config(config_path)
+    def __init__(self, config_path: str = "config/config.json", workers: int = 1,
+                 config: Optional[Dict] = None, cache_dir: Optional[str] = None,
+                 cache_max_mb: Optional[float] = None, metrics: bool = False):
+        """初始化题库合并工具
+
+        workers: 并行解析文件的进程数，1 为顺序读取，0 或负数表示使用全部CPU核心
+        config: 直接传入已加载的配置（优先于 config_path）
+        cache_dir: 已解析文件的缓存目录，为None时不使用缓存
+        cache_max_mb: 缓存容量上限（MB），超出时按LRU淘汰
+        metrics: 记录各阶段的耗时、CPU时间、行数和峰值内存（通过 get_metrics() 获取）
+        """
+        self.config = config if config is not None else self.load_config(config_path)
+        if config is None:
+            self.resolve_config_paths(os.path.dirname(os.path.abspath(config_path)))
+        self.workers = workers
         self.merged_data = None
+        # 按内存预算合并时溢出到磁盘的数据（见 merge_spilled），此时 merged_data 为None
+        self.spilled = None
+        self.spill_report: Dict = {}
+        # 组卷索引（见 paper_assembler），合并结果变化后重新建立
+        self.paper_index = None
+        self.failed_files: Dict[str, str] = {}
+        self.dedup_stats: Dict = {}
+        self.validation_stats: Dict = {}
+        self.metrics = MetricsRecorder(enabled=metrics)
+        # 自动匹配列名（见 get_layout_resolver），第一次读取文件时创建
+        self.layout_resolver = None
+
+        self.cache = None
+        if cache_dir:
+            max_bytes = int(cache_max_mb * 1024 * 1024) if cache_max_mb else None
+            from cache import ParsedFileCache
+            self.cache = ParsedFileCache(cache_dir, self.config, max_bytes)
 
     def load_config(self, config_path: str) -> Dict:
         """加载配置文件"""
@@ -40,6 +82,17 @@ class QuestionBankMerger:
             print(f"配置文件格式错误: {e}")
             return self.get_default_config()
 
+    def resolve_config_paths(self, config_dir: str):
+        """配置中的相对路径（版式登记表）改为相对于配置文件所在的目录
+
+        直接传入的配置（例如工作进程收到的配置）已经解析过，不再处理
+        """
+        from mapping import DEFAULT_REGISTRY
+
+        mapping_settings = self.config.setdefault("mapping_settings", {})
+        registry = mapping_settings.get("registry") or DEFAULT_REGISTRY
+        mapping_settings["registry"] = os.path.join(config_dir, registry)
+
     def get_default_config(self) -> Dict:
         """获取默认配置"""
         return {
@@ -48,7 +101,11 @@ class QuestionBankMerger:
                 "header_row_index": 1,  # 第2行（0-based为1）
                 "data_start_row": 2,    # 第3行开始是数据
                 "skip_description_row": True,
-                "description_row_index": 0
+                "description_row_index": 0,
+                "auto_detect_header": False,
+                "header_probe_rows": 10,
+                "compact_dtypes": True,
+                "sheets": None
             },
             "column_mapping": {
                 "question_type": "题型",
@@ -62,8 +119,52 @@ class QuestionBankMerger:
             "output_settings": {
                 "excel_filename": "merged_questions.xlsx",
                 "word_filename": "merged_questions.docx",
+                "sqlite_filename": "merged_questions.db",
+                "parquet_filename": None,
+                "arrow_filename": None,
+                "jsonl_filename": None,
                 "include_analysis": True,
-                "include_difficulty": True
+                "include_difficulty": True,
+                "excel_sheet_rollover": True,
+                "word_engine": "python-docx",
+                "word_per_source": False
+            },
+            "dedup_settings": {
+                "exact_duplicates": "off",
+                "near_duplicates": "off",
+                "similarity_threshold": 0.8,
+                "num_perm": 64,
+                "lsh_bands": 16,
+                "ngram_size": 3
+            },
+            "validation_settings": {
+                "mode": "off",
+                "single_choice_types": ["单选题"],
+                "multi_choice_types": ["多选题"],
+                "judge_types": ["判断题"],
+                "judge_answers": ["对", "错"]
+            },
+            "discovery_settings": {
+                "recursive": False,
+                "exclude_patterns": ["output"]
+            },
+            "spill_settings": {
+                "memory_budget_mb": None,
+                "spill_dir": None,
+                "chunk_rows": 20000
+            },
+            "mapping_settings": {
+                "auto": False,
+                "registry": ".column_layouts.json",
+                "fuzzy_threshold": 0.8,
+                "synonyms": {}
+            },
+            "server_settings": {
+                "host": "127.0.0.1",
+                "port": 8765,
+                "socket": None,
+                "upload_dir": None,
+                "max_upload_mb": 200
             },
             "file_patterns": [
                 "*_习题导出.xlsx",
@@ -74,10 +175,7 @@ class QuestionBankMerger:
         }
 
     def detect_format(self, filepath: str) -> Dict:
-        """自动检测Excel文件格式"""
-        df = pd.read_excel(filepath, engine='openpyxl', header=None)
-
-        # 检测结构
+        """自动检测Excel文件格式（只读取前几行）"""
         format_info = {
             "has_header": True,
             "header_row": 1,
@@ -85,65 +183,202 @@ class QuestionBankMerger:
             "columns": []
         }
 
-        # 查找包含"题型"的行作为表头
-        for idx, row in df.iterrows():
-            if idx >= 5:  # 只检查前5行
-                break
-            for cell in row:
-                if pd.notna(cell) and '题型' in str(cell):
-                    format_info["header_row"] = idx
-                    format_info["data_start"] = idx + 1
-                    return format_info
+        from reader import HEADER_KEYWORDS, probe_layout
+
+        keywords = HEADER_KEYWORDS + self.get_mapped_columns()
+        layout = probe_layout(filepath, self.get_probe_rows(), keywords)
+        if layout is not None:
+            format_info.update(layout)
 
         return format_info
 
+    def get_probe_rows(self) -> int:
+        """表头探测读取的行数"""
+        from reader import DEFAULT_PROBE_ROWS
+        return self.config["excel_settings"].get("header_probe_rows", DEFAULT_PROBE_ROWS)
+
     def read_excel_file(self, filepath: str) -> pd.DataFrame:
-        """读取Excel文件"""
+        """读取题库文件（Excel，或 Parquet/Arrow/JSONL）"""
         print(f"正在读取: {filepath}")
 
-        try:
-            # 根据配置读取文件
-            if self.config["excel_settings"]["skip_description_row"]:
-                # 跳过描述行的情况 - 先读取所有行再处理
-                df_temp = pd.read_excel(filepath, engine='openpyxl', header=None)
-                column_names = df_temp.iloc[self.config["excel_settings"]["header_row_index"]]
-                data = df_temp[self.config["excel_settings"]["data_start_row"]:].copy()
-                data.columns = column_names
-                df = data
-            else:
-                # 直接读取
-                df = pd.read_excel(
-                    filepath,
-                    engine='openpyxl',
-                    header=self.config["excel_settings"]["header_row_index"]
-                )
+        with self.metrics.stage("read_file", file=filepath) as stage:
+            df = self._read_excel_file(filepath)
+            stage.rows = len(df)
+        return df
 
-            # 重置索引
-            df.reset_index(drop=True, inplace=True)
+    def _read_excel_file(self, filepath: str) -> pd.DataFrame:
+        import numpy as np
+        import pandas as pd
+        from schema import SHEET_COLUMN, SOURCE_COLUMN, concat_frames, source_column
 
-            # 清理数据
-            df = self.clean_data(df)
+        try:
+            sheets = self.get_selected_sheets(filepath)
+            if sheets is None:
+                df = self.read_sheet(filepath)
+            else:
+                frames = self.read_sheets(filepath, sheets)
+                df = concat_frames(frames) if frames else pd.DataFrame()
 
-            # 添加文件来源信息
+            # 添加文件来源信息（重新加载的合并结果保留原来的来源文件）
             filename = Path(filepath).stem
-            df["来源文件"] = filename
+            compact = self.config["excel_settings"].get("compact_dtypes", True)
+            if SOURCE_COLUMN not in df.columns:
+                if compact:
+                    df[SOURCE_COLUMN] = source_column(filename, len(df))
+                else:
+                    df[SOURCE_COLUMN] = filename
+
+            if sheets is not None:
+                # 工作表名称列
+                codes = np.repeat(np.arange(len(sheets)), [len(frame) for frame in frames])
+                sheet_names = pd.Categorical.from_codes(codes, categories=sheets)
+                sheet_names = sheet_names.remove_unused_categories()
+                df[SHEET_COLUMN] = sheet_names if compact else sheet_names.astype(object)
+                print(f"  读取了 {len(sheets)} 个工作表")
 
             print(f"  [SUCCESS] 成功读取 {len(df)} 道题目")
             return df
 
         except Exception as e:
             print(f"  [ERROR] 读取失败: {e}")
+            self.failed_files[filepath] = str(e)
             return pd.DataFrame()
 
+    def get_selected_sheets(self, filepath: str) -> Optional[List[str]]:
+        """按 excel_settings.sheets 选择的工作表，未配置时返回None（只读取第一个工作表）"""
+        from columnar import COLUMNAR_SUFFIXES
+        from reader import list_sheet_names, select_sheets
+
+        selectors = self.config["excel_settings"].get("sheets")
+        if selectors is None or Path(filepath).suffix.lower() in COLUMNAR_SUFFIXES:
+            return None
+        return select_sheets(list_sheet_names(filepath), selectors)
+
+    def read_sheets(self, filepath: str, sheets: List[str]) -> List[pd.DataFrame]:
+        """读取多个工作表，结果顺序与工作表顺序一致
+
+        工作表较多且允许多进程时（workers 不为1）并行解析，每个进程独立打开工作簿
+        """
+        workers = self.get_worker_count(len(sheets))
+        if workers == 1 or len(sheets) < MIN_PARALLEL_SHEETS:
+            return [self.read_sheet(filepath, sheet) for sheet in sheets]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        print(f"  使用 {workers} 个进程并行读取 {len(sheets)} 个工作表")
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.config, self.metrics.enabled)) as executor:
+            futures = [executor.submit(_read_sheet_task, filepath, sheet) for sheet in sheets]
+            frames = []
+            for future in futures:
+                data, records = future.result()
+                self.metrics.extend(records)
+                frames.append(data)
+        return frames
+
+    def read_sheet(self, filepath: str, sheet: Optional[str] = None) -> pd.DataFrame:
+        """读取并清理一个工作表，sheet 为None时读取第一个工作表"""
+        import pandas as pd
+        from columnar import COLUMNAR_SUFFIXES, columnar_columns, read_columnar
+        from reader import STREAMING_SUFFIXES, read_mapped_columns
+        from schema import SHEET_COLUMN, SOURCE_COLUMN
+
+        excel_settings = self.config["excel_settings"]
+        header_row = excel_settings["header_row_index"]
+
+        # 根据配置读取文件
+        suffix = Path(filepath).suffix.lower()
+        if suffix in COLUMNAR_SUFFIXES:
+            # 列式文件按列名只读取映射的列，以及合并结果中的来源文件和工作表列
+            df = read_columnar(filepath, columnar_columns(self.get_mapped_columns(),
+                                                          (SOURCE_COLUMN, SHEET_COLUMN)))
+        elif suffix in STREAMING_SUFFIXES:
+            # 流式读取，只保留映射的列
+            if excel_settings["skip_description_row"]:
+                data_start = excel_settings["data_start_row"]
+            else:
+                data_start = header_row + 1
+            if excel_settings.get("auto_detect_header", False):
+                # 在读取的同时探测表头位置
+                header_row = None
+            resolver = self.get_layout_resolver()
+            df = read_mapped_columns(filepath, header_row, data_start,
+                                     self.get_mapped_columns(),
+                                     probe_rows=self.get_probe_rows(), sheet=sheet,
+                                     resolve_layout=resolver.resolve if resolver else None)
+        elif self.get_layout_resolver() is not None:
+            # 自动匹配列名：先读取前几行确定表头，再按文件中的列名解析
+            sheet_name = 0 if sheet is None else sheet
+            head = pd.read_excel(filepath, sheet_name=sheet_name, header=None,
+                                 nrows=self.get_probe_rows())
+            rows = [tuple(None if pd.isna(cell) else cell for cell in row)
+                    for row in head.itertuples(index=False, name=None)]
+            resolved = self.get_layout_resolver().resolve(rows)
+            if resolved is None:
+                df = pd.DataFrame()
+            else:
+                header_row, renames = resolved
+                df = pd.read_excel(filepath, sheet_name=sheet_name, header=header_row,
+                                   usecols=lambda name: str(name) in renames)
+                df = df.rename(columns=lambda name: renames.get(str(name), name))
+        else:
+            # 按表头名只解析映射的列
+            mapped = set(self.get_mapped_columns())
+            df = pd.read_excel(filepath, sheet_name=0 if sheet is None else sheet,
+                               header=header_row, usecols=lambda name: str(name) in mapped)
+            if excel_settings["skip_description_row"]:
+                # 表头和数据之间的行不是题目
+                df = df.iloc[max(excel_settings["data_start_row"] - header_row - 1, 0):]
+
+        # 重置索引
+        df.reset_index(drop=True, inplace=True)
+
+        # 清理数据
+        with self.metrics.stage("clean", file=filepath) as stage:
+            df = self.clean_data(df)
+            stage.rows = len(df)
+        return df
+
+    def get_layout_resolver(self):
+        """mapping_settings.auto 为True时返回自动匹配列名的 LayoutResolver，否则返回None
+
+        匹配结果按表头指纹和匹配设置保存在 mapping_settings.registry 指定的文件中，
+        表头和设置（synonyms、fuzzy_threshold）都相同的文件不再重新匹配
+        """
+        settings = self.config.get("mapping_settings", {})
+        if not settings.get("auto", False):
+            return None
+        if self.layout_resolver is None:
+            from mapping import DEFAULT_REGISTRY, LayoutRegistry, LayoutResolver
+            registry = LayoutRegistry(settings.get("registry", DEFAULT_REGISTRY))
+            self.layout_resolver = LayoutResolver(self.config["column_mapping"], registry,
+                                                  settings.get("synonyms"),
+                                                  settings.get("fuzzy_threshold", 0.8))
+        return self.layout_resolver
+
+    def get_mapped_columns(self) -> List[str]:
+        """配置中映射的所有列名"""
+        column_mapping = self.config["column_mapping"]
+        columns = [column_mapping[key] for key in
+                   ("question_type", "question_text", "correct_answer",
+                    "analysis", "score", "difficulty")]
+        return columns + list(column_mapping["options"])
+
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """清理数据"""
+        import pandas as pd
+        from schema import SHEET_COLUMN, SOURCE_COLUMN, compact_frame
+
         # 获取题型列名
         question_type_col = self.config["column_mapping"]["question_type"]
 
         # 检查该列是否存在
         if question_type_col not in df.columns:
             print(f"  [ERROR] 未找到题型列: '{question_type_col}'")
-            print(f"  可用的列: {list(df.columns)}")
+            print(f"  可用的列: {df.attrs.get('header', list(df.columns))}")
+            if self.get_layout_resolver() is None:
+                print("  提示: 列名与配置不同时可以使用 --auto-map 自动匹配列名")
             return pd.DataFrame()
 
         # 移除空行
@@ -156,21 +391,13 @@ class QuestionBankMerger:
         # 标准化列名
         column_mapping = self.config["column_mapping"]
 
-        # 创建新的DataFrame
-        new_df = pd.DataFrame()
-
         # 必需的列
         required_columns = [
-            "来源文件",
             column_mapping["question_type"],
             column_mapping["question_text"],
             column_mapping["correct_answer"]
         ]
 
-        for col in required_columns:
-            if col in df.columns:
-                new_df[col] = df[col]
-
         # 可选的列
         optional_columns = [
             column_mapping["analysis"],
@@ -178,28 +405,41 @@ class QuestionBankMerger:
             column_mapping["difficulty"]
         ]
 
-        for col in optional_columns:
-            if col in df.columns:
-                new_df[col] = df[col]
+        # 按 必需列、可选列、选项列 的顺序一次性选出（重复的列名只取一次），
+        # 重新加载的合并结果中的来源文件和工作表列放在最后，与合并结果的列顺序一致
+        selected = dict.fromkeys(col for col in
+                                 required_columns + optional_columns + list(column_mapping["options"])
+                                 + [SOURCE_COLUMN, SHEET_COLUMN]
+                                 if col in df.columns)
+        new_df = df[list(selected)]
 
-        # 选项列
-        for opt in column_mapping["options"]:
-            if opt in df.columns:
-                new_df[opt] = df[opt]
+        if self.config["excel_settings"].get("compact_dtypes", True):
+            # 分类、数值和Arrow字符串列
+            new_df = compact_frame(new_df, column_mapping)
 
         return new_df
 
+    def get_discovery_args(self, file_pattern: str = None) -> Tuple[List[str], bool, List[str]]:
+        """文件模式、是否递归子目录和排除模式"""
+        settings = self.config.get("discovery_settings", {})
+        patterns = [file_pattern] if file_pattern is not None else self.config["file_patterns"]
+        return (patterns, settings.get("recursive", False),
+                settings.get("exclude_patterns", []))
+
+    def find_files(self, input_dir: str = ".", file_pattern: str = None) -> List[str]:
+        """查找输入目录中匹配的文件，先按匹配的模式顺序，再按路径排序"""
+        with self.metrics.stage("discovery") as stage:
+            files = find_files(input_dir, *self.get_discovery_args(file_pattern))
+            stage.rows = len(files)
+        return files
+
     def merge_files(self, input_dir: str = ".", file_pattern: str = None) -> pd.DataFrame:
         """合并所有Excel文件"""
-        if file_pattern is None:
-            # 尝试多个模式
-            all_files = []
-            for pattern in self.config["file_patterns"]:
-                files = glob.glob(os.path.join(input_dir, pattern))
-                all_files.extend(files)
-            files = list(set(all_files))  # 去重
-        else:
-            files = glob.glob(os.path.join(input_dir, file_pattern))
+        import pandas as pd
+        from schema import concat_frames
+
+        self.close_spilled()
+        files = self.find_files(input_dir, file_pattern)
 
         if not files:
             print("未找到任何Excel文件")
@@ -207,23 +447,330 @@ class QuestionBankMerger:
 
         print(f"找到 {len(files)} 个文件")
 
-        all_data = []
-        for file in sorted(files):
-            data = self.read_excel_file(file)
-            if not data.empty:
-                all_data.append(data)
+        all_data = [data for data in self.read_files(files) if not data.empty]
+
+        if self.failed_files:
+            print(f"\n[WARNING] {len(self.failed_files)} 个文件读取失败:")
+            for file, error in self.failed_files.items():
+                print(f"  {file}: {error}")
 
         if all_data:
-            self.merged_data = pd.concat(all_data, ignore_index=True)
+            with self.metrics.stage("concat", rows=sum(len(data) for data in all_data)):
+                self.merged_data = concat_frames(all_data)
             print(f"\n成功合并 {len(self.merged_data)} 道题目")
+            with self.metrics.stage("dedup", rows=len(self.merged_data)):
+                self.merged_data = self.deduplicate(self.merged_data)
+            with self.metrics.stage("validate", rows=len(self.merged_data)):
+                self.merged_data = self.validate_answers(self.merged_data)
             return self.merged_data
         else:
             print("没有成功读取任何文件")
             return pd.DataFrame()
 
+    def merge_pipeline(self, input_dir: str = ".", file_pattern: str = None,
+                       excel_path: Optional[str] = None, word_path: Optional[str] = None,
+                       queue_size: int = 4, sqlite_path: Optional[str] = None) -> Dict:
+        """流水线模式：读取与Excel/Word写出同时进行，返回统计报告
+
+        不保留合并后的完整数据（merged_data 为None），内存占用由 queue_size 决定。
+        excel_path/word_path/sqlite_path 为None的输出不生成；Word 总是使用 ooxml 引擎，
+        近似重复检测需要完整数据，在此模式下不执行
+        """
+        from pipeline import MergePipeline
+
+        # 与一次性合并相同的文件顺序（先按匹配的模式，再按路径），输出中的题目顺序一致
+        files = self.find_files(input_dir, file_pattern)
+        if not files:
+            print("未找到任何Excel文件")
+            return {}
+
+        print(f"找到 {len(files)} 个文件，开始合并（流水线模式）")
+        if self.config.get("dedup_settings", {}).get("near_duplicates", "off") != "off":
+            print("[WARNING] 流水线模式不支持近似重复检测，已跳过")
+
+        for path in (excel_path, word_path, sqlite_path):
+            if path:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.failed_files = {}
+        self.merged_data = None
+        self.close_spilled()
+        pipeline = MergePipeline(self, excel_path, word_path, queue_size, sqlite_path)
+        with self.metrics.stage("pipeline") as stage:
+            report = pipeline.run(files)
+            stage.rows = report["总题目数"]
+
+        if self.failed_files:
+            print(f"\n[WARNING] {len(self.failed_files)} 个文件读取失败:")
+            for file, error in self.failed_files.items():
+                print(f"  {file}: {error}")
+
+        print(f"\n成功合并 {report['总题目数']} 道题目")
+        if excel_path:
+            print(f"[SUCCESS] Excel文件已保存: {excel_path}")
+        if word_path:
+            print(f"[SUCCESS] Word文档已保存: {word_path}")
+        if sqlite_path:
+            print(f"[SUCCESS] SQLite数据库已保存: {sqlite_path}")
+        return report
+
+    def watch(self, input_dir: str = ".", file_pattern: str = None, debounce: float = 2.0,
+              use_polling: bool = False, on_merged=None):
+        """监视模式：先完整合并一次，之后文件变化时只重新读取变化的文件
+
+        debounce: 文件变化停止多少秒后开始合并
+        use_polling: 不使用系统的文件变化通知，改为定时检查
+        on_merged: 每次合并完成后调用，参数为合并器（例如保存输出文件）
+        """
+        from watch import MergeWatcher
+
+        self.close_spilled()
+        watcher = MergeWatcher(self, input_dir, file_pattern, debounce=debounce,
+                               use_polling=use_polling, on_merged=on_merged)
+        watcher.run()
+
+    def serve(self, input_dir: str = ".", file_pattern: str = None):
+        """服务模式：解析结果和合并后的题库常驻内存，通过本机HTTP接口更新来源和获取输出
+
+        监听地址等见 server_settings（socket 不为空时使用Unix套接字），直到 Ctrl+C 停止
+        """
+        from server import MergeService, run_server
+
+        self.close_spilled()
+        settings = self.config.get("server_settings", {})
+        service = MergeService(self, input_dir, file_pattern,
+                               upload_dir=settings.get("upload_dir"),
+                               max_upload_mb=settings.get("max_upload_mb", 200))
+        run_server(service, settings.get("host", "127.0.0.1"), settings.get("port", 8765),
+                   settings.get("socket"))
+
+    def get_memory_budget(self) -> Optional[int]:
+        """spill_settings.memory_budget_mb 换算为字节，未配置时返回None"""
+        budget_mb = self.config.get("spill_settings", {}).get("memory_budget_mb")
+        return None if budget_mb is None else int(budget_mb * 1024 * 1024)
+
+    def merge_spilled(self, input_dir: str = ".", file_pattern: str = None):
+        """按内存预算合并：内存中的数据超过 spill_settings.memory_budget_mb 时写入临时文件
+
+        合并后 merged_data 为None，报告和各种输出按顺序逐块读取 self.spilled。
+        与流水线模式相同，只支持精确重复检测。返回保存数据的 SpillStore，没有数据时返回None
+        """
+        from pipeline import MergePipeline
+        from spill import SpillStore
+
+        self.close_spilled()
+        self.merged_data = None
+        self.failed_files = {}
+        self.dedup_stats = {}
+        self.validation_stats = {}
+
+        files = self.find_files(input_dir, file_pattern)
+        if not files:
+            print("未找到任何Excel文件")
+            return None
+
+        budget = self.get_memory_budget() or 0
+        print(f"找到 {len(files)} 个文件（内存预算 {budget / 1024 / 1024:.0f}MB）")
+        if self.config.get("dedup_settings", {}).get("near_duplicates", "off") != "off":
+            print("[WARNING] 按内存预算合并时不支持近似重复检测，已跳过")
+
+        settings = self.config.get("spill_settings", {})
+        store = SpillStore(budget, settings.get("spill_dir"), settings.get("chunk_rows", 20000))
+        # 只用于对齐列、精确去重和统计，同时最多有一个已解析的文件在等待
+        pipeline = MergePipeline(self, queue_size=1)
+        with self.metrics.stage("spill_merge") as stage:
+            try:
+                for data in pipeline.iter_frames(files):
+                    if not data.empty:
+                        store.append(pipeline.normalize(data))
+            finally:
+                if self.cache is not None:
+                    self.cache.save()
+            stage.rows = len(store)
+
+        if self.failed_files:
+            print(f"\n[WARNING] {len(self.failed_files)} 个文件读取失败:")
+            for file, error in self.failed_files.items():
+                print(f"  {file}: {error}")
+
+        if not len(store):
+            print("没有成功读取任何文件")
+            store.close()
+            return None
+
+        self.spilled = store
+        self.spill_report = pipeline.report()
+        print(f"\n成功合并 {len(store)} 道题目（{store.spilled_files} 个数据块写入临时文件，"
+              f"共 {store.spilled_bytes / 1024 / 1024:.1f}MB）")
+        return store
+
+    def close_spilled(self):
+        """删除溢出到磁盘的临时文件"""
+        if self.spilled is not None:
+            self.spilled.close()
+            self.spilled = None
+            self.spill_report = {}
+
+    def has_merged_data(self) -> bool:
+        """是否有合并后的数据（内存中或已溢出到磁盘）"""
+        if self.spilled is not None:
+            return len(self.spilled) > 0
+        return self.merged_data is not None and not self.merged_data.empty
+
+    def merged_row_count(self) -> int:
+        if self.spilled is not None:
+            return len(self.spilled)
+        return 0 if self.merged_data is None else len(self.merged_data)
+
+    def merged_columns(self) -> List[str]:
+        if self.spilled is not None:
+            return list(self.spilled.columns)
+        return [] if self.merged_data is None else list(self.merged_data.columns)
+
+    def iter_merged_frames(self, uniform: bool = False) -> Iterator[pd.DataFrame]:
+        """按顺序产出合并后的数据块；uniform 为True时各块的列类型一致（写出列式文件时需要）"""
+        if self.spilled is not None:
+            yield from self.spilled.iter_frames(uniform)
+        elif self.merged_data is not None:
+            yield self.merged_data
+
+    def iter_merged_rows(self) -> Iterator[Tuple]:
+        """逐行产出合并后的数据，溢出到磁盘的数据块逐块读回"""
+        from writers import iter_frame_rows
+        for frame in self.iter_merged_frames():
+            yield from iter_frame_rows(frame)
+
+    def paper_assembler(self, spec: Dict):
+        """按组卷规则创建组卷器（见 paper.py），同一份合并结果的索引只建立一次"""
+        if self.merged_data is None or self.merged_data.empty:
+            # 溢出到磁盘的数据不在内存中，无法随机抽题
+            raise ValueError("没有合并后的题库，请先调用 merge_files")
+
+        from paper import PaperAssembler, PaperIndex
+
+        if self.paper_index is None or self.paper_index.data is not self.merged_data:
+            with self.metrics.stage("paper_index", rows=len(self.merged_data)):
+                self.paper_index = PaperIndex(self.merged_data, self.config["column_mapping"])
+        return PaperAssembler(self.paper_index, spec)
+
+    def deduplicate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """按 dedup_settings 对合并后的数据去重"""
+        from dedup import find_exact_duplicates, find_near_duplicates
+
+        settings = self.config.get("dedup_settings", {})
+        self.dedup_stats = {}
+
+        exact_mode = settings.get("exact_duplicates", "off")
+        if exact_mode != "off" and not df.empty:
+            df, stats = find_exact_duplicates(df, self.config["column_mapping"], mode=exact_mode)
+            self.dedup_stats["精确重复统计"] = stats
+            print(f"精确重复检测: 发现 {stats['重复数量']} 道重复题目（{stats['处理方式']}）")
+
+        near_mode = settings.get("near_duplicates", "off")
+        if near_mode != "off" and not df.empty:
+            df, stats = find_near_duplicates(
+                df, self.config["column_mapping"], mode=near_mode,
+                threshold=settings.get("similarity_threshold", 0.8),
+                num_perm=settings.get("num_perm", 64),
+                bands=settings.get("lsh_bands", 16),
+                ngram=settings.get("ngram_size", 3))
+            self.dedup_stats["近似重复统计"] = stats
+            print(f"近似重复检测: {stats['相似题组数']} 个相似题组，"
+                  f"涉及 {stats['涉及题目数']} 道题目，删除 {stats['删除题目数']} 道")
+
+        return df
+
+    def validate_answers(self, df: pd.DataFrame) -> pd.DataFrame:
+        """按 validation_settings 校验答案与题型、选项是否一致"""
+        from validate import validate_answers
+
+        settings = self.config.get("validation_settings", {})
+        self.validation_stats = {}
+
+        mode = settings.get("mode", "off")
+        if mode != "off" and not df.empty:
+            df, stats = validate_answers(df, self.config["column_mapping"], settings, mode=mode)
+            self.validation_stats["答案校验统计"] = stats
+            print(f"答案校验: 发现 {stats['问题数量']} 道题目有问题（{stats['处理方式']}）")
+
+        return df
+
+    def get_worker_count(self, num_files: Optional[int] = None) -> int:
+        """计算实际使用的进程数，num_files 为None表示文件数量未知"""
+        workers = self.workers if self.workers > 0 else (os.cpu_count() or 1)
+        if num_files is not None:
+            workers = min(workers, num_files)
+        return max(1, workers)
+
+    def read_files(self, files: List[str]) -> List[pd.DataFrame]:
+        """读取多个文件，结果顺序与输入顺序一致
+
+        启用缓存时未变化的文件直接从缓存加载，只解析新增或修改的文件。
+        单个文件失败不会中断整个批次，错误记录在 self.failed_files 中
+        """
+        self.failed_files = {}
+        results: Dict[str, pd.DataFrame] = {}
+
+        pending = []
+        # 需要解析的文件在解析之前的指纹（见 ParsedFileCache.put）
+        stamps: Dict[str, Dict] = {}
+        with self.metrics.stage("cache_lookup") as stage:
+            for file in files:
+                cached = self.cache.get(file) if self.cache is not None else None
+                if cached is not None:
+                    results[file] = cached
+                else:
+                    pending.append(file)
+                    if self.cache is not None:
+                        stamps[file] = self.cache.stamp(file)
+            stage.rows = len(files) - len(pending)
+
+        if self.cache is not None:
+            print(f"缓存命中 {len(files) - len(pending)} 个文件，需要解析 {len(pending)} 个文件")
+
+        for file, data in zip(pending, self.parse_files(pending)):
+            results[file] = data
+            if self.cache is not None and file not in self.failed_files:
+                self.cache.put(file, data, stamps[file])
+
+        if self.cache is not None:
+            self.cache.save()
+
+        return [results[file] for file in files]
+
+    def parse_files(self, files: List[str]) -> List[pd.DataFrame]:
+        """解析多个文件，按配置的进程数顺序或并行执行"""
+        if not files:
+            return []
+
+        workers = self.get_worker_count(len(files))
+
+        if workers == 1:
+            return [self.read_excel_file(file) for file in files]
+
+        from concurrent.futures import ProcessPoolExecutor
+        import pandas as pd
+
+        print(f"使用 {workers} 个进程并行读取")
+        results = []
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.config, self.metrics.enabled)) as executor:
+            futures = [executor.submit(_read_file_task, file) for file in files]
+            for file, future in zip(files, futures):
+                try:
+                    data, error, records = future.result()
+                except Exception as e:
+                    data, error, records = pd.DataFrame(), f"工作进程异常: {e}", []
+                self.metrics.extend(records)
+                if error is not None:
+                    self.failed_files[file] = error
+                results.append(data)
+        return results
+
     def save_excel(self, output_path: str = None):
         """保存为Excel文件"""
-        if self.merged_data is None or self.merged_data.empty:
+        if not self.has_merged_data():
             print("没有数据可保存")
             return
 
@@ -233,16 +780,80 @@ class QuestionBankMerger:
         # 创建输出目录
         os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
-        self.merged_data.to_excel(output_path, index=False, engine='openpyxl')
+        from writers import write_excel_rows
+
+        rollover = self.config["output_settings"].get("excel_sheet_rollover", True)
+        with self.metrics.stage("save_excel", rows=self.merged_row_count()):
+            write_excel_rows(output_path, self.merged_columns(),
+                             self.iter_merged_rows(), rollover=rollover)
         print(f"[SUCCESS] Excel文件已保存: {output_path}")
 
-    def save_word(self, output_path: str = None):
-        """保存为Word文档"""
-        if not DOCX_AVAILABLE:
-            print("无法生成Word文档：请安装 python-docx")
+    def save_sqlite(self, output_path: str = None):
+        """保存为带全文索引的SQLite数据库（可用 python src/store.py 搜索）"""
+        if not self.has_merged_data():
+            print("没有数据可保存")
             return
 
-        if self.merged_data is None or self.merged_data.empty:
+        if output_path is None:
+            output_path = self.config["output_settings"].get("sqlite_filename",
+                                                             "merged_questions.db")
+
+        # 创建输出目录
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        from store import write_question_db
+
+        with self.metrics.stage("save_sqlite", rows=self.merged_row_count()):
+            write_question_db(output_path, self.merged_columns(),
+                              self.iter_merged_rows(), self.config["column_mapping"])
+        print(f"[SUCCESS] SQLite数据库已保存: {output_path}")
+
+    def save_parquet(self, output_path: str = None):
+        """保存为Parquet文件（需要 pyarrow）"""
+        from columnar import write_parquet
+        self._save_columnar("parquet", output_path, write_parquet)
+
+    def save_arrow(self, output_path: str = None):
+        """保存为Arrow IPC文件（Feather v2，需要 pyarrow）"""
+        from columnar import write_arrow
+        self._save_columnar("arrow", output_path, write_arrow)
+
+    def save_jsonl(self, output_path: str = None):
+        """保存为JSON Lines文件，每行一道题目"""
+        from columnar import write_jsonl
+        self._save_columnar("jsonl", output_path, write_jsonl)
+
+    def _save_columnar(self, fmt: str, output_path: Optional[str], write):
+        if not self.has_merged_data():
+            print("没有数据可保存")
+            return
+
+        if output_path is None:
+            output_path = self.config["output_settings"].get(f"{fmt}_filename") \
+                or f"merged_questions.{fmt}"
+
+        # 创建输出目录
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        try:
+            with self.metrics.stage(f"save_{fmt}", rows=self.merged_row_count()):
+                write(output_path, self.iter_merged_frames(uniform=True))
+        except ImportError as e:
+            print(f"[ERROR] {e}")
+            return
+        print(f"[SUCCESS] {COLUMNAR_FORMAT_NAMES[fmt]}文件已保存: {output_path}")
+
+    def get_word_engine(self) -> str:
+        """Word渲染引擎：python-docx（默认）或 ooxml（直接写XML）"""
+        engine = self.config["output_settings"].get("word_engine", "python-docx")
+        if engine == "python-docx" and (not DOCX_AVAILABLE or self.spilled is not None):
+            # 未安装 python-docx 时使用不依赖它的引擎；数据已溢出到磁盘时逐块写出
+            return "ooxml"
+        return engine
+
+    def save_word(self, output_path: str = None):
+        """保存为Word文档"""
+        if not self.has_merged_data():
             print("没有数据可保存")
             return
 
@@ -252,6 +863,47 @@ class QuestionBankMerger:
         # 创建输出目录
         os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
+        if self.config["output_settings"].get("word_per_source", False):
+            self.save_word_per_source(os.path.splitext(output_path)[0])
+            return
+
+        engine = self.get_word_engine()
+        with self.metrics.stage("save_word", rows=self.merged_row_count(), engine=engine):
+            self._save_word(output_path, engine)
+        print(f"[SUCCESS] Word文档已保存: {output_path}")
+
+    def save_word_per_source(self, output_dir: str):
+        """每个来源文件保存为一个Word文档（ooxml 引擎），保存在 output_dir 目录中"""
+        from docx_writer import write_source_docx
+
+        workers = self.get_worker_count()
+        with self.metrics.stage("save_word", rows=self.merged_row_count(), engine="ooxml",
+                                per_source=True):
+            paths = write_source_docx(output_dir, self.merged_columns(), self.iter_merged_rows(),
+                                      self.config["column_mapping"],
+                                      self.config["output_settings"]["include_analysis"],
+                                      workers=workers)
+        print(f"[SUCCESS] 已按来源保存 {len(paths)} 个Word文档: {output_dir}")
+
+    def _save_word(self, output_path: str, engine: str):
+        if engine == "ooxml":
+            from docx_writer import (RENDER_BATCH_ROWS, write_question_docx,
+                                     write_question_docx_parallel)
+            workers = self.get_worker_count()
+            args = (output_path, self.merged_columns(), self.iter_merged_rows(),
+                    self.config["column_mapping"],
+                    self.config["output_settings"]["include_analysis"])
+            if workers > 1 and self.merged_row_count() >= 2 * RENDER_BATCH_ROWS:
+                # 按来源在多个进程中并行渲染，再按顺序拼接
+                write_question_docx_parallel(*args, workers=workers)
+            else:
+                write_question_docx(*args)
+            return
+
+        import pandas as pd
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
         # 创建Word文档
         doc = Document()
 
@@ -307,13 +959,23 @@ class QuestionBankMerger:
             doc.add_paragraph()  # 空行
 
         doc.save(output_path)
-        print(f"[SUCCESS] Word文档已保存: {output_path}")
 
     def generate_report(self) -> Dict:
         """生成统计报告"""
+        if self.spilled is not None:
+            # 合并过程中已经逐块统计
+            return self.spill_report
         if self.merged_data is None:
             return {}
 
+        with self.metrics.stage("report", rows=len(self.merged_data)):
+            return self._generate_report()
+
+    def get_metrics(self) -> Dict:
+        """各阶段的统计数据：stages 为每次执行的记录，summary 为按阶段的汇总"""
+        return self.metrics.as_dict()
+
+    def _generate_report(self) -> Dict:
         report = {
             "总题目数": len(self.merged_data),
             "按来源统计": {},
@@ -323,13 +985,14 @@ class QuestionBankMerger:
 
         # 按来源统计
         source_counts = self.merged_data["来源文件"].value_counts()
-        report["按来源统计"] = source_counts.to_dict()
+        report["按来源统计"] = source_counts[source_counts > 0].to_dict()
 
         # 按题型统计
         column_map = self.config["column_mapping"]
         if column_map["question_type"] in self.merged_data.columns:
             type_counts = self.merged_data[column_map["question_type"]].value_counts()
-            report["按题型统计"] = type_counts.to_dict()
+            # 分类列的 value_counts 包含计数为0的类别
+            report["按题型统计"] = type_counts[type_counts > 0].to_dict()
 
         # 答案缺失统计
         if column_map["correct_answer"] in self.merged_data.columns:
@@ -339,23 +1002,284 @@ class QuestionBankMerger:
                 "缺失比例": f"{missing_count/len(self.merged_data)*100:.1f}%"
             }
 
+        # 去重和答案校验统计
+        report.update(self.dedup_stats)
+        report.update(self.validation_stats)
+
         return report
 
 
+# 工作进程中复用的合并器实例
+_worker_merger: Optional[QuestionBankMerger] = None
+
+
+def _init_worker(config: Dict, metrics: bool = False):
+    """进程池初始化：每个工作进程只构建一次合并器"""
+    global _worker_merger
+    _worker_merger = QuestionBankMerger(config=config, metrics=metrics)
+
+
+def _read_sheet_task(filepath: str, sheet: str) -> Tuple[pd.DataFrame, List[Dict]]:
+    """在工作进程中读取单个工作表，返回数据和统计记录"""
+    data = _worker_merger.read_sheet(filepath, sheet)
+    records = _worker_merger.metrics.take()
+    return data, records
+
+
+def _read_file_task(filepath: str) -> Tuple[pd.DataFrame, Optional[str], List[Dict]]:
+    """在工作进程中读取单个文件，返回数据、错误信息和统计记录"""
+    data = _worker_merger.read_excel_file(filepath)
+    records = _worker_merger.metrics.take()
+    return data, _worker_merger.failed_files.pop(filepath, None), records
+
+
+def validate_config(config: Dict) -> List[str]:
+    """检查配置的结构和取值，返回发现的问题（为空表示配置有效）"""
+    problems = []
+    for section in ("excel_settings", "column_mapping", "output_settings"):
+        if not isinstance(config.get(section), dict):
+            problems.append(f"缺少 {section}")
+    if problems:
+        return problems
+
+    excel_settings = config["excel_settings"]
+    for key in ("header_row_index", "data_start_row"):
+        value = excel_settings.get(key)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            problems.append(f"excel_settings.{key} 应为非负整数")
+    if not isinstance(excel_settings.get("skip_description_row"), bool):
+        problems.append("excel_settings.skip_description_row 应为 true 或 false")
+    sheets = excel_settings.get("sheets")
+    if sheets is not None and not isinstance(sheets, (str, list)):
+        problems.append("excel_settings.sheets 应为 \"*\" 或工作表名称模式和序号的列表")
+
+    column_mapping = config["column_mapping"]
+    for key in ("question_type", "question_text", "correct_answer",
+                "analysis", "score", "difficulty"):
+        if not isinstance(column_mapping.get(key), str):
+            problems.append(f"column_mapping.{key} 应为列名")
+    options = column_mapping.get("options")
+    if not isinstance(options, list) or not all(isinstance(opt, str) for opt in options):
+        problems.append("column_mapping.options 应为列名列表")
+
+    output_settings = config["output_settings"]
+    for key in ("excel_filename", "word_filename"):
+        if not isinstance(output_settings.get(key), str):
+            problems.append(f"output_settings.{key} 应为文件路径")
+    if output_settings.get("word_engine", "python-docx") not in ("python-docx", "ooxml"):
+        problems.append("output_settings.word_engine 应为 python-docx 或 ooxml")
+    if not isinstance(output_settings.get("word_per_source", False), bool):
+        problems.append("output_settings.word_per_source 应为 true 或 false")
+
+    dedup_settings = config.get("dedup_settings", {})
+    for key in ("exact_duplicates", "near_duplicates"):
+        if dedup_settings.get(key, "off") not in ("off", "flag", "drop"):
+            problems.append(f"dedup_settings.{key} 应为 off、flag 或 drop")
+    num_perm = dedup_settings.get("num_perm", 64)
+    bands = dedup_settings.get("lsh_bands", 16)
+    if not isinstance(num_perm, int) or num_perm < 1:
+        problems.append("dedup_settings.num_perm 应为正整数")
+    elif not isinstance(bands, int) or not 1 <= bands <= num_perm or num_perm % bands:
+        # band 为0行时所有题目落入同一个桶，近似重复检测退化为两两比较
+        problems.append("dedup_settings.lsh_bands 应为 1 到 num_perm 之间且能整除 num_perm 的整数")
+    threshold = dedup_settings.get("similarity_threshold", 0.8)
+    if not isinstance(threshold, (int, float)) or not 0 < threshold <= 1:
+        problems.append("dedup_settings.similarity_threshold 应为 0 到 1 之间的数")
+    ngram = dedup_settings.get("ngram_size", 3)
+    if not isinstance(ngram, int) or ngram < 1:
+        problems.append("dedup_settings.ngram_size 应为正整数")
+
+    validation_settings = config.get("validation_settings", {})
+    if validation_settings.get("mode", "off") not in ("off", "flag", "drop"):
+        problems.append("validation_settings.mode 应为 off、flag 或 drop")
+    for key in ("single_choice_types", "multi_choice_types", "judge_types", "judge_answers"):
+        values = validation_settings.get(key, [])
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            problems.append(f"validation_settings.{key} 应为字符串列表")
+
+    mapping_settings = config.get("mapping_settings", {})
+    threshold = mapping_settings.get("fuzzy_threshold", 0.8)
+    if not isinstance(threshold, (int, float)) or not 0 < threshold <= 1:
+        problems.append("mapping_settings.fuzzy_threshold 应为 0 到 1 之间的数")
+    synonyms = mapping_settings.get("synonyms", {})
+    from mapping import FIELD_SYNONYMS
+    if not isinstance(synonyms, dict) or not all(
+            field in FIELD_SYNONYMS and isinstance(words, list) for field, words in synonyms.items()):
+        problems.append(f"mapping_settings.synonyms 应为 {{字段: 同义词列表}}，字段为 "
+                        f"{'、'.join(FIELD_SYNONYMS)}")
+
+    patterns = config.get("file_patterns")
+    if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+        problems.append("file_patterns 应为文件模式列表")
+
+    return problems
+
+
+def check_config(config_path: str) -> int:
+    """检查配置文件并打印结果，返回退出码"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        print(f"[ERROR] 配置文件 {config_path} 不存在")
+        return 1
+    except json.JSONDecodeError as e:
+        print(f"[ERROR] 配置文件格式错误: {e}")
+        return 1
+
+    problems = validate_config(config) if isinstance(config, dict) else ["配置应为JSON对象"]
+    if problems:
+        print(f"[ERROR] 配置文件 {config_path} 有 {len(problems)} 个问题:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print(f"[SUCCESS] 配置文件 {config_path} 有效")
+    return 0
+
+
+def print_report(report: Dict):
+    """打印统计报告"""
+    print("\n=== 统计报告 ===")
+    for key, value in report.items():
+        print(f"{key}:")
+        if isinstance(value, dict):
+            for k, v in value.items():
+                print(f"  {k}: {v}")
+        else:
+            print(f"  {value}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="题库合并工具")
     parser.add_argument("--config", default="config/config.json", help="配置文件路径")
     parser.add_argument("--input", default=".", help="输入目录")
+    parser.add_argument("--check-config", action="store_true", help="只检查配置文件，不合并文件")
     parser.add_argument("--pattern", help="文件匹配模式")
+    parser.add_argument("--recursive", action="store_true", help="递归查找子目录中的文件")
+    parser.add_argument("--exclude", action="append",
+                        help="排除匹配的文件或目录（可多次指定，例如 --exclude 'backup*'）")
     parser.add_argument("--output-excel", help="Excel输出文件路径")
     parser.add_argument("--output-word", help="Word输出文件路径")
+    parser.add_argument("--output-sqlite", help="同时保存为带全文索引的SQLite数据库")
+    parser.add_argument("--output-parquet", help="同时保存为Parquet文件")
+    parser.add_argument("--output-arrow", help="同时保存为Arrow IPC（Feather）文件")
+    parser.add_argument("--output-jsonl", help="同时保存为JSON Lines文件")
     parser.add_argument("--word-only", action="store_true", help="只生成Word文档")
     parser.add_argument("--excel-only", action="store_true", help="只生成Excel文件")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="并行读取文件和渲染Word文档（ooxml 引擎）的进程数（默认1，0表示使用全部CPU核心）")
+    parser.add_argument("--word-engine", choices=["python-docx", "ooxml"],
+                        help="Word渲染引擎（ooxml 直接生成XML，速度更快）")
+    parser.add_argument("--word-per-source", action="store_true",
+                        help="每个来源文件保存为一个Word文档（保存在与Word文件同名的目录中）")
+    parser.add_argument("--dedup", choices=["off", "flag", "drop"],
+                        help="精确重复题检测：flag 标记重复题，drop 删除重复题（保留第一次出现）")
+    parser.add_argument("--near-dedup", choices=["off", "flag", "drop"],
+                        help="近似重复题检测：flag 标记相似题组，drop 每组只保留第一道")
+    parser.add_argument("--validate", choices=["off", "flag", "drop"],
+                        help="答案校验：flag 添加校验问题列，drop 删除答案与题型、选项不一致的题目")
+    parser.add_argument("--auto-map", action="store_true",
+                        help="按同义词和模糊匹配自动识别列名，匹配结果按表头保存，不需要为每种格式编写配置")
+    parser.add_argument("--mapping-registry", help="自动匹配列名的版式登记文件（默认为配置文件所在目录中的 .column_layouts.json）")
+    parser.add_argument("--cache-dir", help="已解析文件的缓存目录，未变化的文件不再重新解析")
+    parser.add_argument("--cache-max-mb", type=float, default=1024,
+                        help="缓存容量上限（MB，默认1024）")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="流水线模式：读取和写出同时进行，内存占用与文件数量无关")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="流水线模式中各阶段之间队列的长度（默认4）")
+    parser.add_argument("--watch", action="store_true",
+                        help="监视模式：输入文件变化时增量合并并更新输出文件")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="监视模式中文件停止变化多少秒后开始合并（默认2）")
+    parser.add_argument("--poll", action="store_true",
+                        help="监视模式使用定时轮询（未安装 watchdog 时自动使用）")
+    parser.add_argument("--memory-budget", type=float,
+                        help="内存预算（MB）：合并的数据超过预算时写入临时文件，输出时逐块读取")
+    parser.add_argument("--spill-dir", help="超出内存预算时临时文件的目录（默认使用系统临时目录）")
+    parser.add_argument("--serve", action="store_true",
+                        help="服务模式：题库常驻内存，通过本机HTTP接口上传来源文件、获取报告和输出")
+    parser.add_argument("--host", help="服务模式的监听地址（默认127.0.0.1）")
+    parser.add_argument("--port", type=int, help="服务模式的端口（默认8765）")
+    parser.add_argument("--socket", help="服务模式改为监听Unix套接字")
+    parser.add_argument("--metrics-file", help="记录各阶段耗时和内存并写入该文件")
+    parser.add_argument("--metrics-format", choices=["jsonl", "prometheus"], default="jsonl",
+                        help="统计文件格式（默认 jsonl）")
 
     args = parser.parse_args()
 
+    if args.check_config:
+        raise SystemExit(check_config(args.config))
+
     # 创建合并器
-    merger = QuestionBankMerger(args.config)
+    merger = QuestionBankMerger(args.config, workers=args.workers,
+                                cache_dir=args.cache_dir, cache_max_mb=args.cache_max_mb,
+                                metrics=bool(args.metrics_file))
+    if args.dedup:
+        merger.config.setdefault("dedup_settings", {})["exact_duplicates"] = args.dedup
+    if args.near_dedup:
+        merger.config.setdefault("dedup_settings", {})["near_duplicates"] = args.near_dedup
+    if args.validate:
+        merger.config.setdefault("validation_settings", {})["mode"] = args.validate
+    if args.auto_map:
+        merger.config.setdefault("mapping_settings", {})["auto"] = True
+    if args.mapping_registry:
+        merger.config.setdefault("mapping_settings", {})["registry"] = \
+            os.path.abspath(args.mapping_registry)
+    if args.word_engine:
+        merger.config["output_settings"]["word_engine"] = args.word_engine
+    if args.word_per_source:
+        merger.config["output_settings"]["word_per_source"] = True
+    if args.recursive:
+        merger.config.setdefault("discovery_settings", {})["recursive"] = True
+    if args.exclude:
+        merger.config.setdefault("discovery_settings", {}).setdefault(
+            "exclude_patterns", []).extend(args.exclude)
+    if args.memory_budget is not None:
+        merger.config.setdefault("spill_settings", {})["memory_budget_mb"] = args.memory_budget
+    if args.spill_dir:
+        merger.config.setdefault("spill_settings", {})["spill_dir"] = args.spill_dir
+
+    if args.pipeline:
+        output_settings = merger.config["output_settings"]
+        if columnar_outputs(merger, args):
+            print("流水线模式不生成 Parquet/Arrow/JSONL 文件，已忽略")
+        report = merger.merge_pipeline(
+            args.input, args.pattern,
+            excel_path=None if args.word_only else
+            args.output_excel or output_settings["excel_filename"],
+            word_path=None if args.excel_only else
+            args.output_word or output_settings["word_filename"],
+            queue_size=args.queue_size, sqlite_path=args.output_sqlite)
+        print_report(report)
+        if args.metrics_file:
+            merger.metrics.dump(args.metrics_file, args.metrics_format)
+            print(f"[SUCCESS] 统计数据已保存: {args.metrics_file}")
+        return
+
+    if args.serve:
+        server_settings = merger.config.setdefault("server_settings", {})
+        for key in ("host", "port", "socket"):
+            if getattr(args, key) is not None:
+                server_settings[key] = getattr(args, key)
+        merger.serve(args.input, args.pattern)
+        return
+
+    if args.watch:
+        merger.watch(args.input, args.pattern, debounce=args.debounce, use_polling=args.poll,
+                     on_merged=lambda m: save_outputs(m, args))
+        return
+
+    if merger.get_memory_budget() is not None:
+        # 按内存预算合并，输出时逐块读取溢出到磁盘的数据
+        if merger.merge_spilled(args.input, args.pattern) is None:
+            print("没有数据可处理")
+            return
+        try:
+            save_outputs(merger, args)
+        finally:
+            merger.close_spilled()
+        return
 
     # 合并文件
     data = merger.merge_files(args.input, args.pattern)
@@ -364,16 +1288,16 @@ def main():
         print("没有数据可处理")
         return
 
+    save_outputs(merger, args)
+
+
+def save_outputs(merger: QuestionBankMerger, args):
+    """打印报告并按命令行参数保存输出文件"""
+    if not merger.has_merged_data():
+        return
+
     # 生成报告
-    report = merger.generate_report()
-    print("\n=== 统计报告 ===")
-    for key, value in report.items():
-        print(f"{key}:")
-        if isinstance(value, dict):
-            for k, v in value.items():
-                print(f"  {k}: {v}")
-        else:
-            print(f"  {value}")
+    print_report(merger.generate_report())
 
     # 保存文件
     if not args.word_only:
@@ -382,6 +1306,29 @@ def main():
     if not args.excel_only:
         merger.save_word(args.output_word)
 
+    if args.output_sqlite:
+        merger.save_sqlite(args.output_sqlite)
+
+    save_columnar = {"parquet": merger.save_parquet, "arrow": merger.save_arrow,
+                     "jsonl": merger.save_jsonl}
+    for fmt, output_path in columnar_outputs(merger, args).items():
+        save_columnar[fmt](output_path)
+
+    if args.metrics_file:
+        merger.metrics.dump(args.metrics_file, args.metrics_format)
+        print(f"[SUCCESS] 统计数据已保存: {args.metrics_file}")
+
+
+def columnar_outputs(merger: QuestionBankMerger, args) -> Dict[str, str]:
+    """需要生成的列式输出：命令行参数优先，其次是 output_settings 中配置的文件名"""
+    output_settings = merger.config["output_settings"]
+    outputs = {}
+    for fmt in COLUMNAR_FORMAT_NAMES:
+        output_path = getattr(args, f"output_{fmt}") or output_settings.get(f"{fmt}_filename")
+        if output_path:
+            outputs[fmt] = output_path
+    return outputs
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
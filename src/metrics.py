@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段耗时与内存统计
+记录合并流程各阶段的墙钟时间、CPU时间、处理行数和峰值内存，
+可导出为JSON Lines或Prometheus文本格式。未启用时各阶段只有一次空的上下文管理器调用。
+
+峰值内存为阶段结束时进程常驻内存（RSS）的历史峰值，由操作系统统计，不追踪每次内存分配，
+因此不会拖慢被统计的代码；无法获取时（例如Windows上没有 resource 模块）记为0
+"""
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+METRIC_PREFIX = "question_bank"
+
+
+def peak_rss_bytes() -> int:
+    """进程常驻内存的历史峰值（字节）"""
+    if not RESOURCE_AVAILABLE:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _NullStage:
+    """未启用统计时使用的空阶段"""
+
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """一个正在计时的阶段，rows 可以在阶段结束前设置"""
+
+    def __init__(self, recorder: "MetricsRecorder", name: str, rows: Optional[int], labels: Dict):
+        self.recorder = recorder
+        self.name = name
+        self.rows = rows
+        self.labels = labels
+
+    def __enter__(self):
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        self.recorder.add(self.name, wall, cpu, peak_rss_bytes(), self.rows, **self.labels)
+        return False
+
+
+class MetricsRecorder:
+    """按阶段记录统计数据
+
+    可以在多个线程中同时使用（流水线的读取线程、服务模式的请求线程），
+    记录列表的修改和读取都在锁内进行
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, rows: Optional[int] = None, **labels):
+        """统计一个阶段：with metrics.stage("concat") as stage: ...; stage.rows = n"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows, labels)
+
+    def add(self, name: str, wall_seconds: float, cpu_seconds: float, peak_bytes: int,
+            rows: Optional[int] = None, **labels):
+        """添加一条记录（也用于合并工作进程中的记录）"""
+        record = {
+            "stage": name,
+            "wall_seconds": round(wall_seconds, 6),
+            "cpu_seconds": round(cpu_seconds, 6),
+            "peak_bytes": int(peak_bytes),
+        }
+        if rows is not None:
+            record["rows"] = int(rows)
+            if wall_seconds > 0:
+                record["rows_per_sec"] = round(rows / wall_seconds, 1)
+        record.update(labels)
+        with self._lock:
+            self.records.append(record)
+
+    def extend(self, records: Iterable[Dict]):
+        """合并其他记录器（例如工作进程）的记录"""
+        if self.enabled:
+            records = list(records)
+            with self._lock:
+                self.records.extend(records)
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+
+    def take(self) -> List[Dict]:
+        """取出全部记录并清空（工作进程把记录交给主进程时使用）"""
+        with self._lock:
+            records, self.records = self.records, []
+        return records
+
+    def snapshot(self) -> List[Dict]:
+        """当前记录的副本"""
+        with self._lock:
+            return list(self.records)
+
+    def summary(self) -> Dict[str, Dict]:
+        """按阶段汇总：次数、总时间、总行数、最大峰值内存"""
+        totals: Dict[str, Dict] = OrderedDict()
+        for record in self.snapshot():
+            total = totals.setdefault(record["stage"], {
+                "calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_bytes": 0})
+            total["calls"] += 1
+            total["wall_seconds"] += record["wall_seconds"]
+            total["cpu_seconds"] += record["cpu_seconds"]
+            total["peak_bytes"] = max(total["peak_bytes"], record["peak_bytes"])
+            if "rows" in record:
+                total["rows"] = total.get("rows", 0) + record["rows"]
+
+        for total in totals.values():
+            total["wall_seconds"] = round(total["wall_seconds"], 6)
+            total["cpu_seconds"] = round(total["cpu_seconds"], 6)
+            if total.get("rows") and total["wall_seconds"] > 0:
+                total["rows_per_sec"] = round(total["rows"] / total["wall_seconds"], 1)
+        return totals
+
+    def as_dict(self) -> Dict:
+        """结构化的统计结果"""
+        return {"stages": self.snapshot(), "summary": self.summary()}
+
+    def to_jsonl(self) -> str:
+        """每条阶段记录一行JSON"""
+        return ''.join(json.dumps(record, ensure_ascii=False) + "\n" for record in self.snapshot())
+
+    def to_prometheus(self) -> str:
+        """按阶段汇总的Prometheus文本格式"""
+        metrics = [
+            ("stage_calls_total", "counter", "calls", "阶段执行次数"),
+            ("stage_wall_seconds", "gauge", "wall_seconds", "阶段墙钟时间（秒）"),
+            ("stage_cpu_seconds", "gauge", "cpu_seconds", "阶段CPU时间（秒）"),
+            ("stage_rows", "gauge", "rows", "阶段处理的行数"),
+            ("stage_rows_per_second", "gauge", "rows_per_sec", "阶段每秒处理的行数"),
+            ("stage_peak_bytes", "gauge", "peak_bytes", "阶段结束时进程常驻内存峰值（字节）"),
+        ]
+        summary = self.summary()
+        lines = []
+        for suffix, metric_type, key, help_text in metrics:
+            name = f"{METRIC_PREFIX}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for stage, total in summary.items():
+                if key in total:
+                    lines.append(f'{name}{{stage="{stage}"}} {total[key]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, fmt: str = "jsonl"):
+        """写入统计文件，fmt 为 jsonl 或 prometheus"""
+        text = self.to_prometheus() if fmt == "prometheus" else self.to_jsonl()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
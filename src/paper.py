@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+组卷
+在合并后的题库上按题型、难度系数、分值和来源文件预先建立索引，按组卷规则分层抽题：
+每个大题在各来源之间按题目数量比例分配，大题之间不重复，再在同一来源内交换题目，
+使总分和平均难度接近目标。每套试卷只需要少量数组运算，每秒可以生成数千套。
+
+组卷规则（JSON）示例：
+{
+  "title": "期末考试",
+  "sections": [
+    {"name": "一、单选题", "question_type": "单选题", "count": 20, "difficulty": [1, 2]},
+    {"name": "二、多选题", "question_type": "多选题", "count": 10, "sources": ["第[3-5]章*"]}
+  ],
+  "total_score": 40,
+  "difficulty": 2.0,
+  "tolerance": {"score": 0, "difficulty": 0.2}
+}
+"""
+import argparse
+import fnmatch
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schema import SOURCE_COLUMN
+
+# 试卷中的大题名称列
+SECTION_COLUMN = "大题"
+
+
+def load_paper_spec(spec_path: str) -> Dict:
+    """读取组卷规则文件"""
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _value_range(value, name: str) -> Optional[Tuple[float, float]]:
+    """单个数值或 [最小值, 最大值] 转换为闭区间"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value), float(value)
+    if isinstance(value, (list, tuple)) and len(value) == 2 and \
+            all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+        low, high = float(value[0]), float(value[1])
+        if low > high:
+            raise ValueError(f"{name} 的最小值大于最大值: {value}")
+        return low, high
+    raise ValueError(f"{name} 应为数值或 [最小值, 最大值]: {value!r}")
+
+
+def _as_list(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    return [str(value)] if isinstance(value, (str, int, float)) else [str(v) for v in value]
+
+
+def parse_paper_spec(spec: Dict) -> Dict:
+    """检查并规范化组卷规则，不合法时抛出 ValueError"""
+    if not isinstance(spec, dict):
+        raise ValueError("组卷规则应为JSON对象")
+    sections = spec.get("sections")
+    if not isinstance(sections, list) or not sections:
+        raise ValueError("组卷规则缺少 sections（大题列表）")
+
+    parsed = []
+    for i, section in enumerate(sections, 1):
+        if not isinstance(section, dict):
+            raise ValueError(f"第 {i} 个大题应为JSON对象")
+        count = section.get("count")
+        if not isinstance(count, int) or isinstance(count, bool) or count <= 0:
+            raise ValueError(f"第 {i} 个大题的 count 应为正整数: {count!r}")
+        question_types = _as_list(section.get("question_type"))
+        parsed.append({
+            "name": str(section.get("name") or (question_types[0] if question_types
+                                                   else f"第{i}部分")),
+            "question_type": question_types,
+            "count": count,
+            "difficulty": _value_range(section.get("difficulty"), f"第 {i} 个大题的 difficulty"),
+            "score": _value_range(section.get("score"), f"第 {i} 个大题的 score"),
+            "sources": _as_list(section.get("sources")),
+        })
+
+    tolerance = spec.get("tolerance") or {}
+    if not isinstance(tolerance, dict):
+        raise ValueError("tolerance 应为JSON对象，例如 {\"score\": 0, \"difficulty\": 0.2}")
+    targets = {}
+    for key in ("total_score", "difficulty"):
+        value = spec.get(key)
+        if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool)):
+            raise ValueError(f"{key} 应为数值: {value!r}")
+        targets[key] = None if value is None else float(value)
+
+    return {
+        "title": str(spec.get("title") or "试卷"),
+        "sections": parsed,
+        "total_score": targets["total_score"],
+        "difficulty": targets["difficulty"],
+        "score_tolerance": float(tolerance.get("score", 0)),
+        "difficulty_tolerance": float(tolerance.get("difficulty", 0.1)),
+        "stratify": bool(spec.get("stratify", True)),
+        "max_swaps": int(spec.get("max_swaps", 200)),
+        "patience": int(spec.get("patience", 50)),
+    }
+
+
+class PaperIndex:
+    """题库的组卷索引
+
+    题型和来源文件按取值保存题目位置（升序），难度系数和分值保存排序后的数值，
+    区间查询用二分查找。索引只依赖题库本身，可以被多个组卷规则共用
+    """
+
+    def __init__(self, data: pd.DataFrame, column_map: Dict):
+        self.data = data
+        self.column_map = column_map
+        self.size = len(data)
+
+        self.by_type = self._value_index(data.get(column_map["question_type"]))
+        self.by_source = self._value_index(data.get(SOURCE_COLUMN))
+        self.source_codes = self._codes(data.get(SOURCE_COLUMN))
+
+        self.scores, self.score_order, self.sorted_scores = \
+            self._numeric_index(data.get(column_map["score"]))
+        self.difficulties, self.difficulty_order, self.sorted_difficulties = \
+            self._numeric_index(data.get(column_map["difficulty"]))
+
+    def _codes(self, series: Optional[pd.Series]) -> np.ndarray:
+        if series is None:
+            return np.zeros(self.size, dtype=np.int64)
+        codes, _ = pd.factorize(series.astype(object), use_na_sentinel=True)
+        return codes
+
+    def _value_index(self, series: Optional[pd.Series]) -> Dict[str, np.ndarray]:
+        """取值 -> 题目位置，缺失值不建索引"""
+        if series is None:
+            return {}
+        codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        return {str(value): order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+
+    def _numeric_index(self, series: Optional[pd.Series]):
+        """数值数组（非数字为NaN）、非NaN值的排序位置和排序后的数值"""
+        if series is None:
+            values = np.full(self.size, np.nan)
+        else:
+            values = pd.to_numeric(series.astype(object), errors='coerce').to_numpy(dtype=float)
+        order = np.argsort(values, kind='stable')
+        order = order[:np.count_nonzero(~np.isnan(values))]
+        return values, order, values[order]
+
+    @staticmethod
+    def _in_range(order: np.ndarray, sorted_values: np.ndarray,
+                  value_range: Tuple[float, float]) -> np.ndarray:
+        low = np.searchsorted(sorted_values, value_range[0], side='left')
+        high = np.searchsorted(sorted_values, value_range[1], side='right')
+        return np.sort(order[low:high])
+
+    def select(self, question_type: Optional[Sequence[str]] = None,
+               difficulty: Optional[Tuple[float, float]] = None,
+               score: Optional[Tuple[float, float]] = None,
+               sources: Optional[Sequence[str]] = None) -> np.ndarray:
+        """满足所有条件的题目位置（升序）；sources 为来源文件名的通配符模式"""
+        selected = None
+
+        def narrow(positions: np.ndarray):
+            nonlocal selected
+            selected = positions if selected is None else \
+                np.intersect1d(selected, positions, assume_unique=True)
+
+        empty = np.empty(0, dtype=np.int64)
+        if question_type is not None:
+            parts = [self.by_type[t] for t in question_type if t in self.by_type]
+            narrow(np.sort(np.concatenate(parts)) if parts else empty)
+        if sources is not None:
+            parts = [positions for name, positions in self.by_source.items()
+                     if any(fnmatch.fnmatchcase(name, pattern) for pattern in sources)]
+            narrow(np.sort(np.concatenate(parts)) if parts else empty)
+        if difficulty is not None:
+            narrow(self._in_range(self.difficulty_order, self.sorted_difficulties, difficulty))
+        if score is not None:
+            narrow(self._in_range(self.score_order, self.sorted_scores, score))
+        return np.arange(self.size) if selected is None else selected
+
+
+class Paper:
+    """一套试卷：题目在题库中的位置、所属大题、总分和平均难度"""
+
+    def __init__(self, positions: np.ndarray, sections: np.ndarray, total_score: float,
+                 difficulty: float, within_tolerance: bool, seed):
+        self.positions = positions
+        self.sections = sections
+        self.total_score = total_score
+        self.difficulty = difficulty
+        self.within_tolerance = within_tolerance
+        self.seed = seed
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+class PaperAssembler:
+    """按组卷规则从题库中抽题
+
+    每个大题的候选题目和各来源的分配数量在创建时计算一次，之后每套试卷只需要抽样和交换。
+    seed 相同时生成的试卷相同；generate 中第 i 套试卷的随机数由 (seed, i) 决定
+    """
+
+    def __init__(self, index: PaperIndex, spec: Dict):
+        self.index = index
+        self.spec = parse_paper_spec(spec)
+        self.sections = self.spec["sections"]
+
+        # 分层：(大题序号, 候选题目位置, 抽取数量)
+        self.strata: List[Tuple[int, np.ndarray, int]] = []
+        for number, section in enumerate(self.sections):
+            pool = index.select(section["question_type"], section["difficulty"],
+                                section["score"], section["sources"])
+            if len(pool) < section["count"]:
+                raise ValueError(f"大题“{section['name']}”需要 {section['count']} 道题目，"
+                                 f"符合条件的只有 {len(pool)} 道")
+            for positions, quota in self._allocate(pool, section["count"]):
+                self.strata.append((number, positions, quota))
+
+        self.total_count = sum(section["count"] for section in self.sections)
+        # 试卷中每道题所属的分层和大题（各分层的抽取数量固定）
+        quotas = [quota for _, _, quota in self.strata]
+        self.slot_strata = np.repeat(np.arange(len(self.strata)), quotas)
+        self.slot_sections = np.repeat([number for number, _, _ in self.strata], quotas)
+        self.scores = np.nan_to_num(index.scores)
+        self.difficulties = np.nan_to_num(index.difficulties)
+        self.has_difficulty = ~np.isnan(index.difficulties)
+
+    def _allocate(self, pool: np.ndarray, count: int) -> List[Tuple[np.ndarray, int]]:
+        """按来源文件分层，抽取数量与各来源的题目数量成比例（最大余数法）"""
+        if not self.spec["stratify"]:
+            return [(pool, count)]
+        codes = self.index.source_codes[pool]
+        order = np.argsort(codes, kind='stable')
+        groups = np.split(pool[order], np.flatnonzero(np.diff(codes[order])) + 1)
+        sizes = np.array([len(group) for group in groups])
+        exact = count * sizes / sizes.sum()
+        quotas = np.floor(exact).astype(int)
+        remainders = np.where(quotas < sizes, exact - quotas, -1.0)
+        for i in np.argsort(-remainders, kind='stable')[:count - quotas.sum()]:
+            quotas[i] += 1
+        return [(group, int(quota)) for group, quota in zip(groups, quotas) if quota > 0]
+
+    def _deviation(self, total_score, difficulty):
+        """与目标的相对偏差（越小越好）和是否在容差范围内"""
+        spec = self.spec
+        deviation = 0.0
+        within = True
+        if spec["total_score"] is not None:
+            gap = np.abs(total_score - spec["total_score"])
+            deviation = deviation + gap / max(spec["score_tolerance"], 1.0)
+            within = within & (gap <= spec["score_tolerance"] + 1e-9)
+        if spec["difficulty"] is not None:
+            gap = np.abs(difficulty - spec["difficulty"])
+            deviation = deviation + gap / max(spec["difficulty_tolerance"], 0.01)
+            within = within & (gap <= spec["difficulty_tolerance"] + 1e-9)
+        return deviation, within
+
+    def assemble(self, seed=None) -> Paper:
+        """生成一套试卷；大题之间题目不重复，候选题目不足时抛出 ValueError"""
+        rng = np.random.default_rng(seed)
+        picks = []
+        used: set = set()
+        for number, positions, quota in self.strata:
+            chosen = positions[rng.choice(len(positions), quota, replace=False)]
+            if not used.isdisjoint(chosen.tolist()):
+                # 与前面的大题候选题目有重叠时，从未使用的题目中重新抽取
+                available = positions[~np.isin(positions, np.fromiter(used, dtype=np.int64))]
+                if len(available) < quota:
+                    raise ValueError(f"大题“{self.sections[number]['name']}”的候选题目"
+                                     f"与其他大题重叠，剩余题目不足 {quota} 道")
+                chosen = available[rng.choice(len(available), quota, replace=False)]
+            used.update(chosen.tolist())
+            picks.append(chosen)
+
+        positions, within = self._improve(np.concatenate(picks), used, rng)
+
+        # 按大题顺序排列，同一大题内保持题库中的顺序
+        order = np.lexsort((positions, self.slot_sections))
+        positions = positions[order]
+        return Paper(positions, self.slot_sections[order], float(self.scores[positions].sum()),
+                     self._mean_difficulty(positions), bool(within), seed)
+
+    def _mean_difficulty(self, positions: np.ndarray) -> float:
+        counted = self.has_difficulty[positions].sum()
+        return float(self.difficulties[positions].sum() / counted) if counted else float('nan')
+
+    def _improve(self, positions: np.ndarray, used: set, rng: np.random.Generator, batch: int = 8):
+        """在同一分层内交换题目，使总分和平均难度接近目标（保持分层和不重复）"""
+        spec = self.spec
+        if spec["total_score"] is None and spec["difficulty"] is None:
+            return positions, True
+
+        positions = positions.copy()
+        total_score = float(self.scores[positions].sum())
+        difficulty_sum = float(self.difficulties[positions].sum())
+        counted = int(self.has_difficulty[positions].sum())
+        deviation, within = self._deviation(total_score, difficulty_sum / max(counted, 1))
+
+        stale = 0
+        for _ in range(spec["max_swaps"]):
+            if within or stale >= spec["patience"]:
+                break
+            slot = rng.integers(len(positions))
+            pool = self.strata[self.slot_strata[slot]][1]
+            candidates = pool[rng.integers(len(pool), size=batch)]
+            old = positions[slot]
+
+            scores = total_score - self.scores[old] + self.scores[candidates]
+            sums = difficulty_sum - self.difficulties[old] + self.difficulties[candidates]
+            counts = counted - self.has_difficulty[old] + self.has_difficulty[candidates]
+            deviations, withins = self._deviation(scores, sums / np.maximum(counts, 1))
+
+            stale += 1
+            for k in np.argsort(deviations, kind='stable'):
+                if deviations[k] >= deviation:
+                    break
+                new = int(candidates[k])
+                if new in used:
+                    continue
+                used.discard(int(old))
+                used.add(new)
+                positions[slot] = new
+                total_score, difficulty_sum, counted = float(scores[k]), float(sums[k]), int(counts[k])
+                deviation, within = float(deviations[k]), bool(withins[k])
+                stale = 0
+                break
+        return positions, within
+
+    def generate(self, count: int, seed: Optional[int] = None) -> Iterator[Paper]:
+        """依次生成 count 套试卷；seed 为None时使用随机种子（保存在 Paper.seed 中）"""
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % (2 ** 63))
+        for i in range(count):
+            yield self.assemble((seed, i))
+
+    def paper_frame(self, paper: Paper) -> pd.DataFrame:
+        """试卷的题目数据，大题名称在第一列"""
+        frame = self.index.data.iloc[paper.positions].reset_index(drop=True)
+        names = [section["name"] for section in self.sections]
+        frame.insert(0, SECTION_COLUMN, [names[number] for number in paper.sections])
+        return frame
+
+    def summary(self, paper: Paper) -> str:
+        text = f"共 {len(paper)} 道题目，总分 {paper.total_score:g} 分"
+        if not np.isnan(paper.difficulty):
+            text += f"，平均难度 {paper.difficulty:.2f}"
+        return text
+
+    def save_paper(self, paper: Paper, output_path: str, with_answers: bool = False,
+                   title: Optional[str] = None):
+        """用题库的Word/Excel写出器保存试卷（按扩展名选择格式），默认不含答案和解析"""
+        from writers import iter_frame_rows
+
+        column_map = self.index.column_map
+        frame = self.paper_frame(paper)
+        if not with_answers:
+            frame = frame.drop(columns=[column_map["correct_answer"], column_map["analysis"]],
+                               errors='ignore')
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        if output_path.lower().endswith(".docx"):
+            from docx_writer import write_question_docx
+            write_question_docx(output_path, list(frame.columns), iter_frame_rows(frame),
+                                column_map, include_analysis=with_answers,
+                                title=title or self.spec["title"], summary=self.summary(paper),
+                                group_column=SECTION_COLUMN, page_breaks=False,
+                                include_answer=with_answers)
+        else:
+            from writers import write_excel_rows
+            write_excel_rows(output_path, list(frame.columns), iter_frame_rows(frame))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按组卷规则从合并后的题库生成试卷")
+    parser.add_argument("spec", help="组卷规则文件（JSON）")
+    parser.add_argument("--config", default="config/config.json", help="配置文件路径")
+    parser.add_argument("--input", default=".", help="输入目录")
+    parser.add_argument("--pattern", help="文件匹配模式")
+    parser.add_argument("--workers", type=int, default=1, help="并行读取的进程数（0 表示全部CPU核心）")
+    parser.add_argument("--papers", type=int, default=1, help="生成的试卷套数（默认1）")
+    parser.add_argument("--seed", type=int, help="随机种子，相同的种子生成相同的试卷")
+    parser.add_argument("--output-dir", default="output/papers", help="试卷输出目录")
+    parser.add_argument("--format", nargs="+", choices=["docx", "xlsx"], default=["docx"],
+                        help="试卷格式（默认docx）")
+    parser.add_argument("--with-answers", action="store_true", help="试卷中包含答案和解析")
+    parser.add_argument("--no-write", action="store_true", help="只生成并统计，不写出试卷文件")
+
+    args = parser.parse_args()
+    if args.papers < 1:
+        parser.error("--papers 至少为1")
+
+    from merger import QuestionBankMerger
+
+    merger = QuestionBankMerger(args.config, workers=args.workers)
+    if merger.merge_files(args.input, args.pattern).empty:
+        print("[ERROR] 没有可用的题目")
+        raise SystemExit(1)
+
+    try:
+        assembler = merger.paper_assembler(load_paper_spec(args.spec))
+    except (OSError, json.JSONDecodeError, ValueError) as e:
+        print(f"[ERROR] 组卷规则无效: {e}")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    try:
+        papers = list(assembler.generate(args.papers, args.seed))
+    except ValueError as e:
+        print(f"[ERROR] 组卷失败: {e}")
+        raise SystemExit(1)
+    elapsed = time.perf_counter() - start
+
+    scores = np.array([paper.total_score for paper in papers])
+    difficulties = np.array([paper.difficulty for paper in papers])
+    within = sum(paper.within_tolerance for paper in papers)
+    print(f"\n生成 {len(papers)} 套试卷，用时 {elapsed:.3f} 秒"
+          f"（每秒 {len(papers) / max(elapsed, 1e-9):.0f} 套），随机种子 {papers[0].seed[0]}")
+    print(f"总分 {scores.min():g}~{scores.max():g}（平均 {scores.mean():.1f}），"
+          f"平均难度 {np.nanmin(difficulties):.2f}~{np.nanmax(difficulties):.2f}，"
+          f"{within} 套在容差范围内")
+
+    if args.no_write:
+        return
+
+    title = assembler.spec["title"]
+    width = max(4, len(str(len(papers))))
+    for i, paper in enumerate(papers, 1):
+        paper_title = f"{title}（第{i}套）" if len(papers) > 1 else title
+        for fmt in args.format:
+            output_path = os.path.join(args.output_dir, f"paper_{i:0{width}d}.{fmt}")
+            assembler.save_paper(paper, output_path, args.with_answers, paper_title)
+    print(f"[SUCCESS] 试卷已保存到: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
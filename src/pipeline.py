@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线合并
+读取、规范化和Excel/Word写出同时进行：读取线程（或进程池）按来源顺序把解析好的文件
+放入有界队列，主线程规范化后把行块分发给各写出阶段（线程或进程）。队列满时上游阻塞等待，
+内存占用只取决于队列长度，与输入文件数量无关
+"""
+import multiprocessing
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sized, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dedup import DUPLICATE_COLUMN, content_hash
+from docx_writer import write_question_docx
+from schema import SHEET_COLUMN
+from store import write_question_db
+from validate import ISSUE_COLUMN, validate_answers
+from writers import iter_frame_rows, write_excel_rows
+
+# 队列结束标记（跨进程传递后仍可识别）
+_DONE = None
+
+
+def iter_queue(items) -> Iterator:
+    """依次取出队列中的元素直到结束标记"""
+    while True:
+        item = items.get()
+        if item is _DONE:
+            return
+        yield item
+
+
+def iter_row_chunks(chunks: Iterable[List[Tuple]]) -> Iterator[Tuple]:
+    """把行块展开为逐行"""
+    for chunk in chunks:
+        yield from chunk
+
+
+def write_excel_stage(chunks: Iterator[List[Tuple]], output_path: str, columns: List[str],
+                      rollover: bool):
+    write_excel_rows(output_path, columns, iter_row_chunks(chunks), rollover=rollover)
+
+
+def write_word_stage(chunks: Iterator[List[Tuple]], output_path: str, columns: List[str],
+                     column_map: Dict, include_analysis: bool):
+    write_question_docx(output_path, columns, iter_row_chunks(chunks), column_map, include_analysis)
+
+
+def write_sqlite_stage(chunks: Iterator[List[Tuple]], output_path: str, columns: List[str],
+                       column_map: Dict):
+    write_question_db(output_path, columns, iter_row_chunks(chunks), column_map)
+
+
+def _consume(target: Callable, args: Tuple, items, errors):
+    """写出阶段的入口：出错后继续取空队列，避免上游在已满的队列上永远阻塞"""
+    chunks = iter_queue(items)
+    try:
+        target(chunks, *args)
+    except BaseException as e:
+        errors.put(e)
+        # 继续同一个迭代器：结束标记已被取出时不再等待
+        for _ in chunks:
+            pass
+
+
+class StageWorker:
+    """从有界队列消费行块的写出阶段
+
+    use_process 为True时在独立进程中运行，与其他阶段真正并行（不受GIL限制），
+    否则在线程中运行。错误在 finish() 之后由 check() 抛出
+    """
+
+    def __init__(self, name: str, target: Callable, args: Tuple, maxsize: int,
+                 use_process: bool = False):
+        if use_process:
+            self.items = multiprocessing.Queue(maxsize=maxsize)
+            self.errors = multiprocessing.Queue()
+            self.runner = multiprocessing.Process(
+                target=_consume, args=(target, args, self.items, self.errors),
+                name=name, daemon=True)
+        else:
+            self.items = queue.Queue(maxsize=maxsize)
+            self.errors = queue.Queue()
+            self.runner = threading.Thread(
+                target=_consume, args=(target, args, self.items, self.errors),
+                name=name, daemon=True)
+
+    def start(self):
+        self.runner.start()
+
+    def put(self, item):
+        self.items.put(item)
+
+    def finish(self):
+        self.items.put(_DONE)
+        self.runner.join()
+
+    def check(self):
+        try:
+            error = self.errors.get_nowait()
+        except queue.Empty:
+            return
+        raise error
+
+
+class MergePipeline:
+    """按来源顺序流式合并，不保留合并后的完整数据
+
+    输出的列固定为所有映射列加来源文件（文件中缺少的列为空）。
+    Word 使用 ooxml 引擎逐行写出；只支持精确重复检测（近似重复需要完整数据）
+    """
+
+    def __init__(self, merger, excel_path: Optional[str] = None, word_path: Optional[str] = None,
+                 queue_size: int = 4, sqlite_path: Optional[str] = None):
+        self.merger = merger
+        self.config = merger.config
+        self.column_map = self.config["column_mapping"]
+        self.excel_path = excel_path
+        self.word_path = word_path
+        self.sqlite_path = sqlite_path
+        self.queue_size = max(1, queue_size)
+
+        self.dedup_mode = self.config.get("dedup_settings", {}).get("exact_duplicates", "off")
+        self.seen_hashes = set()
+        self.duplicates_by_source: Counter = Counter()
+
+        self.validation_settings = self.config.get("validation_settings", {})
+        self.validation_mode = self.validation_settings.get("mode", "off")
+        self.issues_by_code: Counter = Counter()
+        self.issues_by_source: Counter = Counter()
+
+        self.total = 0
+        self.by_source: Counter = Counter()
+        self.by_type: Counter = Counter()
+        self.missing_answers = 0
+        self.reader_error: Optional[BaseException] = None
+
+    def output_columns(self) -> List[str]:
+        """与 clean_data 相同的列顺序，来源文件在最后"""
+        columns = list(dict.fromkeys(self.merger.get_mapped_columns()))
+        columns.append("来源文件")
+        if self.config["excel_settings"].get("sheets") is not None:
+            columns.append(SHEET_COLUMN)
+        if self.dedup_mode == "flag":
+            columns.append(DUPLICATE_COLUMN)
+        if self.validation_mode == "flag":
+            columns.append(ISSUE_COLUMN)
+        return columns
+
+    def iter_frames(self, files: Iterable[str]) -> Iterator[pd.DataFrame]:
+        """按输入顺序产出解析后的数据，并行时最多同时有 queue_size 个文件在解析
+
+        files 可以是边查找边产出的迭代器
+        """
+        merger = self.merger
+        workers = merger.get_worker_count(len(files) if isinstance(files, Sized) else None)
+
+        if workers == 1:
+            for file in files:
+                yield self.read_cached(file, merger.read_excel_file)
+            return
+
+        from merger import _init_worker, _read_file_task
+
+        print(f"使用 {workers} 个进程并行读取")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.config, merger.metrics.enabled)) as executor:
+            pending: deque = deque()
+            remaining = iter(files)
+            window = workers + self.queue_size
+
+            def submit_next() -> bool:
+                file = next(remaining, None)
+                if file is None:
+                    return False
+                cached = merger.cache.get(file) if merger.cache is not None else None
+                if cached is not None:
+                    pending.append((file, cached, None))
+                    return True
+                # 指纹在提交解析之前获取（见 ParsedFileCache.put）
+                stamp = merger.cache.stamp(file) if merger.cache is not None else None
+                pending.append((file, executor.submit(_read_file_task, file), stamp))
+                return True
+
+            while len(pending) < window and submit_next():
+                pass
+
+            while pending:
+                file, item, stamp = pending.popleft()
+                submit_next()
+                if isinstance(item, pd.DataFrame):
+                    yield item
+                    continue
+                try:
+                    data, error, records = item.result()
+                except Exception as e:
+                    data, error, records = pd.DataFrame(), f"工作进程异常: {e}", []
+                merger.metrics.extend(records)
+                if error is not None:
+                    merger.failed_files[file] = error
+                elif merger.cache is not None:
+                    merger.cache.put(file, data, stamp)
+                yield data
+
+    def read_cached(self, file: str, read: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """先查缓存，未命中时读取并写入缓存"""
+        cache = self.merger.cache
+        if cache is not None:
+            cached = cache.get(file)
+            if cached is not None:
+                return cached
+            stamp = cache.stamp(file)
+        data = read(file)
+        if cache is not None and file not in self.merger.failed_files:
+            cache.put(file, data, stamp)
+        return data
+
+    def read_all(self, files: Iterable[str], frames: queue.Queue):
+        """读取线程：把解析结果依次放入队列"""
+        try:
+            for data in self.iter_frames(files):
+                if not data.empty:
+                    frames.put(data)
+        except BaseException as e:
+            self.reader_error = e
+        finally:
+            frames.put(_DONE)
+
+    def normalize(self, data: pd.DataFrame) -> pd.DataFrame:
+        """对齐列、精确去重、校验答案并累计统计信息"""
+        data = data.reindex(columns=[col for col in self.output_columns()
+                                     if col not in (DUPLICATE_COLUMN, ISSUE_COLUMN)])
+
+        if self.dedup_mode != "off":
+            hashes = content_hash(data, self.column_map)
+            seen = np.fromiter((h in self.seen_hashes for h in hashes.tolist()),
+                               dtype=bool, count=len(hashes))
+            duplicated = pd.Series(hashes).duplicated().to_numpy() | seen
+            self.seen_hashes.update(hashes.tolist())
+            self.duplicates_by_source.update(
+                data.loc[duplicated, "来源文件"].astype(object).tolist())
+            if self.dedup_mode == "drop":
+                data = data[~duplicated]
+            else:
+                data = data.assign(**{DUPLICATE_COLUMN: duplicated})
+
+        if self.validation_mode != "off" and not data.empty:
+            # 校验规则只涉及单行，可以逐块执行
+            data, stats = validate_answers(data, self.column_map, self.validation_settings,
+                                           mode=self.validation_mode)
+            self.issues_by_code.update(stats["按问题统计"])
+            self.issues_by_source.update(stats["按来源统计"])
+
+        self.total += len(data)
+        self.by_source.update(data["来源文件"].astype(object).value_counts().to_dict())
+        self.by_type.update(data[self.column_map["question_type"]].dropna()
+                            .astype(object).value_counts().to_dict())
+        self.missing_answers += int(data[self.column_map["correct_answer"]].isnull().sum())
+        return data
+
+    def run(self, files: Iterable[str]) -> Dict:
+        """执行流水线，返回与 generate_report 格式相同的统计报告"""
+        columns = self.output_columns()
+        output_settings = self.config["output_settings"]
+        writers: List[StageWorker] = []
+        # 有多个CPU核心可用时写出阶段在独立进程中运行
+        use_process = self.merger.get_worker_count(
+            len(files) if isinstance(files, Sized) else None) > 1
+
+        if self.excel_path:
+            writers.append(StageWorker(
+                "excel-writer", write_excel_stage,
+                (self.excel_path, columns, output_settings.get("excel_sheet_rollover", True)),
+                self.queue_size, use_process))
+        if self.word_path:
+            writers.append(StageWorker(
+                "word-writer", write_word_stage,
+                (self.word_path, columns, self.column_map, output_settings["include_analysis"]),
+                self.queue_size, use_process))
+        if self.sqlite_path:
+            writers.append(StageWorker(
+                "sqlite-writer", write_sqlite_stage,
+                (self.sqlite_path, columns, self.column_map), self.queue_size, use_process))
+
+        frames: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        reader = threading.Thread(target=self.read_all, args=(files, frames),
+                                  name="reader", daemon=True)
+
+        for writer in writers:
+            writer.start()
+        reader.start()
+        parsed = iter_queue(frames)
+        try:
+            for data in parsed:
+                data = self.normalize(data)
+                # 写出线程跟不上时在 put 上等待，形成反压
+                for rows in self.iter_chunks(data):
+                    for writer in writers:
+                        writer.put(rows)
+        except BaseException:
+            # 取空队列，让读取线程能够结束
+            for _ in parsed:
+                pass
+            raise
+        finally:
+            reader.join()
+            for writer in writers:
+                writer.finish()
+            if self.merger.cache is not None:
+                self.merger.cache.save()
+
+        if self.reader_error is not None:
+            raise self.reader_error
+        for writer in writers:
+            writer.check()
+
+        return self.report()
+
+    @staticmethod
+    def iter_chunks(data: pd.DataFrame, chunk_size: int = 2000) -> Iterator[List[Tuple]]:
+        """把数据切成行块，写出线程之间共享同一个行块"""
+        for start in range(0, len(data), chunk_size):
+            yield list(iter_frame_rows(data.iloc[start:start + chunk_size], chunk_size))
+
+    def report(self) -> Dict:
+        """流水线过程中累计的统计报告"""
+        report = {
+            "总题目数": self.total,
+            "按来源统计": dict(self.by_source),
+            "按题型统计": dict(self.by_type.most_common()),
+            "答案缺失统计": {
+                "缺失数量": self.missing_answers,
+                "缺失比例": f"{self.missing_answers / self.total * 100:.1f}%" if self.total else "0.0%"
+            }
+        }
+        if self.dedup_mode != "off":
+            report["精确重复统计"] = {
+                "重复数量": sum(self.duplicates_by_source.values()),
+                "处理方式": "删除" if self.dedup_mode == "drop" else "标记",
+                "按来源统计": dict(self.duplicates_by_source),
+            }
+        if self.validation_mode != "off":
+            report["答案校验统计"] = {
+                "问题数量": sum(self.issues_by_source.values()),
+                "处理方式": "删除" if self.validation_mode == "drop" else "标记",
+                "按问题统计": dict(self.issues_by_code),
+                "按来源统计": dict(self.issues_by_source),
+            }
+        return report
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式Excel读取
+基于 openpyxl 只读模式逐行读取工作表，只保留需要的列，不在内存中构建整张表。
+表头探测只读取前几行，探测结果直接用于同一次读取，每个文件只打开和解析一次
+"""
+import fnmatch
+from itertools import chain, islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# openpyxl 可以直接读取的文件类型
+STREAMING_SUFFIXES = {".xlsx", ".xlsm", ".xltx", ".xltm"}
+
+# 表头探测默认读取的行数
+DEFAULT_PROBE_ROWS = 10
+
+# 表头行的典型关键词（与 debug_excel.py 的检测规则一致）
+HEADER_KEYWORDS = ['题型', '题干', '问题', 'question', 'answer', '答案', '选项', 'option']
+
+
+def list_sheet_names(filepath: str) -> List[str]:
+    """工作表名称（只读取工作簿目录，不加载单元格）"""
+    if Path(filepath).suffix.lower() not in STREAMING_SUFFIXES:
+        with pd.ExcelFile(filepath) as workbook:
+            return list(workbook.sheet_names)
+    workbook = load_workbook(filepath, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def select_sheets(names: Sequence[str], selectors) -> List[str]:
+    """按配置选择工作表，保持工作簿中的顺序
+
+    selectors: "*" 或 "all" 表示全部；否则为列表，字符串按名称模式匹配（支持通配符），
+               整数为工作表序号（0-based，负数从末尾计）
+    """
+    if selectors in ("*", "all"):
+        return list(names)
+    if isinstance(selectors, (str, int)):
+        selectors = [selectors]
+
+    selected = set()
+    for selector in selectors:
+        if isinstance(selector, int):
+            if -len(names) <= selector < len(names):
+                selected.add(names[selector])
+        else:
+            selected.update(fnmatch.filter(names, selector))
+    return [name for name in names if name in selected]
+
+
+def iter_sheet_rows(filepath: str, sheet: Optional[str] = None) -> Iterator[Tuple]:
+    """逐行读取工作表的单元格值，sheet 为None时读取第一个工作表"""
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0] if sheet is None else workbook[sheet]
+        # 有些导出工具写入错误的 <dimension>（例如 A1），只读模式会按它截断列，
+        # 与 pandas 一样先重置尺寸，按实际的单元格读取
+        worksheet.reset_dimensions()
+        for row in worksheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def probe_rows(filepath: str, max_rows: int = DEFAULT_PROBE_ROWS) -> List[Tuple]:
+    """只读取前 max_rows 行"""
+    rows = iter_sheet_rows(filepath)
+    try:
+        return list(islice(rows, max_rows))
+    finally:
+        rows.close()
+
+
+def score_header_row(row: Sequence, keywords: Iterable[str] = HEADER_KEYWORDS) -> int:
+    """表头得分：单元格中出现的关键词数量"""
+    keywords = [keyword.lower() for keyword in keywords]
+    score = 0
+    for cell in row:
+        if cell is not None:
+            cell_str = str(cell).lower()
+            score += sum(1 for keyword in keywords if keyword in cell_str)
+    return score
+
+
+def detect_header_row(rows: Sequence[Sequence],
+                      keywords: Iterable[str] = HEADER_KEYWORDS) -> Optional[int]:
+    """在给定的行中找出得分最高的表头行（同分取靠前的行），没有匹配时返回None"""
+    keywords = list(keywords)
+    best_index, best_score = None, 0
+    for idx, row in enumerate(rows):
+        score = score_header_row(row, keywords)
+        if score > best_score:
+            best_index, best_score = idx, score
+    return best_index
+
+
+def probe_layout(filepath: str, max_rows: int = DEFAULT_PROBE_ROWS,
+                 keywords: Iterable[str] = HEADER_KEYWORDS) -> Optional[Dict]:
+    """探测文件结构，返回表头行、数据起始行和列名，未检测到表头时返回None"""
+    rows = probe_rows(filepath, max_rows)
+    header_row = detect_header_row(rows, keywords)
+    if header_row is None:
+        return None
+    return {
+        "header_row": header_row,
+        "data_start": header_row + 1,
+        "columns": [name for name in map(header_name, rows[header_row]) if name is not None],
+    }
+
+
+def convert_cell(value):
+    """与 pandas.read_excel 保持一致的单元格转换：空字符串视为缺失，整数值浮点数转为整数"""
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def header_name(value) -> Optional[str]:
+    """表头单元格转换为列名"""
+    if value is None:
+        return None
+    return str(value)
+
+
+def column_getter(positions: Sequence[int]) -> Callable[[Sequence], Tuple]:
+    """按位置取出一行中指定的单元格，总是返回元组"""
+    if not positions:
+        return lambda row: ()
+    if len(positions) == 1:
+        pos = positions[0]
+        return lambda row: (row[pos],)
+    return itemgetter(*positions)
+
+
+# 自动匹配列名：前几行 -> (表头行号, {文件中的列名: 标准列名})，无法匹配时为None
+LayoutResolve = Callable[[List[Tuple]], Optional[Tuple[int, Dict[str, str]]]]
+
+
+def read_mapped_columns(filepath: str, header_row_index: Optional[int], data_start_row: int,
+                        columns: Sequence[str], probe_rows: int = DEFAULT_PROBE_ROWS,
+                        keywords: Iterable[str] = HEADER_KEYWORDS,
+                        sheet: Optional[str] = None,
+                        resolve_layout: Optional[LayoutResolve] = None) -> pd.DataFrame:
+    """流式读取工作表中指定的列
+
+    header_row_index: 表头所在行（0-based），为None时在前 probe_rows 行中自动探测，
+                      数据从表头的下一行开始（忽略 data_start_row）
+    data_start_row: 数据起始行（0-based）
+    columns: 需要保留的列名，表头中不存在的列会被忽略
+    sheet: 工作表名称，为None时读取第一个工作表
+    resolve_layout: 自动匹配列名，根据前 probe_rows 行确定表头行和需要的列，
+                    读取后列名改为标准列名（忽略 header_row_index 和 columns）
+
+    返回的 DataFrame 只包含找到的列，完整表头记录在 df.attrs["header"] 中
+    """
+    rows = iter_sheet_rows(filepath, sheet)
+    renames: Dict[str, str] = {}
+
+    if resolve_layout is not None:
+        head = list(islice(rows, probe_rows))
+        resolved = resolve_layout(head)
+        if resolved is None:
+            rows.close()
+            return pd.DataFrame()
+        header_row_index, renames = resolved
+        columns = list(renames)
+        data_start_row = header_row_index + 1
+        rows = chain(head, rows)
+    elif header_row_index is None:
+        # 缓存前几行用于探测，之后从头继续读取同一个行迭代器
+        head = list(islice(rows, probe_rows))
+        header_row_index = detect_header_row(head, list(keywords) + list(columns))
+        if header_row_index is None:
+            rows.close()
+            return pd.DataFrame()
+        data_start_row = header_row_index + 1
+        rows = chain(head, rows)
+
+    header: Optional[Tuple] = None
+    for idx, row in enumerate(rows):
+        if idx == header_row_index:
+            header = row
+            break
+
+    if header is None:
+        return pd.DataFrame()
+
+    names = [header_name(cell) for cell in header]
+
+    # 列名 -> 列位置（重复列名取第一个）
+    positions: Dict[str, int] = {}
+    for col in columns:
+        if col in names and col not in positions:
+            positions[col] = names.index(col)
+
+    # 只取映射列的单元格，其余列的值不做任何转换
+    project = column_getter(list(positions.values()))
+    width = max(positions.values(), default=-1) + 1
+    records: List[Tuple] = []
+    for idx, row in enumerate(rows, start=header_row_index + 1):
+        if idx < data_start_row:
+            continue
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        records.append(tuple(map(convert_cell, project(row))))
+
+    df = pd.DataFrame.from_records(records, columns=list(positions))
+    if renames:
+        df = df.rename(columns=renames)
+    df.attrs["header"] = [name for name in names if name is not None]
+    return df
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑列类型
+来源文件、题型、难度等重复值很多的列使用分类类型，分值和难度转换为数值，
+其余文本列在安装了 pyarrow 时使用Arrow字符串，显著减少大题库的内存占用
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, union_categoricals
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE: Optional[pd.StringDtype] = pd.StringDtype("pyarrow")
+except ImportError:
+    STRING_DTYPE = None
+
+SOURCE_COLUMN = "来源文件"
+# 工作表名称列（配置了 excel_settings.sheets 时添加）
+SHEET_COLUMN = "工作表"
+
+
+def source_column(filename: str, length: int) -> pd.Categorical:
+    """整列都是同一个来源文件名的分类列"""
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), categories=[filename])
+
+
+def to_numeric(series: pd.Series) -> Optional[pd.Series]:
+    """所有非空值都是数字时返回数值列（无缺失的整数列缩小为最小的整数类型），否则返回None"""
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.notna().sum() != series.notna().sum():
+        return None
+    if numeric.notna().all() and (numeric % 1 == 0).all():
+        return pd.to_numeric(numeric, downcast='integer')
+    return numeric.astype('float64')
+
+
+def to_category(series: pd.Series) -> pd.Series:
+    """转换为分类列，类别统一为字符串"""
+    values = series.astype(object).where(series.notna(), None)
+    return values.map(lambda value: value if value is None else str(value)).astype('category')
+
+
+def to_string(series: pd.Series) -> pd.Series:
+    """转换为Arrow字符串列（未安装 pyarrow 时保持不变）"""
+    if STRING_DTYPE is None or series.dtype == STRING_DTYPE:
+        return series
+    # 非字符串的值按 str() 转换，缺失值为 <NA>；整列在Arrow中一次转换
+    return series.astype(STRING_DTYPE)
+
+
+def compact_frame(df: pd.DataFrame, column_map: Dict) -> pd.DataFrame:
+    """把清理后的题目数据转换为紧凑类型
+
+    题型、来源文件和工作表为分类列；分值为数值列（含非数字时保持文本）；
+    难度为数值列（含非数字时为分类列）；其余映射的文本列为Arrow字符串
+    """
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            converted[col] = series
+        elif col in (SOURCE_COLUMN, SHEET_COLUMN) or col == column_map["question_type"]:
+            converted[col] = to_category(series)
+        elif col == column_map["score"]:
+            numeric = to_numeric(series)
+            converted[col] = numeric if numeric is not None else to_string(series)
+        elif col == column_map["difficulty"]:
+            numeric = to_numeric(series)
+            converted[col] = numeric if numeric is not None else to_category(series)
+        else:
+            converted[col] = to_string(series)
+    return pd.DataFrame(converted, index=df.index, columns=df.columns)
+
+
+def common_dtype(dtypes: Iterable) -> object:
+    """多个数据块中同一列的共同类型：都是数值（或都是布尔）时为提升后的数值类型，否则为字符串"""
+    dtypes = list(dtypes)
+    if dtypes and all(is_bool_dtype(dtype) for dtype in dtypes):
+        return np.dtype(bool)
+    if dtypes and all(is_numeric_dtype(dtype) and not is_bool_dtype(dtype) and
+                      not isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+        if all(isinstance(dtype, np.dtype) for dtype in dtypes):
+            return np.result_type(*dtypes)
+        # 可空整数等扩展类型统一为浮点数，缺失值为NaN
+        return np.dtype('float64')
+    return STRING_DTYPE if STRING_DTYPE is not None else np.dtype(object)
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """合并多个数据块并保留分类列
+
+    pandas 合并类别不同的分类列时会退化为object，这里先统一各块的类别
+    """
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+
+    categorical = set()
+    for frame in frames:
+        categorical.update(col for col in frame.columns
+                           if isinstance(frame[col].dtype, pd.CategoricalDtype))
+
+    if categorical:
+        aligned = [frame.copy(deep=False) for frame in frames]
+        for col in categorical:
+            parts = {}
+            for i, frame in enumerate(aligned):
+                if col in frame.columns:
+                    series = frame[col]
+                    if not isinstance(series.dtype, pd.CategoricalDtype):
+                        series = to_category(series)
+                    parts[i] = series
+            categories = union_categoricals(list(parts.values())).categories
+            for i, series in parts.items():
+                aligned[i][col] = series.cat.set_categories(categories)
+        frames = aligned
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务模式
+本机HTTP服务（TCP或Unix套接字），解析结果和合并后的题库常驻内存，
+每次请求不再需要启动解释器、导入 pandas 和重新解析全部文件。
+文件解析在进程池中执行，合并和输出在线程中执行，事件循环始终可以响应其他请求
+
+接口（返回JSON，错误为 {"error": "..."}）：
+GET    /health           服务状态、数据版本和题目总数
+GET    /report           统计报告（与 generate_report 相同）
+GET    /sources          已加载的来源文件及题目数
+PUT    /sources/<文件名>  上传并新增或替换来源文件（请求体为文件内容，支持 Expect: 100-continue）；
+                         只能替换通过服务上传的文件，与原始文件同名时返回409
+DELETE /sources/<文件名>  删除上传的来源文件；输入目录中原有的文件只移出题库，不删除
+POST   /reload           重新扫描输入目录，只解析新增或修改的文件
+GET    /output/excel     下载合并后的Excel文件
+GET    /output/word      下载合并后的Word文档（ooxml 引擎）
+GET    /output/jsonl     逐块流式输出 JSON Lines
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from columnar import COLUMNAR_SUFFIXES
+from schema import concat_frames
+
+# 可以上传的文件类型
+SOURCE_SUFFIXES = {".xlsx", ".xls"} | COLUMNAR_SUFFIXES
+
+# 文件状态：(大小, 修改时间)
+FileState = Tuple[int, int]
+
+STATUS_TEXT = {100: "Continue", 200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 422: "Unprocessable Entity",
+               500: "Internal Server Error"}
+
+OUTPUT_TYPES = {
+    "excel": ("merged_questions.xlsx",
+              "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "word": ("merged_questions.docx",
+             "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+}
+
+# 流式输出和文件下载每次发送的大小
+STREAM_ROWS = 20000
+STREAM_BYTES = 1024 * 1024
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+
+async def read_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       max_body: int) -> Optional[Request]:
+    """读取一个HTTP/1.1请求，连接在请求行之前关闭时返回None
+
+    客户端发送 Expect: 100-continue 时（例如 curl -T），请求体大小检查通过后先回复
+    100 Continue，客户端不必等待超时再发送请求体
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "请求行格式错误")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Content-Length 格式错误")
+    if length > max_body:
+        raise HttpError(413, f"请求体超过上限 {max_body // 1024 // 1024}MB")
+    if headers.get("expect", "").lower() == "100-continue":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        await writer.drain()
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), unquote(urlsplit(target).path), headers, body)
+
+
+def response_head(status: int, content_type: str, length: Optional[int] = None,
+                  extra: Optional[Dict[str, str]] = None) -> bytes:
+    """响应头；length 为None时使用分块传输"""
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+             f"Content-Type: {content_type}", "Connection: close"]
+    lines.append(f"Content-Length: {length}" if length is not None
+                 else "Transfer-Encoding: chunked")
+    lines.extend(f"{name}: {value}" for name, value in (extra or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def json_default(value):
+    """numpy 数值（报告中的统计数量）转换为Python数值，其他对象转换为字符串"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+async def send_json(writer: asyncio.StreamWriter, status: int, data):
+    body = json.dumps(data, ensure_ascii=False, default=json_default).encode("utf-8")
+    writer.write(response_head(status, "application/json; charset=utf-8", len(body)) + body)
+    await writer.drain()
+
+
+def attachment(filename: str) -> Dict[str, str]:
+    return {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+
+
+def write_atomic(path: str, content: bytes):
+    """先写临时文件再替换，读取方不会看到写了一半的文件"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class MergeService:
+    """常驻内存的合并服务：按文件保存解析结果，来源变化时只解析变化的文件
+
+    所有修改（上传、删除、重新扫描）按顺序执行；读取接口使用最近一次合并的结果，
+    合并过程中仍然可以响应
+    """
+
+    def __init__(self, merger, input_dir: str = ".", file_pattern: Optional[str] = None,
+                 upload_dir: Optional[str] = None, max_upload_mb: float = 200):
+        self.merger = merger
+        self.input_dir = input_dir
+        self.file_pattern = file_pattern
+        self.upload_dir = upload_dir or input_dir
+        self.max_body = int(max_upload_mb * 1024 * 1024)
+
+        self.state: Dict[str, FileState] = {}
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.uploaded = set()
+        # 通过 DELETE 移出题库的输入文件（文件仍在输入目录中，重新扫描时不再加载）
+        self.excluded = set()
+        self.errors: Dict[str, str] = {}
+
+        # 最近一次合并的结果，整体替换
+        self.merged: Optional[pd.DataFrame] = None
+        self.report: Dict = {}
+        self.version = 0
+
+        self.update_lock: Optional[asyncio.Lock] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    async def start(self):
+        from merger import _init_worker
+
+        self.update_lock = asyncio.Lock()
+        self.executor = ProcessPoolExecutor(max_workers=self.merger.get_worker_count(),
+                                            initializer=_init_worker,
+                                            initargs=(self.merger.config,))
+        summary = await self.reload()
+        print(f"已加载 {len(self.frames)} 个文件（新增 {summary['新增']} 个），"
+              f"共 {len(self.merged) if self.merged is not None else 0} 道题目")
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    # ---- 来源文件 ----
+
+    def source_files(self) -> List[str]:
+        """来源文件的合并顺序：输入目录中的文件按 find_files 的顺序（与一次性合并一致），
+        不匹配文件模式的上传文件排在最后"""
+        files = [file for file in self.merger.find_files(self.input_dir, self.file_pattern)
+                 if file not in self.excluded]
+        found = set(files)
+        return files + sorted(file for file in self.uploaded if file not in found)
+
+    def snapshot(self) -> Dict[str, FileState]:
+        """来源文件的状态（按合并顺序），读取状态时已被删除的文件忽略"""
+        state = {}
+        for file in self.source_files():
+            try:
+                stat = os.stat(file)
+            except FileNotFoundError:
+                continue
+            state[file] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    async def parse(self, files: List[str]) -> List[Tuple[Optional[pd.DataFrame], Optional[str]]]:
+        """在进程池中并行解析，返回 (数据, 错误信息)，顺序与输入一致"""
+        from merger import _read_file_task
+
+        loop = asyncio.get_running_loop()
+
+        async def parse_one(file: str):
+            try:
+                data, error, _ = await loop.run_in_executor(self.executor, _read_file_task, file)
+            except Exception as e:
+                return None, f"工作进程异常: {e}"
+            return (None, error) if error is not None else (data, None)
+
+        return await asyncio.gather(*(parse_one(file) for file in files))
+
+    async def reload(self) -> Dict:
+        """重新扫描来源文件，只解析新增或修改的文件"""
+        async with self.update_lock:
+            current = await asyncio.to_thread(self.snapshot)
+            added = [file for file in current if file not in self.state]
+            changed = [file for file in current
+                       if file in self.state and current[file] != self.state[file]]
+            removed = [file for file in self.state if file not in current]
+
+            to_read = added + changed
+            for file, (data, error) in zip(to_read, await self.parse(to_read)):
+                if error is not None:
+                    # 读取失败（例如文件还在复制中），下次重新扫描时重试
+                    self.errors[file] = error
+                    self.frames.pop(file, None)
+                    current.pop(file)
+                else:
+                    self.errors.pop(file, None)
+                    self.frames[file] = data
+            for file in removed:
+                self.frames.pop(file, None)
+                self.errors.pop(file, None)
+                self.uploaded.discard(file)
+            self.state = current
+
+            if to_read or removed:
+                await self.remerge()
+            return {"新增": len(added), "修改": len(changed), "删除": len(removed),
+                    "读取失败": {self.display_name(f): e for f, e in self.errors.items()},
+                    "总题目数": len(self.merged) if self.merged is not None else 0}
+
+    def source_path(self, name: str) -> str:
+        """上传文件名对应的路径，只允许不含目录的受支持文件"""
+        if not name or name != os.path.basename(name) or name.startswith("."):
+            raise HttpError(400, f"文件名无效: {name}")
+        if os.path.splitext(name)[1].lower() not in SOURCE_SUFFIXES:
+            raise HttpError(400, f"不支持的文件类型: {name}"
+                                 f"（支持 {', '.join(sorted(SOURCE_SUFFIXES))}）")
+        return os.path.join(self.upload_dir, name)
+
+    async def put_source(self, name: str, content: bytes) -> Dict:
+        """新增或替换来源文件：先在临时目录中解析，成功后才替换原文件
+
+        只能替换通过服务上传的文件；上传目录默认为输入目录，与不是上传的文件同名时返回409，
+        以免覆盖用户的原始文件（之后的 DELETE 也会把它从磁盘删除）
+        """
+        path = self.source_path(name)
+        async with self.update_lock:
+            if path not in self.uploaded and await asyncio.to_thread(os.path.lexists, path):
+                raise HttpError(409, f"上传目录中已有同名的原始文件: {name}，"
+                                     f"不能通过上传覆盖（请换一个文件名）")
+            staging = await asyncio.to_thread(tempfile.mkdtemp, prefix="question_bank_upload_")
+            try:
+                # 来源名称取自文件名，临时文件与目标文件同名
+                staged = os.path.join(staging, name)
+                await asyncio.to_thread(write_atomic, staged, content)
+                [(data, error)] = await self.parse([staged])
+                if error is not None:
+                    raise HttpError(422, f"文件解析失败: {error}")
+                await asyncio.to_thread(write_atomic, path, content)
+            finally:
+                await asyncio.to_thread(shutil.rmtree, staging, True)
+
+            stat = os.stat(path)
+            replaced = path in self.frames
+            self.frames[path] = data
+            self.state[path] = (stat.st_size, stat.st_mtime_ns)
+            self.uploaded.add(path)
+            self.excluded.discard(path)
+            self.errors.pop(path, None)
+            await self.remerge()
+            return {"文件": name, "操作": "替换" if replaced else "新增", "题目数": len(data),
+                    "总题目数": len(self.merged) if self.merged is not None else 0}
+
+    async def delete_source(self, name: str) -> Dict:
+        """通过服务上传的文件从磁盘删除；输入目录中原有的文件只移出题库，不删除用户的数据"""
+        path = self.source_path(name)
+        async with self.update_lock:
+            if path not in self.frames:
+                raise HttpError(404, f"来源文件不存在: {name}")
+            if path in self.uploaded:
+                await asyncio.to_thread(os.remove, path)
+                self.uploaded.discard(path)
+                action = "删除"
+            else:
+                self.excluded.add(path)
+                action = "移出题库"
+            self.frames.pop(path)
+            self.state.pop(path, None)
+            await self.remerge()
+            return {"文件": name, "操作": action,
+                    "总题目数": len(self.merged) if self.merged is not None else 0}
+
+    def display_name(self, path: str) -> str:
+        return os.path.relpath(path, self.input_dir)
+
+    async def sources(self) -> List[Dict]:
+        files = await asyncio.to_thread(self.source_files)
+        return [{"文件": self.display_name(file), "题目数": len(self.frames[file])}
+                for file in self.merge_order(files)]
+
+    # ---- 合并 ----
+
+    def merge_order(self, files: List[str]) -> List[str]:
+        """已加载的文件按 source_files 的顺序排列（已从磁盘消失、尚未重新扫描的文件排在最后）"""
+        order = [file for file in files if file in self.frames]
+        listed = set(order)
+        return order + sorted(file for file in self.frames if file not in listed)
+
+    async def remerge(self):
+        """按来源文件的顺序重新合并（在线程中执行），完成后整体替换合并结果"""
+        order = self.merge_order(await asyncio.to_thread(self.source_files))
+        frames = [self.frames[file] for file in order if not self.frames[file].empty]
+        merged, report = await asyncio.to_thread(self._merge, frames)
+        self.merged, self.report = merged, report
+        self.version += 1
+
+    def _merge(self, frames: List[pd.DataFrame]) -> Tuple[Optional[pd.DataFrame], Dict]:
+        merger = self.merger
+        if not frames:
+            merger.merged_data = None
+            return None, {}
+        merged = concat_frames(frames)
+        merged = merger.deduplicate(merged)
+        merger.merged_data = merger.validate_answers(merged)
+        return merger.merged_data, merger.generate_report()
+
+    # ---- 输出 ----
+
+    def render(self, merged: pd.DataFrame, output: str) -> str:
+        """把合并结果写入临时文件，返回文件路径"""
+        from docx_writer import write_question_docx
+        from writers import iter_frame_rows, write_excel_rows
+
+        suffix = os.path.splitext(OUTPUT_TYPES[output][0])[1]
+        fd, path = tempfile.mkstemp(prefix="question_bank_output_", suffix=suffix)
+        os.close(fd)
+        try:
+            output_settings = self.merger.config["output_settings"]
+            if output == "excel":
+                write_excel_rows(path, list(merged.columns), iter_frame_rows(merged),
+                                 rollover=output_settings.get("excel_sheet_rollover", True))
+            else:
+                write_question_docx(path, list(merged.columns), iter_frame_rows(merged),
+                                    self.merger.config["column_mapping"],
+                                    output_settings["include_analysis"])
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    async def send_file_output(self, writer: asyncio.StreamWriter, merged: pd.DataFrame,
+                               output: str):
+        path = await asyncio.to_thread(self.render, merged, output)
+        try:
+            filename, content_type = OUTPUT_TYPES[output]
+            writer.write(response_head(200, content_type, os.path.getsize(path),
+                                       attachment(filename)))
+            with open(path, "rb") as f:
+                while True:
+                    block = await asyncio.to_thread(f.read, STREAM_BYTES)
+                    if not block:
+                        break
+                    writer.write(block)
+                    await writer.drain()
+        finally:
+            os.unlink(path)
+
+    async def send_jsonl(self, writer: asyncio.StreamWriter, merged: pd.DataFrame):
+        """分块传输：每次只转换 STREAM_ROWS 行"""
+        writer.write(response_head(200, "application/x-ndjson; charset=utf-8",
+                                   extra=attachment("merged_questions.jsonl")))
+        for start in range(0, len(merged), STREAM_ROWS):
+            chunk = merged.iloc[start:start + STREAM_ROWS]
+            text = await asyncio.to_thread(chunk.to_json, orient="records", lines=True,
+                                           force_ascii=False)
+            data = (text if text.endswith("\n") else text + "\n").encode("utf-8")
+            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # ---- HTTP ----
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await read_request(reader, writer, self.max_body)
+            if request is not None:
+                await self.dispatch(request, writer)
+        except HttpError as e:
+            await send_json(writer, e.status, {"error": e.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"[ERROR] 处理请求失败: {e}")
+            try:
+                await send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, request: Request, writer: asyncio.StreamWriter):
+        method, path = request.method, request.path.rstrip("/") or "/"
+
+        if path == "/health" and method == "GET":
+            await send_json(writer, 200, {
+                "status": "ok", "version": self.version,
+                "总题目数": len(self.merged) if self.merged is not None else 0})
+        elif path == "/report" and method == "GET":
+            await send_json(writer, 200, self.report)
+        elif path == "/sources" and method == "GET":
+            await send_json(writer, 200, await self.sources())
+        elif path == "/reload" and method == "POST":
+            await send_json(writer, 200, await self.reload())
+        elif path.startswith("/sources/") and method == "PUT":
+            await send_json(writer, 200, await self.put_source(path[len("/sources/"):],
+                                                               request.body))
+        elif path.startswith("/sources/") and method == "DELETE":
+            await send_json(writer, 200, await self.delete_source(path[len("/sources/"):]))
+        elif path.startswith("/output/") and method == "GET":
+            output = path[len("/output/"):]
+            merged = self.merged
+            if output not in OUTPUT_TYPES and output != "jsonl":
+                raise HttpError(404, f"不支持的输出格式: {output}（excel、word 或 jsonl）")
+            if merged is None or merged.empty:
+                raise HttpError(404, "没有合并后的数据")
+            if output == "jsonl":
+                await self.send_jsonl(writer, merged)
+            else:
+                await self.send_file_output(writer, merged, output)
+        elif path in ("/health", "/report", "/sources", "/reload") or \
+                path.startswith(("/sources/", "/output/")):
+            raise HttpError(405, f"不支持的请求方法: {method} {path}")
+        else:
+            raise HttpError(404, f"未知的接口: {path}")
+
+
+async def serve_forever(service: MergeService, host: str = "127.0.0.1", port: int = 8765,
+                        socket_path: Optional[str] = None):
+    await service.start()
+    if socket_path:
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+        address = socket_path
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        address = f"http://{host}:{port}"
+    print(f"[SUCCESS] 服务已启动: {address}，按 Ctrl+C 停止")
+    async with server:
+        await server.serve_forever()
+
+
+def run_server(service: MergeService, host: str = "127.0.0.1", port: int = 8765,
+               socket_path: Optional[str] = None):
+    """启动服务直到 Ctrl+C"""
+    try:
+        asyncio.run(serve_forever(service, host, port, socket_path))
+    except KeyboardInterrupt:
+        print("\n服务已停止")
+    finally:
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+溢出到磁盘
+按内存预算保存合并过程中的数据块：内存中的数据块超过预算时写入临时文件，
+之后的统计和写出按顺序逐块读取，内存占用与输入总量无关。
+安装了 pyarrow 时临时文件为Arrow IPC格式，否则为pickle
+"""
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Dict, Iterator, List, Optional, Set, Union
+
+import pandas as pd
+
+from columnar import PYARROW_AVAILABLE, arrow_table
+from schema import common_dtype
+
+
+class SpillStore:
+    """按追加顺序保存数据块，超出内存预算时把内存中的数据块写入临时目录
+
+    所有数据块的列相同（由调用方对齐）。chunk_rows 为写入磁盘时每个文件的最大行数，
+    也是读回时一次加载的最大行数
+    """
+
+    def __init__(self, budget_bytes: int, spill_dir: Optional[str] = None,
+                 chunk_rows: int = 20000):
+        self.budget_bytes = max(0, budget_bytes)
+        self.chunk_rows = max(1, chunk_rows)
+        self.suffix = ".arrow" if PYARROW_AVAILABLE else ".pkl"
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="question_bank_spill_", dir=spill_dir)
+        # 对象被回收或程序退出时删除临时目录
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+        # 内存中的数据块，或已写入磁盘的文件路径
+        self.chunks: List[Union[pd.DataFrame, str]] = []
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, Set] = {}
+        self.rows = 0
+        self.memory_bytes = 0
+        self.spilled_files = 0
+        self.spilled_bytes = 0
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def append(self, frame: pd.DataFrame):
+        if frame.empty:
+            return
+        if not self.columns:
+            self.columns = list(frame.columns)
+        for col in frame.columns:
+            self.dtypes.setdefault(col, set()).add(frame[col].dtype)
+        self.chunks.append(frame)
+        self.rows += len(frame)
+        self.memory_bytes += int(frame.memory_usage(deep=True).sum())
+        if self.memory_bytes > self.budget_bytes:
+            self.spill()
+
+    def spill(self):
+        """把内存中的数据块按 chunk_rows 切分写入临时文件"""
+        chunks = []
+        for chunk in self.chunks:
+            if isinstance(chunk, str):
+                chunks.append(chunk)
+                continue
+            for start in range(0, len(chunk), self.chunk_rows):
+                chunks.append(self.write(chunk.iloc[start:start + self.chunk_rows]))
+        self.chunks = chunks
+        self.memory_bytes = 0
+
+    def write(self, frame: pd.DataFrame) -> str:
+        path = os.path.join(self.directory, f"{self.spilled_files:06d}{self.suffix}")
+        frame = frame.reset_index(drop=True)
+        if PYARROW_AVAILABLE:
+            # 混合类型的object列（compact_dtypes 为false时常见，例如文本和数字混合的分值）
+            # Arrow无法直接保存，与写出列式文件时一样转换为字符串
+            from pyarrow import feather
+            feather.write_feather(arrow_table(frame), path)
+        else:
+            frame.to_pickle(path)
+        self.spilled_files += 1
+        self.spilled_bytes += os.path.getsize(path)
+        return path
+
+    def read(self, path: str) -> pd.DataFrame:
+        if PYARROW_AVAILABLE:
+            return pd.read_feather(path)
+        return pd.read_pickle(path)
+
+    def uniform_dtypes(self) -> Dict[str, object]:
+        """各列在所有数据块中的共同类型（写出列式文件时各块的类型需要一致）"""
+        return {col: common_dtype(dtypes) for col, dtypes in self.dtypes.items()}
+
+    def iter_frames(self, uniform: bool = False) -> Iterator[pd.DataFrame]:
+        """按追加顺序逐块产出数据；uniform 为True时转换为各列的共同类型"""
+        dtypes = self.uniform_dtypes() if uniform else {}
+        for chunk in self.chunks:
+            frame = self.read(chunk) if isinstance(chunk, str) else chunk
+            if dtypes:
+                frame = frame.assign(**{col: frame[col].astype(dtype)
+                                        for col, dtype in dtypes.items()
+                                        if frame[col].dtype != dtype})
+            yield frame
+
+    def close(self):
+        self.chunks = []
+        self._finalizer()
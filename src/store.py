@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite题库
+把合并后的题目写入SQLite数据库：按来源、题型、难度建立索引，
+并对题干、选项和解析建立FTS5全文索引。中文按相邻两个字（bigram）分词，
+不依赖额外的分词器，搜索百万级题库只需毫秒级
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+SCHEMA_VERSION = 1
+TOKENIZER_NAME = "cjk-bigram-v1"
+
+# 连续的中日韩字符，或连续的字母数字
+_TOKEN_RUNS = re.compile(r'([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af]+)'
+                         r'|([0-9A-Za-z\u00c0-\u024f]+)')
+
+SCHEMA_SQL = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE questions (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    question_type TEXT,
+    stem TEXT,
+    options TEXT,
+    answer TEXT,
+    analysis TEXT,
+    score,
+    difficulty
+);
+CREATE VIRTUAL TABLE questions_fts USING fts5(
+    stem, options, analysis, content='', tokenize='unicode61'
+);
+"""
+
+INDEX_SQL = """
+CREATE INDEX idx_questions_source ON questions (source);
+CREATE INDEX idx_questions_type ON questions (question_type);
+CREATE INDEX idx_questions_difficulty ON questions (difficulty);
+"""
+
+
+def cjk_runs(text: str) -> Iterator[tuple]:
+    """切分为 (是否中日韩字符, 片段)"""
+    for match in _TOKEN_RUNS.finditer(text):
+        cjk, word = match.groups()
+        if cjk:
+            yield True, cjk
+        else:
+            yield False, word.lower()
+
+
+def bigram_tokens(text) -> str:
+    """索引用的分词结果（空格分隔）
+
+    中日韩字符切分为相邻两个字的组合，每段最后一个字再单独作为一个词，
+    这样任意一个字都是某个词的开头，单字查询可以用前缀匹配
+    """
+    if text is None:
+        return ''
+    tokens: List[str] = []
+    for cjk, run in cjk_runs(str(text)):
+        if cjk:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return ' '.join(tokens)
+
+
+def match_expression(query: str) -> Optional[str]:
+    """把查询文本转换为FTS5查询：每个片段是一个短语，片段之间为AND"""
+    terms = []
+    for cjk, run in cjk_runs(query):
+        if cjk and len(run) == 1:
+            terms.append(f'"{run}"*')
+        elif cjk:
+            terms.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+        else:
+            terms.append(f'"{run}"')
+    return ' AND '.join(terms) or None
+
+
+def db_value(value):
+    """单元格值转换为SQLite可以保存的类型"""
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def question_records(columns: Sequence[str], rows: Iterable[Sequence],
+                     column_map: Dict) -> Iterator[tuple]:
+    """把题目行转换为 (questions 表的记录, 选项列表)"""
+    positions = {col: i for i, col in enumerate(columns)}
+
+    def getter(col):
+        pos = positions.get(col)
+        return (lambda row: None) if pos is None else (lambda row: db_value(row[pos]))
+
+    fields = [getter("来源文件")] + [getter(column_map[key]) for key in
+                                     ("question_type", "question_text", "correct_answer",
+                                      "analysis", "score", "difficulty")]
+    options = [getter(opt) for opt in column_map["options"]]
+
+    for row in rows:
+        source, question_type, stem, answer, analysis, score, difficulty = \
+            (get(row) for get in fields)
+        option_values = [get(row) for get in options]
+        while option_values and option_values[-1] is None:
+            option_values.pop()
+        record = (source, question_type, stem,
+                  json.dumps(option_values, ensure_ascii=False) if option_values else None,
+                  answer, analysis, score, difficulty)
+        yield record, option_values
+
+
+def write_question_db(output_path: str, columns: Sequence[str], rows: Iterable[Sequence],
+                      column_map: Dict, batch_size: int = 50000) -> int:
+    """把题目行写入新的SQLite数据库，返回题目数量
+
+    先写入临时文件，建好索引后再替换目标文件；每 batch_size 道题提交一次事务
+    """
+    tmp_path = output_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA_SQL)
+
+        total = 0
+        batch: List[tuple] = []
+
+        def flush():
+            nonlocal total
+            conn.executemany(
+                "INSERT INTO questions (id, source, question_type, stem, options, answer, "
+                "analysis, score, difficulty) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((total + i + 1,) + record for i, (record, _) in enumerate(batch)))
+            conn.executemany(
+                "INSERT INTO questions_fts (rowid, stem, options, analysis) VALUES (?, ?, ?, ?)",
+                ((total + i + 1, bigram_tokens(record[2]),
+                  ' '.join(bigram_tokens(option) for option in options if option is not None),
+                  bigram_tokens(record[5]))
+                 for i, (record, options) in enumerate(batch)))
+            total += len(batch)
+            conn.commit()
+            batch.clear()
+
+        for item in question_records(columns, rows, column_map):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        conn.executescript(INDEX_SQL)
+        conn.execute("INSERT INTO questions_fts (questions_fts) VALUES ('optimize')")
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("schema_version", str(SCHEMA_VERSION)),
+            ("tokenizer", TOKENIZER_NAME),
+            ("created_at", time.strftime("%Y-%m-%d %H:%M:%S")),
+            ("total", str(total)),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, output_path)
+    return total
+
+
+def search_questions(db_path: str, query: Optional[str] = None, source: Optional[str] = None,
+                     question_type: Optional[str] = None, difficulty=None,
+                     limit: int = 20) -> List[Dict]:
+    """搜索题目：query 在题干、选项和解析中全文搜索，其余条件精确匹配"""
+    conditions, params = [], []
+    match = match_expression(query) if query else None
+    if query and match is None:
+        return []
+    if match:
+        conditions.append("q.id IN (SELECT rowid FROM questions_fts WHERE questions_fts MATCH ?)")
+        params.append(match)
+    for column, value in (("source", source), ("question_type", question_type),
+                          ("difficulty", difficulty)):
+        if value is not None:
+            conditions.append(f"q.{column} = ?")
+            params.append(value)
+
+    sql = "SELECT * FROM questions q"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY q.id LIMIT ?"
+    params.append(limit)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        results = []
+        for row in conn.execute(sql, params):
+            question = dict(row)
+            question["options"] = json.loads(question["options"]) if question["options"] else []
+            results.append(question)
+        return results
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索SQLite题库")
+    parser.add_argument("database", help="由 --output-sqlite 生成的数据库文件")
+    parser.add_argument("query", nargs="?", help="在题干、选项和解析中搜索的文本")
+    parser.add_argument("--source", help="来源文件")
+    parser.add_argument("--type", dest="question_type", help="题型")
+    parser.add_argument("--difficulty", help="难度")
+    parser.add_argument("--limit", type=int, default=20, help="最多显示的题目数（默认20）")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+
+    args = parser.parse_args()
+
+    difficulty = args.difficulty
+    if difficulty is not None:
+        # 难度按数值保存时也能匹配
+        try:
+            difficulty = float(difficulty) if '.' in difficulty else int(difficulty)
+        except ValueError:
+            pass
+
+    start = time.perf_counter()
+    results = search_questions(args.database, args.query, args.source, args.question_type,
+                               difficulty, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    for question in results:
+        print(f"{question['id']}. [{question['question_type']}] {question['stem']}"
+              f"  （{question['source']}）")
+        for i, option in enumerate(question["options"]):
+            if option is not None:
+                print(f"   {chr(65 + i)}. {option}")
+        if question["answer"] is not None:
+            print(f"   正确答案：{question['answer']}")
+    print(f"\n找到 {len(results)} 道题目，用时 {elapsed:.1f} 毫秒")
+
+
+if __name__ == "__main__":
+    main()
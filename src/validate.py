@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+答案校验
+检查正确答案与题型、选项是否一致。所有规则都是整列的字符串和布尔运算，
+不逐行循环；答案列只对不同的取值计算一次，百万道题目不到一秒。问题代码：
+
+选项为空  选择题答案中的字母对应的选项为空（或超出配置的选项数量）
+答案格式  选择题答案不是选项字母（分隔符、空白和全角字母会先规范化）
+单选多答  单选题答案不是恰好一个字母
+多选顺序  多选题答案的字母重复或没有按顺序排列
+判断答案  判断题答案不是配置的取值（默认 对/错）
+
+答案缺失的题目已在“答案缺失统计”中统计，不再重复标记
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schema import SOURCE_COLUMN, STRING_DTYPE
+
+# 校验问题列（多个问题用“；”分隔，没有问题时为空）
+ISSUE_COLUMN = "校验问题"
+
+# 问题代码，按位组合
+ISSUE_CODES = ["选项为空", "答案格式", "单选多答", "多选顺序", "判断答案"]
+OPTION_EMPTY, ANSWER_FORMAT, SINGLE_COUNT, MULTI_ORDER, JUDGE_ANSWER = \
+    (np.uint8(1 << i) for i in range(len(ISSUE_CODES)))
+
+DEFAULT_VALIDATION_SETTINGS = {
+    "mode": "off",
+    "single_choice_types": ["单选题"],
+    "multi_choice_types": ["多选题"],
+    "judge_types": ["判断题"],
+    "judge_answers": ["对", "错"],
+}
+
+
+def as_string(series: pd.Series) -> pd.Series:
+    """转换为字符串列（有 pyarrow 时为Arrow字符串，字符串运算在Arrow中完成），缺失值保持缺失"""
+    if STRING_DTYPE is not None:
+        return series.astype(STRING_DTYPE)
+    return series.astype(object).where(series.notna(), None).map(
+        lambda value: value if value is None else str(value))
+
+
+def normalize_answer(series: pd.Series) -> pd.Series:
+    """全角转半角、大写，去除空白和常见分隔符（A, C / A、C → AC）"""
+    return (as_string(series)
+            .str.normalize('NFKC')
+            .str.upper()
+            .str.replace(r'[\s,;/、.|]+', '', regex=True))
+
+
+def _mask(result: pd.Series) -> np.ndarray:
+    """字符串运算的结果转换为布尔数组，缺失值为False"""
+    return result.fillna(False).to_numpy(dtype=bool)
+
+
+# 只匹配按字母顺序排列且不重复的答案：A?B?C?……Z?
+_ASCENDING_LETTERS = ''.join(f'{chr(65 + i)}?' for i in range(26))
+
+
+def find_answer_issues(df: pd.DataFrame, column_map: Dict,
+                       settings: Dict = None) -> np.ndarray:
+    """逐列计算每道题目的问题代码（按位组合的 uint8 数组，0 表示没有问题）"""
+    settings = {**DEFAULT_VALIDATION_SETTINGS, **(settings or {})}
+    issues = np.zeros(len(df), dtype=np.uint8)
+    type_col, answer_col = column_map["question_type"], column_map["correct_answer"]
+    if df.empty or type_col not in df.columns or answer_col not in df.columns:
+        return issues
+
+    question_types = df[type_col]
+    single = _mask(question_types.isin(settings["single_choice_types"]))
+    multi = _mask(question_types.isin(settings["multi_choice_types"]))
+    judge = _mask(question_types.isin(settings["judge_types"]))
+
+    # 答案的不同取值通常只有几十种：字符串运算只对不同的取值做一次，再按编码展开到每一行
+    codes, uniques = pd.factorize(df[answer_col], use_na_sentinel=True)
+    uniques = pd.Series(uniques)
+    answer = normalize_answer(uniques)
+
+    def per_row(result: pd.Series) -> np.ndarray:
+        values = np.append(_mask(result), False)
+        return values[codes]  # 缺失值的编码为 -1，对应末尾的 False
+
+    present = per_row(answer.str.len() > 0)
+    choice = (single | multi) & present
+
+    # 选择题：答案只能由A-Z组成
+    letters_only = per_row(answer.str.fullmatch(r'[A-Z]+'))
+    issues[choice & ~letters_only] |= ANSWER_FORMAT
+    valid = choice & letters_only
+
+    # 答案引用的每个选项都不能为空：对每个选项列计算“答案包含该字母且选项为空”
+    options = list(column_map["options"])
+    letters = [chr(65 + i) for i in range(len(options))]
+    referenced_empty = np.zeros(len(df), dtype=bool)
+    for letter, col in zip(letters, options):
+        if col in df.columns:
+            empty = ~_mask(as_string(df[col]).str.strip().str.len() > 0)
+        else:
+            empty = np.ones(len(df), dtype=bool)
+        referenced_empty |= empty & per_row(answer.str.contains(letter, regex=False))
+    if letters:
+        # 超出选项数量的字母（例如只配置了4个选项时的E）
+        referenced_empty |= per_row(answer.str.contains(f'[^A-{letters[-1]}]'))
+    issues[valid & referenced_empty] |= OPTION_EMPTY
+
+    # 单选题只能有一个字母
+    issues[valid & single & per_row(answer.str.len() != 1)] |= SINGLE_COUNT
+
+    # 多选题字母按顺序排列且不重复
+    issues[valid & multi & ~per_row(answer.str.fullmatch(_ASCENDING_LETTERS))] |= MULTI_ORDER
+
+    # 判断题答案只能是配置的取值
+    judge_values = as_string(uniques).str.strip()
+    issues[judge & present & ~per_row(judge_values.isin(settings["judge_answers"]))] |= JUDGE_ANSWER
+    return issues
+
+
+def issue_labels(issues: np.ndarray) -> pd.Categorical:
+    """问题代码转换为分类列，只对出现过的组合生成一次文本"""
+    unique, inverse = np.unique(issues, return_inverse=True)
+    labels = ['；'.join(code for i, code in enumerate(ISSUE_CODES) if value & (1 << i))
+              for value in unique.tolist()]
+    # 没有问题（0）的题目为缺失值
+    keep = unique != 0
+    codes = np.where(keep[inverse], (np.cumsum(keep) - 1)[inverse], -1)
+    return pd.Categorical.from_codes(codes, categories=[label for label, k in zip(labels, keep) if k])
+
+
+def issue_counts(issues: np.ndarray) -> Dict[str, int]:
+    """各问题代码的题目数量"""
+    return {code: int(np.count_nonzero(issues & (1 << i)))
+            for i, code in enumerate(ISSUE_CODES) if np.any(issues & (1 << i))}
+
+
+def validate_answers(df: pd.DataFrame, column_map: Dict, settings: Dict = None,
+                     mode: str = "flag") -> Tuple[pd.DataFrame, Dict]:
+    """校验答案与题型、选项是否一致
+
+    mode 为 "flag" 时添加校验问题列；为 "drop" 时删除有问题的题目
+    返回处理后的数据和统计信息
+    """
+    issues = find_answer_issues(df, column_map, settings)
+    flagged = issues != 0
+
+    by_source = {}
+    if SOURCE_COLUMN in df.columns:
+        counts = df.loc[flagged, SOURCE_COLUMN].astype(object).value_counts()
+        by_source = {source: int(count) for source, count in counts.items()}
+
+    if mode == "drop":
+        result = df[~flagged].reset_index(drop=True)
+    else:
+        result = df.copy()
+        result[ISSUE_COLUMN] = issue_labels(issues)
+
+    stats = {
+        "问题数量": int(flagged.sum()),
+        "处理方式": "删除" if mode == "drop" else "标记",
+        "按问题统计": issue_counts(issues),
+        "按来源统计": by_source,
+    }
+    return result, stats
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式
+监视输入目录，文件新增、修改或删除时只重新读取变化的文件，
+其余文件的解析结果保留在内存中，合并后重新生成输出。
+安装了 watchdog 时使用系统的文件变化通知（Linux 上为 inotify），否则定时轮询
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from schema import concat_frames
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+# 文件状态：(大小, 修改时间)
+FileState = Tuple[int, int]
+
+# 不会改变文件内容的事件
+IGNORED_EVENTS = {"opened", "closed_no_write"}
+
+
+class MergeWatcher:
+    """增量合并：按文件保存解析结果，每次变化后只解析变化的文件
+
+    on_merged 在每次合并完成后调用（例如保存Excel/Word），参数为合并器
+    """
+
+    def __init__(self, merger, input_dir: str = ".", file_pattern: Optional[str] = None,
+                 debounce: float = 2.0, poll_interval: float = 1.0, use_polling: bool = False,
+                 on_merged: Optional[Callable] = None):
+        self.merger = merger
+        self.input_dir = input_dir
+        self.file_pattern = file_pattern
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_polling = use_polling or not WATCHDOG_AVAILABLE
+        self.on_merged = on_merged
+
+        self.state: Dict[str, FileState] = {}
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.changed = threading.Event()
+        self.stopped = threading.Event()
+
+    def snapshot(self) -> Dict[str, FileState]:
+        """当前匹配的文件及其状态（按 find_files 的顺序），读取状态时已被删除的文件忽略"""
+        state = {}
+        for file in self.merger.find_files(self.input_dir, self.file_pattern):
+            try:
+                stat = os.stat(file)
+            except FileNotFoundError:
+                continue
+            state[file] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    def update(self) -> bool:
+        """比较文件状态并增量合并，没有变化时返回False"""
+        current = self.snapshot()
+        added = [file for file in current if file not in self.state]
+        changed = [file for file in current
+                   if file in self.state and current[file] != self.state[file]]
+        removed = [file for file in self.state if file not in current]
+
+        if not (added or changed or removed):
+            return False
+
+        print(f"\n检测到变化: 新增 {len(added)} 个, 修改 {len(changed)} 个, 删除 {len(removed)} 个文件")
+
+        merger = self.merger
+        # 统计数据只保留最近一次增量合并
+        merger.metrics.clear()
+        # 按 find_files 的顺序读取和合并，与一次性合并的结果顺序一致
+        to_read = [file for file in current if file not in self.state or file in changed]
+        for file, data in zip(to_read, merger.read_files(to_read)):
+            if file in merger.failed_files:
+                # 读取失败（例如文件还在复制中），下次文件变化时重试
+                self.frames.pop(file, None)
+            else:
+                self.frames[file] = data
+        for file in removed:
+            self.frames.pop(file, None)
+        self.state = current
+
+        frames = [self.frames[file] for file in current
+                  if file in self.frames and not self.frames[file].empty]
+        if frames:
+            with merger.metrics.stage("concat", rows=sum(len(frame) for frame in frames)):
+                merged = concat_frames(frames)
+            with merger.metrics.stage("dedup", rows=len(merged)):
+                merger.merged_data = merger.deduplicate(merged)
+            with merger.metrics.stage("validate", rows=len(merger.merged_data)):
+                merger.merged_data = merger.validate_answers(merger.merged_data)
+            print(f"当前共 {len(merger.merged_data)} 道题目（{len(frames)} 个文件）")
+        else:
+            merger.merged_data = None
+            print("没有成功读取任何文件")
+
+        if self.on_merged is not None:
+            self.on_merged(merger)
+        return True
+
+    def wait_for_change(self) -> bool:
+        """等待文件变化，并在变化停止 debounce 秒后返回；停止监视时返回False"""
+        if self.use_polling:
+            while not self.stopped.wait(self.poll_interval):
+                if self.snapshot() != self.state:
+                    break
+            else:
+                return False
+            # 连续两次快照相同才认为变化已经结束
+            previous = self.snapshot()
+            while not self.stopped.wait(self.debounce):
+                current = self.snapshot()
+                if current == previous:
+                    return True
+                previous = current
+            return False
+
+        while not self.changed.wait(self.poll_interval):
+            if self.stopped.is_set():
+                return False
+        self.changed.clear()
+        while self.changed.wait(self.debounce):
+            self.changed.clear()
+        return not self.stopped.is_set()
+
+    def run(self):
+        """完整合并一次，之后持续监视直到 stop() 或 Ctrl+C"""
+        self.update()
+
+        observer = None
+        if not self.use_polling:
+            observer = Observer()
+            observer.schedule(_ChangeHandler(self.changed), self.input_dir, recursive=True)
+            observer.start()
+        mode = "轮询" if self.use_polling else "文件变化通知"
+        print(f"\n正在监视 {os.path.abspath(self.input_dir)}（{mode}），按 Ctrl+C 停止")
+
+        try:
+            while self.wait_for_change():
+                start = time.perf_counter()
+                if self.update():
+                    print(f"增量合并完成，用时 {time.perf_counter() - start:.2f} 秒")
+        except KeyboardInterrupt:
+            print("\n已停止监视")
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        self.stopped.set()
+        self.changed.set()
+
+
+if WATCHDOG_AVAILABLE:
+    class _ChangeHandler(FileSystemEventHandler):
+        """任何文件事件都只唤醒监视循环，实际变化由文件状态比较决定"""
+
+        def __init__(self, changed: threading.Event):
+            super().__init__()
+            self.changed = changed
+
+        def on_any_event(self, event):
+            # 只读打开/关闭（包括本工具读取文件）不算变化
+            if not event.is_directory and event.event_type not in IGNORED_EVENTS:
+                self.changed.set()
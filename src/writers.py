@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式Excel写入
+基于 openpyxl 只写模式逐行写出，内存占用与行数无关
+"""
+from typing import Iterable, Iterator, Sequence, Tuple
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Excel单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+
+def iter_frame_rows(df: pd.DataFrame, chunk_size: int = 10000) -> Iterator[Tuple]:
+    """按块把DataFrame转换为行元组，缺失值转换为None"""
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def write_excel_rows(output_path: str, columns: Sequence[str], rows: Iterable[Sequence],
+                     sheet_name: str = "Sheet1", rollover: bool = True,
+                     max_rows: int = EXCEL_MAX_ROWS) -> int:
+    """逐行写出Excel文件，返回写入的数据行数
+
+    rows 可以是任意可迭代对象（例如生成器），不需要事先准备完整的数据。
+    rollover 为True时，工作表写满后自动新建工作表（Sheet1_2、Sheet1_3……）继续写入，
+    否则超出行数上限时抛出 ValueError
+    """
+    workbook = Workbook(write_only=True)
+    header = list(columns)
+
+    def new_sheet(index: int):
+        title = sheet_name if index == 1 else f"{sheet_name}_{index}"
+        worksheet = workbook.create_sheet(title=title)
+        worksheet.append(header)
+        return worksheet
+
+    sheet_index = 1
+    worksheet = new_sheet(sheet_index)
+    sheet_rows = 1
+    total = 0
+
+    for row in rows:
+        if sheet_rows >= max_rows:
+            if not rollover:
+                raise ValueError(f"数据超过Excel单个工作表的行数上限 {max_rows}")
+            sheet_index += 1
+            worksheet = new_sheet(sheet_index)
+            sheet_rows = 1
+        worksheet.append(row)
+        sheet_rows += 1
+        total += 1
+
+    workbook.save(output_path)
+    return total
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""cache.py 的回归测试"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cache import ParsedFileCache  # noqa: E402
+
+
+def test_put_skips_file_changed_during_parse(tmp_path):
+    source = tmp_path / "bank.xlsx"
+    source.write_bytes(b"old")
+    cache = ParsedFileCache(str(tmp_path / "cache"), {})
+
+    stamp = cache.stamp(str(source))
+    # 解析期间文件被替换
+    source.write_bytes(b"new content")
+    os.utime(source, ns=(stamp["mtime_ns"] + 10**9, stamp["mtime_ns"] + 10**9))
+
+    assert not cache.put(str(source), pd.DataFrame({"题干": ["旧内容"]}), stamp)
+    assert cache.get(str(source)) is None
+
+
+def test_put_and_get_unchanged_file(tmp_path):
+    source = tmp_path / "bank.xlsx"
+    source.write_bytes(b"content")
+    cache = ParsedFileCache(str(tmp_path / "cache"), {})
+
+    stamp = cache.stamp(str(source))
+    assert cache.put(str(source), pd.DataFrame({"题干": ["题目"]}), stamp)
+    assert cache.get(str(source))["题干"].tolist() == ["题目"]
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""dedup.py 的测试：精确重复和近似重复的标记与删除"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dedup import (CLUSTER_COLUMN, DUPLICATE_COLUMN,  # noqa: E402
+                   find_exact_duplicates, find_near_duplicates, lsh_candidate_pairs,
+                   minhash_signatures)
+from merger import validate_config  # noqa: E402
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
+
+COLUMN_MAP = {
+    "question_type": "题型",
+    "question_text": "题干",
+    "correct_answer": "正确答案",
+    "analysis": "解析",
+    "options": ["选项A", "选项B"],
+}
+
+
+def bank(stems, sources=None):
+    n = len(stems)
+    return pd.DataFrame({
+        "题型": ["单选题"] * n,
+        "题干": stems,
+        "选项A": ["正确"] * n,
+        "选项B": ["错误"] * n,
+        "正确答案": ["A"] * n,
+        "来源文件": sources or ["第1章"] * n,
+    })
+
+
+NEAR_STEMS = [
+    "下列关于细胞膜结构的叙述中，正确的是哪一项",
+    "下列关于细胞膜结构的叙述中，正确的是哪一项？",
+    "光合作用的暗反应发生在叶绿体的哪个部位",
+    "人体最大的器官是什么",
+]
+
+
+def test_near_duplicates_flag_groups_similar_questions():
+    result, stats = find_near_duplicates(bank(NEAR_STEMS), COLUMN_MAP, mode="flag")
+
+    clusters = result[CLUSTER_COLUMN]
+    assert clusters[0] == clusters[1]
+    assert clusters[2:].isna().all()
+    assert stats["相似题组数"] == 1
+    assert stats["涉及题目数"] == 2
+    assert stats["删除题目数"] == 0
+
+
+def test_near_duplicates_drop_keeps_first_of_group():
+    df = bank(NEAR_STEMS, ["第1章", "第2章", "第1章", "第1章"])
+    result, stats = find_near_duplicates(df, COLUMN_MAP, mode="drop")
+
+    assert stats["删除题目数"] == 1
+    assert result["题干"].tolist() == [NEAR_STEMS[0]] + NEAR_STEMS[2:]
+    assert result["来源文件"].tolist()[0] == "第1章"
+
+
+def test_near_duplicates_distinct_chinese_questions_are_not_grouped():
+    stems = [f"第{i}题：{word}的主要功能是什么" for i, word in
+             enumerate(["线粒体", "核糖体", "高尔基体", "内质网", "溶酶体"])]
+    result, stats = find_near_duplicates(bank(stems), COLUMN_MAP, mode="drop")
+    assert stats["相似题组数"] == 0
+    assert len(result) == len(stems)
+
+
+@pytest.mark.parametrize("bands", [0, 3, 65])
+def test_lsh_rejects_invalid_band_count(bands):
+    signatures = minhash_signatures(["甲乙丙丁", "甲乙丙戊"], num_perm=64)
+    with pytest.raises(ValueError):
+        lsh_candidate_pairs(signatures, bands)
+
+
+def test_lsh_pairs_identical_signatures():
+    signatures = np.array([[1, 2, 3, 4], [1, 2, 3, 4], [5, 6, 7, 8]], dtype=np.uint32)
+    lefts, rights = lsh_candidate_pairs(signatures, 2)
+    assert set(zip(lefts.tolist(), rights.tolist())) == {(0, 1)}
+
+
+@pytest.mark.parametrize("settings, valid", [
+    ({"num_perm": 64, "lsh_bands": 16}, True),
+    ({"num_perm": 64, "lsh_bands": 64}, True),
+    ({"num_perm": 64, "lsh_bands": 128}, False),
+    ({"num_perm": 64, "lsh_bands": 0}, False),
+    ({"num_perm": 64, "lsh_bands": 10}, False),
+])
+def test_validate_config_checks_lsh_bands(settings, valid):
+    with open(CONFIG_PATH, encoding='utf-8') as f:
+        config = json.load(f)
+    assert validate_config(config) == []
+    config["dedup_settings"].update(settings)
+    problems = validate_config(config)
+    assert all("lsh_bands" not in problem for problem in problems) == valid
+
+
+@pytest.mark.parametrize("first, second", [
+    ("3+2=?", "3-2=?"),
+    ("x>1 时 f(x) 的取值", "x<1 时 f(x) 的取值"),
+    ("增长率为5%", "增长率为5‰"),
+    ("a=b", "a≠b"),
+])
+def test_exact_duplicates_keep_questions_differing_in_symbols(first, second):
+    result, stats = find_exact_duplicates(bank([first, second]), COLUMN_MAP, mode="drop")
+    assert stats["重复数量"] == 0
+    assert result["题干"].tolist() == [first, second]
+
+
+def test_exact_duplicates_fold_width_case_and_whitespace():
+    stems = ["计算：３＋２＝？", "计算: 3+2=?", "Which is ＣＯＲＲＥＣＴ", "which  is correct", "计算：3+2"]
+    result, stats = find_exact_duplicates(bank(stems), COLUMN_MAP, mode="flag")
+    assert result[DUPLICATE_COLUMN].tolist() == [False, True, False, True, False]
+    assert stats["重复数量"] == 2
+
+
+def test_exact_duplicates_drop_keeps_first_occurrence_in_source_order():
+    df = bank(["细胞的基本单位是什么", "人体最大的器官是什么", "细胞的基本单位是什么"],
+              ["第1章", "第1章", "第2章"])
+    result, stats = find_exact_duplicates(df, COLUMN_MAP, mode="drop")
+    assert result["来源文件"].tolist() == ["第1章", "第1章"]
+    assert stats["按来源统计"] == {"第2章": 1}
+
+
+def test_exact_duplicates_distinct_chinese_questions():
+    stems = ["线粒体的功能", "核糖体的功能", "高尔基体的功能"]
+    _, stats = find_exact_duplicates(bank(stems), COLUMN_MAP, mode="flag")
+    assert stats["重复数量"] == 0
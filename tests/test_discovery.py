@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""discovery.py 和流水线文件顺序的回归测试"""
+import os
+import sys
+
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from discovery import find_files  # noqa: E402
+from merger import QuestionBankMerger  # noqa: E402
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
+PATTERNS = ["*_习题导出.xlsx", "*题库*.xlsx", "*.xlsx"]
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb"):
+        pass
+
+
+def write_bank(path, stems):
+    """配置中的导出格式：第一行为说明，第二行为表头"""
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.append(["说明：本表由题库系统导出"])
+    worksheet.append(["题型", "题干", "选项A", "选项B", "正确答案"])
+    for stem in stems:
+        worksheet.append(["单选题", stem, "甲", "乙", "A"])
+    workbook.save(path)
+
+
+def names(files, root):
+    return [os.path.relpath(path, root).replace(os.sep, "/") for path in files]
+
+
+def test_find_files_orders_by_pattern_priority_then_path(tmp_path):
+    for name in ["a.xlsx", "z_习题导出.xlsx", "b题库.xlsx", "c_习题导出.xlsx"]:
+        touch(str(tmp_path / name))
+
+    files = find_files(str(tmp_path), PATTERNS)
+    assert names(files, tmp_path) == ["c_习题导出.xlsx", "z_习题导出.xlsx", "b题库.xlsx", "a.xlsx"]
+
+
+def test_find_files_skips_lock_and_hidden_files(tmp_path):
+    for name in ["第1章_习题导出.xlsx", "~$第1章_习题导出.xlsx", ".第2章_习题导出.xlsx"]:
+        touch(str(tmp_path / name))
+
+    assert names(find_files(str(tmp_path), PATTERNS), tmp_path) == ["第1章_习题导出.xlsx"]
+
+
+def test_find_files_excludes_files_and_directories(tmp_path):
+    for name in ["keep.xlsx", "merged_questions.xlsx", "sub/keep.xlsx", "output/a.xlsx"]:
+        touch(str(tmp_path / name))
+
+    files = find_files(str(tmp_path), ["*.xlsx"], recursive=True,
+                       excludes=["merged_*.xlsx", "output"])
+    assert names(files, tmp_path) == ["keep.xlsx", "sub/keep.xlsx"]
+
+
+def test_find_files_without_recursive_ignores_subdirectories(tmp_path):
+    for name in ["top.xlsx", "sub/nested.xlsx"]:
+        touch(str(tmp_path / name))
+
+    assert names(find_files(str(tmp_path), ["*.xlsx"]), tmp_path) == ["top.xlsx"]
+    assert names(find_files(str(tmp_path), ["sub/*.xlsx"]), tmp_path) == ["sub/nested.xlsx"]
+
+
+def test_pipeline_uses_find_files_order(tmp_path):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    # 目录遍历顺序为 a、b；模式优先级顺序为 b、a
+    write_bank(str(input_dir / "a.xlsx"), ["题目a1", "题目a2"])
+    write_bank(str(input_dir / "b_习题导出.xlsx"), ["题目b1"])
+
+    merger = QuestionBankMerger(CONFIG_PATH)
+    merged = merger.merge_files(str(input_dir))
+
+    excel_path = str(tmp_path / "pipeline.xlsx")
+    pipeline_merger = QuestionBankMerger(CONFIG_PATH)
+    pipeline_merger.merge_pipeline(str(input_dir), excel_path=excel_path)
+
+    assert merged["题干"].tolist() == ["题目b1", "题目a1", "题目a2"]
+    assert pd.read_excel(excel_path)["题干"].tolist() == merged["题干"].tolist()
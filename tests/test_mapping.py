@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""mapping.py 版式登记表的回归测试"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mapping import LayoutRegistry, LayoutResolver, matching_key  # noqa: E402
+
+COLUMN_MAP = {
+    "question_type": "题型",
+    "question_text": "题干",
+    "correct_answer": "正确答案",
+    "analysis": "解析",
+    "score": "分值",
+    "difficulty": "难度系数",
+    "options": ["选项A", "选项B"],
+}
+ROWS = [["说明：本表由题库系统导出"], ["类型", "问题", "A", "B", "答案", "备注"]]
+
+
+def resolver(path, synonyms=None, threshold=0.8) -> LayoutResolver:
+    return LayoutResolver(COLUMN_MAP, LayoutRegistry(str(path)), synonyms, threshold)
+
+
+def test_registered_layout_is_reused(tmp_path):
+    path = tmp_path / "layouts.json"
+    first = resolver(path)
+    assert first.resolve(ROWS) == (1, {"类型": "题型", "问题": "题干", "答案": "正确答案",
+                                       "A": "选项A", "B": "选项B"})
+
+    second = resolver(path)
+    assert second.resolve(ROWS) == first.resolve(ROWS)
+    assert (second.hits, second.misses) == (1, 0)
+
+
+def test_changed_synonyms_rematch_registered_layout(tmp_path):
+    path = tmp_path / "layouts.json"
+    with_note = resolver(path, {"analysis": ["备注"]})
+    assert with_note.resolve(ROWS)[1]["备注"] == "解析"
+
+    # 去掉同义词后不能继续使用登记的旧结果
+    without_note = resolver(path)
+    _, renames = without_note.resolve(ROWS)
+    assert "备注" not in renames
+    assert (without_note.hits, without_note.misses) == (0, 1)
+    assert len(json.loads(path.read_text(encoding="utf-8"))["layouts"]) == 2
+
+
+def test_changed_threshold_rematches_registered_layout(tmp_path):
+    path = tmp_path / "layouts.json"
+    resolver(path, threshold=0.8).resolve(ROWS)
+
+    stricter = resolver(path, threshold=0.95)
+    stricter.resolve(ROWS)
+    assert (stricter.hits, stricter.misses) == (0, 1)
+
+
+def test_matching_key_depends_on_settings():
+    assert matching_key() == matching_key({}, 0.8)
+    assert matching_key() != matching_key({"analysis": ["备注"]})
+    assert matching_key() != matching_key(threshold=0.9)
+
+
+def test_registry_from_older_version_is_ignored(tmp_path):
+    path = tmp_path / "layouts.json"
+    stale = {"version": 1, "layouts": {"0" * 40: {"question_type": "备注",
+                                                   "question_text": "问题", "options": []}}}
+    path.write_text(json.dumps(stale), encoding="utf-8")
+
+    registry = LayoutRegistry(str(path))
+    assert registry.layouts == {}
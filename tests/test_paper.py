@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""paper.py 的回归测试"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import paper  # noqa: E402
+from paper import PaperAssembler, PaperIndex  # noqa: E402
+from schema import SOURCE_COLUMN  # noqa: E402
+
+COLUMN_MAP = {
+    "question_type": "题型",
+    "question_text": "题干",
+    "correct_answer": "正确答案",
+    "analysis": "解析",
+    "score": "分值",
+    "difficulty": "难度系数",
+    "options": ["选项A", "选项B"],
+}
+# 来源文件 -> (单选题数量, 多选题数量)
+SOURCES = {"第1章": (60, 20), "第2章": (30, 20), "第3章": (10, 20)}
+
+
+def bank() -> pd.DataFrame:
+    rows = []
+    for source, (singles, multiples) in SOURCES.items():
+        for question_type, count, score in (("单选题", singles, 2), ("多选题", multiples, 4)):
+            for i in range(count):
+                rows.append({"题型": question_type, "题干": f"{source}{question_type}{i}",
+                             "正确答案": "A", "分值": score, "难度系数": 1 + i % 3,
+                             SOURCE_COLUMN: source})
+    return pd.DataFrame(rows)
+
+
+SPEC = {
+    "sections": [
+        {"name": "一、单选题", "question_type": "单选题", "count": 10},
+        {"name": "二、多选题", "question_type": "多选题", "count": 6},
+    ],
+}
+
+
+def assembler(spec=SPEC) -> PaperAssembler:
+    return PaperAssembler(PaperIndex(bank(), COLUMN_MAP), spec)
+
+
+def test_sections_are_stratified_by_source():
+    builder = assembler()
+    for generated in builder.generate(20, seed=3):
+        frame = builder.paper_frame(generated)
+        singles = frame[frame["大题"] == "一、单选题"][SOURCE_COLUMN].value_counts().to_dict()
+        multiples = frame[frame["大题"] == "二、多选题"][SOURCE_COLUMN].value_counts().to_dict()
+        # 单选题 60:30:10 分配 10 道，多选题 20:20:20 分配 6 道
+        assert singles == {"第1章": 6, "第2章": 3, "第3章": 1}
+        assert multiples == {"第1章": 2, "第2章": 2, "第3章": 2}
+        assert (frame["题型"][:10] == "单选题").all() and (frame["题型"][10:] == "多选题").all()
+        assert frame["题干"].is_unique
+
+
+def test_same_seed_generates_same_papers():
+    first = [p.positions.tolist() for p in assembler().generate(5, seed=42)]
+    second = [p.positions.tolist() for p in assembler().generate(5, seed=42)]
+    other = [p.positions.tolist() for p in assembler().generate(5, seed=43)]
+    assert first == second
+    assert first != other
+    assert len({tuple(positions) for positions in first}) > 1
+
+
+def test_total_score_target_is_met_within_tolerance():
+    spec = {
+        "sections": [{"name": "单选和多选", "question_type": ["单选题", "多选题"], "count": 10}],
+        "total_score": 30,
+        "tolerance": {"score": 0},
+        "stratify": False,
+    }
+    for generated in assembler(spec).generate(10, seed=0):
+        assert generated.within_tolerance
+        assert generated.total_score == 30
+
+
+def test_section_with_too_few_candidates_is_rejected():
+    spec = {"sections": [{"question_type": "判断题", "count": 1}]}
+    with pytest.raises(ValueError):
+        assembler(spec)
+
+
+@pytest.mark.parametrize("papers", ["0", "-1"])
+def test_cli_rejects_papers_below_one(monkeypatch, tmp_path, papers):
+    monkeypatch.setattr(sys, "argv", ["paper.py", str(tmp_path / "spec.json"),
+                                      "--input", str(tmp_path), "--papers", papers])
+    with pytest.raises(SystemExit) as excinfo:
+        paper.main()
+    assert excinfo.value.code == 2
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""reader.py 的回归测试"""
+import os
+import re
+import sys
+import zipfile
+
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from reader import iter_sheet_rows, read_mapped_columns  # noqa: E402
+
+HEADER = ["题型", "题干", "选项A", "选项B", "正确答案"]
+ROWS = [
+    ["单选题", "1+1=?", "1", "2", "B"],
+    ["判断题", "地球是圆的", None, None, "对"],
+]
+
+
+def write_bad_dimension(path):
+    """写出 <dimension ref="A1"/> 错误的工作簿（部分导出工具的写法）"""
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.append(HEADER)
+    for row in ROWS:
+        worksheet.append(row)
+    good = str(path) + ".good.xlsx"
+    workbook.save(good)
+
+    with zipfile.ZipFile(good) as src, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = re.sub(rb'<dimension ref="[^"]*"/>', b'<dimension ref="A1"/>', data)
+            dst.writestr(item, data)
+    os.remove(good)
+
+
+def test_iter_sheet_rows_ignores_wrong_dimension(tmp_path):
+    path = tmp_path / "bad_dimension.xlsx"
+    write_bad_dimension(path)
+
+    rows = list(iter_sheet_rows(str(path)))
+    assert rows[0] == tuple(HEADER)
+    assert len(rows) == 1 + len(ROWS)
+
+
+def test_read_mapped_columns_with_wrong_dimension(tmp_path):
+    path = tmp_path / "bad_dimension.xlsx"
+    write_bad_dimension(path)
+
+    df = read_mapped_columns(str(path), 0, 1, HEADER)
+    assert list(df.columns) == HEADER
+    assert len(df) == len(ROWS)
+    assert df["正确答案"].tolist() == ["B", "对"]
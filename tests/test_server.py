@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""server.py 来源文件上传和删除的回归测试"""
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from merger import QuestionBankMerger  # noqa: E402
+from server import HttpError, MergeService  # noqa: E402
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.json')
+
+
+def bank_bytes(stems) -> bytes:
+    """配置中的导出格式：第一行为说明，第二行为表头"""
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.append(["说明：本表由题库系统导出"])
+    worksheet.append(["题型", "题干", "选项A", "选项B", "正确答案"])
+    for stem in stems:
+        worksheet.append(["单选题", stem, "甲", "乙", "A"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def run_service(input_dir, scenario):
+    """启动服务（不监听端口），执行 scenario(service) 后关闭"""
+    service = MergeService(QuestionBankMerger(CONFIG_PATH), str(input_dir))
+
+    async def main():
+        await service.start()
+        try:
+            return await scenario(service)
+        finally:
+            service.close()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    (tmp_path / "第1章_习题导出.xlsx").write_bytes(bank_bytes(["原始题目1", "原始题目2"]))
+    return tmp_path
+
+
+def test_put_cannot_overwrite_original_input_file(input_dir):
+    original = input_dir / "第1章_习题导出.xlsx"
+    content = original.read_bytes()
+
+    async def scenario(service):
+        with pytest.raises(HttpError) as excinfo:
+            await service.put_source("第1章_习题导出.xlsx", bank_bytes(["上传题目"]))
+        assert excinfo.value.status == 409
+        return len(service.merged)
+
+    assert run_service(input_dir, scenario) == 2
+    assert original.read_bytes() == content
+
+
+def test_put_replaces_and_delete_removes_uploaded_file(input_dir):
+    uploaded = input_dir / "第2章_习题导出.xlsx"
+
+    async def scenario(service):
+        added = await service.put_source(uploaded.name, bank_bytes(["上传题目"]))
+        replaced = await service.put_source(uploaded.name, bank_bytes(["上传题目1", "上传题目2"]))
+        assert (added["操作"], replaced["操作"]) == ("新增", "替换")
+        assert replaced["总题目数"] == 4
+        deleted = await service.delete_source(uploaded.name)
+        assert deleted["操作"] == "删除"
+        return deleted["总题目数"]
+
+    assert run_service(input_dir, scenario) == 2
+    assert not uploaded.exists()
+
+
+def test_delete_original_file_only_excludes_it(input_dir):
+    original = input_dir / "第1章_习题导出.xlsx"
+
+    async def scenario(service):
+        deleted = await service.delete_source(original.name)
+        assert deleted["操作"] == "移出题库"
+        with pytest.raises(HttpError) as excinfo:
+            await service.put_source(original.name, bank_bytes(["上传题目"]))
+        assert excinfo.value.status == 409
+        return deleted["总题目数"]
+
+    assert run_service(input_dir, scenario) == 0
+    assert original.exists()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""validate.py 的回归测试"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from validate import ISSUE_COLUMN, validate_answers  # noqa: E402
+
+COLUMN_MAP = {
+    "question_type": "题型",
+    "question_text": "题干",
+    "correct_answer": "正确答案",
+    "analysis": "解析",
+    "options": ["选项A", "选项B", "选项C", "选项D"],
+}
+
+
+def bank(rows) -> pd.DataFrame:
+    """rows: (题型, 正确答案, 选项A-D)；来源文件按行号编号"""
+    return pd.DataFrame([
+        {"题型": question_type, "题干": f"题目{i}", "正确答案": answer,
+         **dict(zip(COLUMN_MAP["options"], options)), "来源文件": f"第{i % 2 + 1}章"}
+        for i, (question_type, answer, options) in enumerate(rows)
+    ])
+
+
+FULL = ("甲", "乙", "丙", "丁")
+
+
+@pytest.mark.parametrize("question_type, answer, options, expected", [
+    ("单选题", "B", FULL, None),
+    ("单选题", "ｂ", FULL, None),
+    ("单选题", "C", ("甲", "乙", " ", "丁"), "选项为空"),
+    ("单选题", "E", FULL, "选项为空"),
+    ("单选题", "1", FULL, "答案格式"),
+    ("单选题", "A和B", FULL, "答案格式"),
+    ("单选题", "AB", FULL, "单选多答"),
+    ("多选题", "A, C", FULL, None),
+    ("多选题", "A、B、D", FULL, None),
+    ("多选题", "CA", FULL, "多选顺序"),
+    ("多选题", "AAB", FULL, "多选顺序"),
+    ("判断题", "对", (None, None, None, None), None),
+    ("判断题", "正确", (None, None, None, None), "判断答案"),
+    ("简答题", "任意文字", (None, None, None, None), None),
+    ("单选题", None, FULL, None),
+])
+def test_issue_categories(question_type, answer, options, expected):
+    result, stats = validate_answers(bank([(question_type, answer, options)]), COLUMN_MAP)
+    issue = result[ISSUE_COLUMN].iloc[0]
+    assert (None if pd.isna(issue) else issue) == expected
+    assert stats["问题数量"] == (0 if expected is None else 1)
+
+
+def test_multiple_issues_are_combined():
+    result, stats = validate_answers(bank([("单选题", "DA", ("甲", "乙", "丙", None))]),
+                                     COLUMN_MAP)
+    assert result[ISSUE_COLUMN].iloc[0] == "选项为空；单选多答"
+    assert stats["按问题统计"] == {"选项为空": 1, "单选多答": 1}
+
+
+def test_custom_judge_answers():
+    settings = {"judge_answers": ["正确", "错误"]}
+    _, stats = validate_answers(bank([("判断题", "正确", FULL), ("判断题", "对", FULL)]),
+                                COLUMN_MAP, settings)
+    assert stats["按问题统计"] == {"判断答案": 1}
+
+
+def test_drop_mode_removes_flagged_questions():
+    rows = [("单选题", "A", FULL), ("单选题", "AB", FULL), ("多选题", "BA", FULL),
+            ("判断题", "错", FULL)]
+    result, stats = validate_answers(bank(rows), COLUMN_MAP, mode="drop")
+    assert result["题干"].tolist() == ["题目0", "题目3"]
+    assert ISSUE_COLUMN not in result.columns
+    assert stats["处理方式"] == "删除"
+    assert stats["按来源统计"] == {"第2章": 1, "第1章": 1}